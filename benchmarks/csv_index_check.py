@@ -0,0 +1,172 @@
+"""
+Conferência do índice de offsets do CSV (shulchan_pipeline/csv_index.py)
+
+Confere que:
+
+- as linhas lidas pelo índice são as mesmas do csv.DictReader, no corpus
+  sintético e em um CSV com '\\r\\n', '\\r', linhas em branco, aspas e quebras
+  de linha dentro dos campos;
+- os simanim de uma seleção (--chapter-id, --ids, --rows) saem iguais aos
+  mesmos simanim do processamento completo, nos dois processadores;
+- o índice é refeito quando o CSV muda;
+- nas planilhas (tabelas/, sem índice) as faixas --rows, inclusive as sem
+  fim ('2:'), escolhem as mesmas linhas da leitura completa (só com o
+  openpyxl instalado).
+
+Mede o processamento completo, a criação do índice e o de um único siman
+com o índice já gravado. Sai com código 1 se alguma conferência falhar.
+
+    python benchmarks/csv_index_check.py
+    python benchmarks/csv_index_check.py --scale 10
+"""
+
+import argparse
+import contextlib
+import csv
+import io
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from process_content_improved import ImprovedShulchanAruchProcessor  # noqa: E402
+from process_content_with_ai import ShulchanAruchProcessor  # noqa: E402
+from shulchan_pipeline.csv_index import (CsvIndex, RowSelection, index_path, open_selected_rows,  # noqa: E402
+                                         row_range)
+from shulchan_pipeline.spreadsheets import (BOOKS_XLSX, CHAPTERS_XLSX, CONTENT_XLSX, open_rows,  # noqa: E402
+                                            openpyxl)
+from synthetic_corpus import ROWS_1X, generate_corpus  # noqa: E402
+
+# CSV com as formas de quebra de linha e de aspas que o csv.DictReader aceita
+CSV_DIFICIL = (
+    'id,chapter_id,content,created_at,updated_at\r\n'
+    'a1,c1,"SIMAN 1 **Leis**\r\n1. texto com ""aspas"" e vírgula, aqui\r\n2. outro",x,y\r\n'
+    '\r\n'
+    'a2,c1,"linha\rcom CR sozinho\n1. e LF",x,y\n'
+    'a3,c2,sem aspas,x\r'
+    'a4,c2,"SIMAN 4 שלום ação",x,y,extra\n'
+    '\n\n'
+    'a5,c3,"fim sem quebra\n1. texto"'
+)
+
+
+def _todas(path: Path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return list(enumerate(csv.DictReader(f)))
+
+
+def _pelo_indice(path: Path, selecao: RowSelection):
+    with open_selected_rows(path, selecao) as linhas:
+        return list(linhas)
+
+
+def _planilhas(diretorio: Path, linhas: int) -> Path:
+    """Exportação do Supabase mínima (tabelas/) com um livro, dois capítulos e linhas conteúdos"""
+
+    livro, capitulos = str(uuid.uuid4()), [str(uuid.uuid4()) for _ in range(2)]
+    planilhas = {
+        BOOKS_XLSX: [['id', 'title', 'slug', 'author'], [livro, 'Livro', 'livro', 'Autor']],
+        CHAPTERS_XLSX: [['id', 'book_id', 'title', 'slug', 'position']]
+                       + [[capitulo, livro, f'Capítulo {i}', f'cap-{i}', i] for i, capitulo in enumerate(capitulos)],
+        CONTENT_XLSX: [['id', 'chapter_id', 'content', 'created_at', 'updated_at']]
+                      + [[str(uuid.uuid4()), capitulos[i % 2], f'SIMAN {i + 1} **Leis {i}**',
+                          '2024-01-01 00:00:00', '2024-01-02 00:00:00'] for i in range(linhas)],
+    }
+    diretorio.mkdir()
+    for nome, linhas_planilha in planilhas.items():
+        workbook = openpyxl.Workbook()
+        for linha in linhas_planilha:
+            workbook.active.append(linha)
+        workbook.save(diretorio / nome)
+    return diretorio
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Conferência do índice de offsets do CSV")
+    parser.add_argument('--scale', type=float, default=1, help=f"Escala do corpus sintético ({ROWS_1X} simanim)")
+    parser.add_argument('--repeticoes', type=int, default=20, help="Execuções medidas do siman único")
+    args = parser.parse_args()
+
+    falhas = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        csv_file = generate_corpus(Path(temp_dir) / 'content_rows.csv', int(ROWS_1X * args.scale))
+        dificil = Path(temp_dir) / 'dificil.csv'
+        dificil.write_bytes(CSV_DIFICIL.encode('utf-8'))
+
+        for path in (csv_file, dificil):
+            esperado = _todas(path)
+            if _pelo_indice(path, RowSelection(faixa=range(0, len(esperado) + 5))) != esperado:
+                falhas.append(f"{path.name}: linhas do índice diferentes do csv.DictReader")
+
+        inicio = time.perf_counter()
+        indice = CsvIndex.build(csv_file)
+        indice.save(index_path(csv_file))
+        construcao = time.perf_counter() - inicio
+
+        capitulo = indice.chapter_ids[len(indice) // 2]
+        selecoes = {
+            'chapter_id': RowSelection(chapter_ids=[capitulo]),
+            'ids': RowSelection(ids=[indice.ids[0], indice.ids[7], indice.ids[-1]]),
+            'rows': RowSelection(faixa=range(100, 140)),
+            'ids+rows': RowSelection(ids=[indice.ids[5], indice.ids[500]], faixa=range(0, 50)),
+        }
+        for classe in (ImprovedShulchanAruchProcessor, ShulchanAruchProcessor):
+            with contextlib.redirect_stdout(io.StringIO()):
+                processor = classe()
+                inicio = time.perf_counter()
+                completo = {siman.original_id: processor.sql_rows(siman) for siman in processor.iter_csv(str(csv_file))}
+                duracao_completa = time.perf_counter() - inicio
+                for nome, selecao in selecoes.items():
+                    simanim = list(processor.iter_csv(str(csv_file), selecao=selecao))
+                    esperados = [indice.ids[i] for i in selecao.numbers(indice)]
+                    if [siman.original_id for siman in simanim] != esperados or not esperados:
+                        falhas.append(f"{classe.__name__} {nome}: linhas escolhidas erradas")
+                    for siman in simanim:
+                        if processor.sql_rows(siman) != completo[siman.original_id]:
+                            falhas.append(f"{classe.__name__} {nome}: siman {siman.original_id} diferente")
+
+                tempos = []
+                for repeticao in range(args.repeticoes):
+                    selecao = RowSelection(ids=[indice.ids[repeticao * 37 % len(indice)]])
+                    inicio = time.perf_counter()
+                    simanim = list(processor.iter_csv(str(csv_file), selecao=selecao))
+                    tempos.append(time.perf_counter() - inicio)
+                    if len(simanim) != 1 or selecao.indice != 'lido':
+                        falhas.append(f"{classe.__name__}: siman único não lido pelo índice gravado")
+            print(f"{classe.__name__}: corpus inteiro ({len(completo)} simanim) {duracao_completa:.2f}s; "
+                  f"um siman pelo índice {statistics.median(tempos) * 1000:.1f} ms (mediana)")
+        print(f"índice: {len(indice)} linhas, criado em {construcao * 1000:.0f} ms, "
+              f"{index_path(csv_file).stat().st_size / 1024:.0f} KiB")
+
+        # CSV alterado: o índice antigo não vale mais e é refeito
+        with open(csv_file, 'a', encoding='utf-8', newline='') as f:
+            csv.writer(f).writerow(['novo-id', capitulo, 'SIMAN 9999 **Acrescentado**\n1. texto', 'x', 'y'])
+        selecao = RowSelection(ids=['novo-id'])
+        linhas = _pelo_indice(csv_file, selecao)
+        if selecao.indice != 'refeito' or [row['id'] for _, row in linhas] != ['novo-id']:
+            falhas.append("CSV alterado: índice não foi refeito")
+
+        # Planilhas: sem índice, a faixa é aplicada lendo as linhas em ordem
+        if openpyxl is None:
+            print("planilhas: openpyxl não instalado, conferência pulada")
+        else:
+            tabelas = _planilhas(Path(temp_dir) / 'tabelas', 6)
+            with open_rows(tabelas) as rows:
+                todas = list(enumerate(rows))
+            for faixa in ('2:', '0:', '4', ':3', '1:100'):
+                linhas = _pelo_indice(tabelas, RowSelection(faixa=row_range(faixa)))
+                if linhas != todas[row_range(faixa).start:row_range(faixa).stop]:
+                    falhas.append(f"planilhas --rows {faixa}: linhas escolhidas erradas")
+            print(f"planilhas: {len(todas)} linhas, faixas com e sem fim conferidas")
+
+    for falha in falhas[:10]:
+        print(f"   FALHA: {falha}")
+    sys.exit(1 if falhas else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Conferência do parser de cabeçalho (shulchan_pipeline/headers.py)
+
+Compara os títulos de extract_assunto_improved e extract_assunto com as
+expressões usadas antes (três re.search no conteúdo inteiro e três re.sub do
+"Contém ...") em simanim sintéticos e em cabeçalhos sorteados com espaços,
+quebras de linha, dígitos, '**' e "Contém" nas posições difíceis, inclusive
+cabeçalhos depois de um texto longo e um segundo 'SIMAN' no meio. Mede a
+extração do título em um siman com 5 seifim e em um com 500. Sai com código 1
+se algum título for diferente.
+
+    python benchmarks/header_parser_check.py
+    python benchmarks/header_parser_check.py --casos 50000
+"""
+
+import argparse
+import contextlib
+import io
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Optional, Set, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from process_content_improved import ImprovedShulchanAruchProcessor  # noqa: E402
+from process_content_with_ai import ShulchanAruchProcessor  # noqa: E402
+from synthetic_corpus import _seif, siman_content  # noqa: E402
+
+# Trechos usados para montar cabeçalhos difíceis
+TRECHOS = [
+    'SIMAN', 'SIMAN ', ' ', '  ', '\n', '\t', '1', '12', '0', '٣', '**', '*', '.', '1.', '2. ', 'Contém ',
+    'Contém 3 seções', 'Contém 2 seifim', 'Contém 1 parágrafo', 'Leis de', 'oração da manhã', 'carne',
+    'sinagoga', 'shabat', 'casamento', 'abcdefghij', 'x' * 60, 'y' * 120,
+]
+
+
+def titulo_improved(content: str) -> Optional[Tuple[str, str, float, bool]]:
+    """Título de extract_assunto_improved antes do parser (None: fallback)"""
+
+    match1 = re.search(r'SIMAN\s+\d+\s+\*\*(.*?)\*\*', content, re.DOTALL)
+    if match1:
+        assunto = match1.group(1).strip()
+        assunto = re.sub(r'\s*Contém\s+\d+\s+seções?.*$', '', assunto)
+        assunto = re.sub(r'\s*Contém\s+\d+\s+seifim.*$', '', assunto)
+        assunto = re.sub(r'\s*Contém\s+\d+\s+parágrafos?.*$', '', assunto)
+        return assunto.strip(), assunto[:100], 0.95, True
+    match2 = re.search(r'SIMAN\s+\d+\s+([^1-9][^*\n]{10,100}?)(?:\n|Contém|$)', content, re.DOTALL)
+    if match2:
+        assunto = match2.group(1).strip()
+        if not re.search(r'^\d+\.', assunto) and len(assunto) < 150:
+            return assunto, assunto[:100], 0.9, True
+    match3 = re.search(r'SIMAN\s+\d+\s+([^1-9][^*\n]{10,80}?)(?:\n|\.)', content, re.DOTALL)
+    if match3:
+        assunto = match3.group(1).strip()
+        if not re.search(r'^\d+\.', assunto) and len(assunto) < 100:
+            return assunto, assunto[:100], 0.8, True
+    return None
+
+
+def titulo_ai(content: str) -> Optional[Tuple[str, str, float]]:
+    """Título de extract_assunto antes do parser (None: fallback)"""
+
+    match1 = re.search(r'SIMAN\s+\d+\s+\*\*(.*?)\*\*', content, re.DOTALL)
+    if match1:
+        assunto = match1.group(1).strip()
+        return assunto, assunto[:100], 0.9
+    for pattern, confianca in ((r'SIMAN\s+\d+\s+([^1-9].*?)(?:\n|$)', 0.8), (r'SIMAN\s+\d+\s+([^1-9].*?)(?:\n|\.)', 0.7)):
+        match = re.search(pattern, content, re.DOTALL)
+        if match:
+            assunto = re.sub(r'\s+', ' ', match.group(1).strip())
+            if len(assunto) > 200:
+                assunto = assunto[:200] + '...'
+            return assunto, assunto[:100], confianca
+    return None
+
+
+def antigo_improved(processor: ImprovedShulchanAruchProcessor, content: str,
+                    encontradas: Set[str]) -> Tuple[str, str, float, bool]:
+    """extract_assunto_improved antes do parser, com o fallback que lia a primeira frase por split('.')"""
+
+    titulo = titulo_improved(content)
+    if titulo is not None:
+        return titulo
+    found_themes = [theme for keyword, theme in processor.theme_keywords.items() if keyword in encontradas]
+    if found_themes:
+        return processor.generate_specific_title(content, encontradas)
+    first_sentence = content.split('.')[0]
+    if 'carne' in first_sentence.lower():
+        title = "Leis sobre carne"
+    elif 'sinagoga' in first_sentence.lower():
+        title = "Leis sobre sinagoga"
+    elif 'shabat' in first_sentence.lower():
+        title = "Leis sobre Shabat"
+    elif 'casamento' in first_sentence.lower():
+        title = "Leis sobre casamento"
+    else:
+        title = "Leis haláchicas diversas"
+    return title, title, 0.7, False
+
+
+def cabecalho_sorteado(rng: random.Random) -> str:
+    partes = ['SIMAN', rng.choice([' ', '  ', '\n', ' \n ']), str(rng.randint(0, 300)), rng.choice([' ', '', '\n', '  '])]
+    partes += [rng.choice(TRECHOS) for _ in range(rng.randint(0, 14))]
+    return ''.join(partes)
+
+
+def conteudo_sorteado(rng: random.Random) -> str:
+    corpo = "\n".join(_seif(rng, numero) for numero in range(1, rng.randint(1, 4)))
+    # Às vezes sem cabeçalho, com texto (curto ou longo) antes dele ou com outro 'SIMAN' depois do corpo
+    prefixo = rng.choice(['', '', '', ' ', 'Texto antes. ', 'Texto antes sem ponto ' * 40 + '\n'])
+    sufixo = rng.choice(['', '', '', '\n' + cabecalho_sorteado(rng)])
+    return prefixo + cabecalho_sorteado(rng) + rng.choice(['', '\n', ' ', '. ']) + corpo + sufixo
+
+
+def medir(funcao, content: str, repeticoes: int = 2000) -> float:
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        funcao(content)
+    return (time.perf_counter() - inicio) / repeticoes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Conferência do parser de cabeçalho dos simanim")
+    parser.add_argument('--casos', type=int, default=20000, help="Cabeçalhos sorteados")
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        improved = ImprovedShulchanAruchProcessor()
+        ai = ShulchanAruchProcessor()
+    rng = random.Random(11)
+    conteudos = [siman_content(rng, numero) for numero in range(1, 2001)]
+    conteudos += [conteudo_sorteado(rng) for _ in range(args.casos)]
+
+    falhas = []
+    padroes = {}
+    for content in conteudos:
+        encontradas = improved.keyword_matcher.find(content.lower())
+        novo = improved.extract_assunto_improved(content, encontradas)
+        if novo[:4] != tuple(antigo_improved(improved, content, encontradas))[:4]:
+            falhas.append(f"improved: {content[:80]!r}")
+        padroes[novo.padrao] = padroes.get(novo.padrao, 0) + 1
+        antigo = titulo_ai(content)
+        novo = ai.extract_assunto(content, encontradas)
+        if novo[:3] != tuple(antigo if antigo is not None else ai.generate_assunto_from_content(content, encontradas))[:3]:
+            falhas.append(f"ai: {content[:80]!r}")
+
+    print(f"{len(conteudos)} cabeçalhos comparados ({args.casos} sorteados); "
+          f"padrões: {', '.join(f'{nome} {total}' for nome, total in sorted(padroes.items()))}")
+    for nome, content in (('negrito', "SIMAN 7 **Leis da oração Contém 500 seifim**\n"),
+                          ('sem título', "SIMAN 7 \n")):
+        corpos = {quantidade: content + "\n".join(_seif(rng, numero) for numero in range(1, quantidade + 1))
+                  for quantidade in (5, 500)}
+        tempos = []
+        for quantidade, texto in corpos.items():
+            # Palavras-chave já encontradas, como no processamento (o fallback só lê os temas)
+            antes = medir(lambda c: antigo_improved(improved, c, set()), texto, 200)
+            depois = medir(lambda c: improved.extract_assunto_improved(c, set()), texto, 200)
+            tempos.append(f"{quantidade} seifim {antes * 1e6:.1f} -> {depois * 1e6:.1f} µs")
+        print(f"   - {nome}: {'; '.join(tempos)}")
+    for falha in falhas[:10]:
+        print(f"   FALHA: {falha}")
+    sys.exit(1 if falhas else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Memória ocupada pelos simanim processados: representação compacta x anterior
+
+Processa o corpus com process_csv (que mantém todos os simanim em memória) e
+mede com tracemalloc o que a lista de ProcessedSiman ocupa. Depois monta, a
+partir dos mesmos dados, a representação anterior (dataclass com __dict__,
+cada seif um dict com o texto copiado e palavras-chave em listas de strings
+próprias) e mede de novo.
+
+O texto dos seifim continua em memória nas duas (na compacta, como o conteúdo
+do siman), então a redução total é limitada por ele; a redução da estrutura
+(o total sem os caracteres dos textos) mostra o ganho dos registros em si.
+Sai com código 1 se alguma das reduções ficar abaixo do mínimo.
+
+    python benchmarks/memory_footprint.py                      # corpus sintético 1x
+    python benchmarks/memory_footprint.py --csv csv/content_rows.csv
+"""
+
+import argparse
+import contextlib
+import io
+import sys
+import tempfile
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from process_content_improved import ImprovedShulchanAruchProcessor  # noqa: E402
+from synthetic_corpus import ROWS_1X, generate_corpus  # noqa: E402
+
+# Reduções mínimas (anterior / compacta) esperadas: total e só da estrutura
+REDUCAO_MINIMA = 2.5
+REDUCAO_MINIMA_ESTRUTURA = 5.0
+
+
+@dataclass
+class LegacySiman:
+    """ProcessedSiman como era antes: dataclass comum, listas e seifim em dicts"""
+    original_id: str
+    chapter_id: str
+    assunto: str
+    assunto_resumido: str
+    categoria: str
+    tags: List[str]
+    seifim: List[Dict[str, Any]]
+    confianca: float
+    palavras_chave: List[str]
+    tem_assunto_original: bool
+
+
+def _copia(texto: str) -> str:
+    # Cada palavra era uma fatia própria da tokenização, não uma string compartilhada
+    return (texto + '.')[:-1]
+
+
+def legacy(siman: Any) -> LegacySiman:
+    return LegacySiman(
+        original_id=_copia(siman.original_id),
+        chapter_id=_copia(siman.chapter_id),
+        assunto=siman.assunto,
+        assunto_resumido=siman.assunto_resumido,
+        categoria=siman.categoria,
+        tags=list(siman.tags),
+        seifim=[
+            {
+                'numero': seif['numero'],
+                'conteudo': seif['conteudo'],
+                'assunto': seif['assunto'],
+                'palavras_chave': [_copia(palavra) for palavra in seif['palavras_chave']],
+                'tamanho': seif['tamanho'],
+                'ordem': seif['ordem'],
+            }
+            for seif in siman.seifim
+        ],
+        confianca=siman.confianca,
+        palavras_chave=[_copia(palavra) for palavra in siman.palavras_chave],
+        tem_assunto_original=siman.tem_assunto_original,
+    )
+
+
+def _alocado() -> int:
+    return tracemalloc.get_traced_memory()[0]
+
+
+def measure(csv_file: Path) -> Dict[str, int]:
+    processor = ImprovedShulchanAruchProcessor()
+
+    tracemalloc.start()
+    inicio = _alocado()
+    with contextlib.redirect_stdout(io.StringIO()):
+        compactos = processor.process_csv(str(csv_file))
+    compacta = _alocado() - inicio
+
+    inicio = _alocado()
+    legados = [legacy(siman) for siman in compactos]
+    anterior = _alocado() - inicio
+    tracemalloc.stop()
+
+    # Caracteres dos textos guardados em cada representação
+    texto_compacta = sum(sys.getsizeof(siman.seifim.content) for siman in compactos)
+    texto_anterior = sum(
+        sys.getsizeof(seif['conteudo']) + sys.getsizeof(seif['assunto'])
+        for siman in legados for seif in siman.seifim
+    )
+
+    return {
+        'simanim': len(legados),
+        'seifim': sum(len(siman.seifim) for siman in compactos),
+        'compacta': compacta,
+        'anterior': anterior,
+        'estrutura_compacta': compacta - texto_compacta,
+        'estrutura_anterior': anterior - texto_anterior,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Memória dos simanim processados: compacta x anterior")
+    parser.add_argument('--csv', dest='csv_file', help="CSV a processar (padrão: corpus sintético)")
+    parser.add_argument('--scale', type=float, default=1, help=f"Escala do corpus sintético ({ROWS_1X} simanim)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        csv_file = Path(args.csv_file) if args.csv_file else generate_corpus(
+            Path(temp_dir) / 'content_rows.csv', int(ROWS_1X * args.scale))
+        medidas = measure(csv_file)
+
+    reducao = medidas['anterior'] / medidas['compacta']
+    reducao_estrutura = medidas['estrutura_anterior'] / medidas['estrutura_compacta']
+    print(f"{medidas['simanim']} simanim, {medidas['seifim']} seifim")
+    print(f"   - Representação anterior: {medidas['anterior'] / 2**20:.1f} MiB "
+          f"({medidas['estrutura_anterior'] / 2**20:.1f} MiB sem os textos)")
+    print(f"   - Representação compacta: {medidas['compacta'] / 2**20:.1f} MiB "
+          f"({medidas['estrutura_compacta'] / 2**20:.1f} MiB sem os textos)")
+    print(f"   - Redução total: {reducao:.1f}x (mínimo {REDUCAO_MINIMA}x)")
+    print(f"   - Redução da estrutura: {reducao_estrutura:.1f}x (mínimo {REDUCAO_MINIMA_ESTRUTURA}x)")
+    sys.exit(0 if reducao >= REDUCAO_MINIMA and reducao_estrutura >= REDUCAO_MINIMA_ESTRUTURA else 1)
+
+
+if __name__ == "__main__":
+    main()
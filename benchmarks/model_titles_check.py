@@ -0,0 +1,109 @@
+"""
+Conferência do backend de títulos por modelo (shulchan_pipeline/model_titles.py)
+
+Sobe o stub local (title_model_stub.py), processa o corpus duas vezes com o
+mesmo cache e confere que:
+
+- só os simanim que caem no fallback recebem título do modelo, e os demais
+  saem iguais ao processamento sem modelo, na mesma ordem;
+- palavras-chave, categorias e tags dos que receberam título do modelo são
+  as que o processamento daria com esse título;
+- nenhuma requisição passou do lote nem da concorrência configurados;
+- a segunda execução não chama o endpoint (tudo vem do cache) e dá os
+  mesmos títulos; com outro endpoint o cache não é reaproveitado.
+
+Sai com código 1 se alguma conferência falhar.
+
+    python benchmarks/model_titles_check.py
+    python benchmarks/model_titles_check.py --delay 0.05 --concurrency 3 --batch 5
+"""
+
+import argparse
+import contextlib
+import io
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from process_content_improved import ImprovedShulchanAruchProcessor  # noqa: E402
+from shulchan_pipeline.model_titles import (MAX_CONTEUDO, MAX_RESUMIDO, ModelTitleClient, ModelTitles,  # noqa: E402
+                                           TitleCache)
+from synthetic_corpus import generate_corpus  # noqa: E402
+from title_model_stub import start_stub, stub_title  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Conferência do backend de títulos por modelo")
+    parser.add_argument('--rows', type=int, default=500, help="Simanim do corpus sintético")
+    parser.add_argument('--delay', type=float, default=0.02, help="Espera do stub por requisição (s)")
+    parser.add_argument('--concurrency', type=int, default=3)
+    parser.add_argument('--batch', type=int, default=4)
+    args = parser.parse_args()
+
+    server, state, url = start_stub(delay=args.delay)
+    falhas = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        csv_file = generate_corpus(Path(temp_dir) / 'content_rows.csv', args.rows)
+        cache_file = Path(temp_dir) / 'titulos.jsonl'
+        processor = ImprovedShulchanAruchProcessor()
+        with contextlib.redirect_stdout(io.StringIO()):
+            base = processor.process_csv(str(csv_file))
+        fallback = [processor.uses_fallback_title(siman) for siman in base]
+
+        # Referência: o processamento com a estratégia de título trocada pela do stub
+        referencia = ImprovedShulchanAruchProcessor()
+        referencia.batch_strategies = referencia.batch_strategies._replace(
+            title=lambda content, encontradas: (*stub_title(content[:MAX_CONTEUDO]), 0.7, False))
+        with contextlib.redirect_stdout(io.StringIO()):
+            com_titulo_do_stub = referencia.process_csv(str(csv_file))
+
+        execucoes = []
+        for endpoint in (url, url, f"{url}?modelo=outro"):
+            client = ModelTitleClient(endpoint, args.concurrency, timeout=10)
+            inicio = time.perf_counter()
+            with ModelTitles(client, TitleCache(cache_file), args.batch) as titulos, \
+                    contextlib.redirect_stdout(io.StringIO()):
+                simanim = list(titulos.enrich(processor.iter_csv(str(csv_file)), processor.uses_fallback_title,
+                                              processor.apply_title))
+            execucoes.append((simanim, titulos.report(), time.perf_counter() - inicio))
+    server.shutdown()
+
+    (primeira, contadores, duracao), (segunda, contadores_cache, duracao_cache), (_, contadores_outro, _) = execucoes
+    for original, siman, caiu in zip(base, primeira, fallback):
+        esperado = (stub_title(original.seifim.content[:MAX_CONTEUDO]) if caiu
+                    else (original.assunto, original.assunto_resumido))
+        if siman.original_id != original.original_id or (siman.assunto, siman.assunto_resumido) != esperado:
+            falhas.append(f"siman {original.original_id}: {siman.assunto!r}")
+        if len(siman.assunto_resumido) > MAX_RESUMIDO:
+            falhas.append(f"siman {original.original_id}: assunto_resumido com {len(siman.assunto_resumido)} caracteres")
+    for siman, esperado, caiu in zip(primeira, com_titulo_do_stub, fallback):
+        campos = ('categoria', 'categorias', 'tags', 'palavras_chave')
+        if caiu and [getattr(siman, campo) for campo in campos] != [getattr(esperado, campo) for campo in campos]:
+            falhas.append(f"siman {siman.original_id}: palavras-chave, categorias ou tags não refeitas pelo título")
+    if len(primeira) != len(base):
+        falhas.append(f"{len(primeira)} simanim em vez de {len(base)}")
+    if state.maior_lote > args.batch:
+        falhas.append(f"requisição com {state.maior_lote} itens (lote: {args.batch})")
+    if state.max_simultaneas > args.concurrency:
+        falhas.append(f"{state.max_simultaneas} requisições simultâneas (limite: {args.concurrency})")
+    if contadores_cache['chamadas'] or contadores_cache.get('cache', 0) != sum(fallback):
+        falhas.append(f"a segunda execução não veio toda do cache: {contadores_cache}")
+    if [(s.assunto, s.assunto_resumido) for s in segunda] != [(s.assunto, s.assunto_resumido) for s in primeira]:
+        falhas.append("títulos diferentes na segunda execução")
+    if contadores_outro.get('cache', 0) or not contadores_outro['chamadas']:
+        falhas.append(f"outro endpoint reaproveitou o cache: {contadores_outro}")
+
+    print(f"{len(base)} simanim, {sum(fallback)} no fallback")
+    print(f"   - com o endpoint: {contadores['chamadas']} requisições, {state.itens} itens, até "
+          f"{state.max_simultaneas} simultâneas, maior lote {state.maior_lote} ({duracao * 1000:.0f} ms)")
+    print(f"   - com o cache: {contadores_cache['chamadas']} requisições ({duracao_cache * 1000:.0f} ms)")
+    for falha in falhas[:10]:
+        print(f"   FALHA: {falha}")
+    sys.exit(1 if falhas else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""
+Servidor local com o subconjunto do PostgREST usado pelo PostgrestSink (shulchan_pipeline/postgrest.py)
+
+Guarda as tabelas geradas em memória, pela coluna id, e responde como o
+PostgREST (e a API REST do Supabase) às requisições do sink:
+
+    POST   /<tabela>?on_conflict=id        upsert (Prefer: resolution=merge-duplicates)
+    GET    /<tabela>?select=id&<filtros>&order=id&offset=N   (até --max-rows linhas; Content-Range)
+    DELETE /<tabela>?<filtros>
+
+Filtros: coluna=eq.valor, coluna=in.(a,"b,c") e coluna=not.in.(...). As
+conexões são HTTP/1.1 keep-alive. Conta as requisições, as conexões e o
+máximo de requisições simultâneas, e pode responder 503 a cada N requisições
+para testar as novas tentativas.
+
+    python benchmarks/postgrest_stub.py --port 8766 --api-key teste
+    POSTGREST_API_KEY=teste python process_content_improved.py --database http://127.0.0.1:8766/rest/v1
+"""
+
+import argparse
+import json
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from shulchan_pipeline.sql_writer import TABLES  # noqa: E402
+
+_ITEM = re.compile(r'"((?:[^"\\]|\\.)*)"|([^,]+)')
+
+
+def _lista(texto: str) -> List[str]:
+    """Valores de '(a,"b,c")'"""
+
+    if not (texto.startswith('(') and texto.endswith(')')):
+        raise ValueError(f"lista inválida: {texto}")
+    return [re.sub(r'\\(.)', r'\1', entre_aspas) if entre_aspas else simples
+            for entre_aspas, simples in _ITEM.findall(texto[1:-1])]
+
+
+def _filtro(coluna: str, expressao: str) -> Callable[[Dict[str, Any]], bool]:
+    if expressao.startswith('eq.'):
+        valor = expressao[3:]
+        return lambda row: str(row.get(coluna)) == valor
+    if expressao.startswith('in.'):
+        valores = set(_lista(expressao[3:]))
+        return lambda row: str(row.get(coluna)) in valores
+    if expressao.startswith('not.in.'):
+        valores = set(_lista(expressao[7:]))
+        return lambda row: str(row.get(coluna)) not in valores
+    raise ValueError(f"filtro não suportado: {coluna}={expressao}")
+
+
+class StubState:
+    """Tabelas em memória, contadores e falhas injetadas"""
+
+    def __init__(self, api_key: Optional[str] = None, delay: float = 0.0, fail_every: int = 0, max_rows: int = 1000):
+        self.api_key = api_key
+        self.delay = delay
+        self.fail_every = fail_every
+        self.max_rows = max_rows
+        self.tabelas: Dict[str, Dict[str, Dict[str, Any]]] = {table: {} for table in TABLES}
+        self.requisicoes = 0
+        self.metodos: Counter = Counter()
+        self.conexoes = 0
+        self.simultaneas = 0
+        self.max_simultaneas = 0
+        self.lock = threading.Lock()
+
+    def rows(self, table: str) -> Dict[str, Dict[str, Any]]:
+        with self.lock:
+            return {id_: dict(row) for id_, row in self.tabelas[table].items()}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+    state: StubState
+
+    def setup(self) -> None:
+        super().setup()
+        with self.state.lock:
+            self.state.conexoes += 1
+
+    def handle(self) -> None:
+        try:
+            super().handle()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # o cliente desistiu da requisição (ex.: cancelada depois de um erro)
+
+    def do_POST(self) -> None:  # noqa: N802 - nomes do http.server
+        self._handle(self._post)
+
+    def do_GET(self) -> None:  # noqa: N802
+        self._handle(self._get)
+
+    def do_DELETE(self) -> None:  # noqa: N802
+        self._handle(self._delete)
+
+    def _handle(self, metodo: Callable[[str, List[Tuple[str, str]], Optional[bytes]], None]) -> None:
+        state = self.state
+        tamanho = int(self.headers.get('Content-Length') or 0)
+        corpo = self.rfile.read(tamanho) if tamanho else None
+        with state.lock:
+            state.requisicoes += 1
+            state.metodos[self.command] += 1
+            numero = state.requisicoes
+            state.simultaneas += 1
+            state.max_simultaneas = max(state.max_simultaneas, state.simultaneas)
+        try:
+            time.sleep(state.delay)
+            if state.api_key and (self.headers.get('apikey') != state.api_key
+                                  or self.headers.get('Authorization') != f"Bearer {state.api_key}"):
+                self._send(401, {'message': 'Invalid API key'})
+                return
+            if state.fail_every and numero % state.fail_every == 0:
+                self._send(503, {'message': 'falha injetada'}, {'Retry-After': '0'})
+                return
+            partes = urlsplit(self.path)
+            table = partes.path.rstrip('/').rpartition('/')[2]
+            if table not in TABLES:
+                self._send(404, {'message': f'relation "{table}" does not exist'})
+                return
+            metodo(table, parse_qsl(partes.query, keep_blank_values=True), corpo)
+        except (ValueError, KeyError, TypeError) as erro:
+            self._send(400, {'message': str(erro)})
+        finally:
+            with state.lock:
+                state.simultaneas -= 1
+
+    def _filtros(self, parametros: List[Tuple[str, str]]) -> List[Callable[[Dict[str, Any]], bool]]:
+        return [_filtro(coluna, valor) for coluna, valor in parametros
+                if coluna not in ('select', 'order', 'offset', 'limit', 'on_conflict')]
+
+    def _post(self, table: str, parametros: List[Tuple[str, str]], corpo: Optional[bytes]) -> None:
+        upsert = 'resolution=merge-duplicates' in self.headers.get('Prefer', '')
+        if not upsert or dict(parametros).get('on_conflict') != 'id':
+            raise ValueError("só upserts por id (on_conflict=id, Prefer: resolution=merge-duplicates)")
+        linhas = json.loads(corpo)
+        colunas = set(TABLES[table].column_names)
+        for row in linhas:
+            if set(row) != colunas:
+                raise ValueError(f"colunas diferentes das de {table}: {sorted(set(row) ^ colunas)}")
+        with self.state.lock:
+            for row in linhas:
+                self.state.tabelas[table].setdefault(row['id'], {}).update(row)
+        self._send(201, None)
+
+    def _get(self, table: str, parametros: List[Tuple[str, str]], corpo: Optional[bytes]) -> None:
+        opcoes = dict(parametros)
+        filtros = self._filtros(parametros)
+        with self.state.lock:
+            linhas = [row for row in self.state.tabelas[table].values() if all(filtro(row) for filtro in filtros)]
+        if opcoes.get('order') == 'id':
+            linhas.sort(key=lambda row: row['id'])
+        inicio = int(opcoes.get('offset', 0))
+        pagina = linhas[inicio:inicio + self.state.max_rows]
+        colunas = opcoes.get('select', '*')
+        if colunas != '*':
+            pagina = [{coluna: row[coluna] for coluna in colunas.split(',')} for row in pagina]
+        total = str(len(linhas)) if 'count=exact' in self.headers.get('Prefer', '') else '*'
+        intervalo = f"{inicio}-{inicio + len(pagina) - 1}" if pagina else '*'
+        self._send(200, pagina, {'Content-Range': f"{intervalo}/{total}"})
+
+    def _delete(self, table: str, parametros: List[Tuple[str, str]], corpo: Optional[bytes]) -> None:
+        filtros = self._filtros(parametros)
+        if not filtros:
+            raise ValueError("DELETE sem filtro")
+        with self.state.lock:
+            tabela = self.state.tabelas[table]
+            for id_ in [id_ for id_, row in tabela.items() if all(filtro(row) for filtro in filtros)]:
+                del tabela[id_]
+        self._send(204, None)
+
+    def _send(self, status: int, corpo: Any, headers: Optional[Dict[str, str]] = None) -> None:
+        dados = json.dumps(corpo, ensure_ascii=False).encode('utf-8') if corpo is not None else b''
+        self.send_response(status)
+        if corpo is not None:
+            self.send_header('Content-Type', 'application/json')
+        for nome, valor in (headers or {}).items():
+            self.send_header(nome, valor)
+        if status != 204:
+            self.send_header('Content-Length', str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+def start_stub(port: int = 0, api_key: Optional[str] = None, delay: float = 0.0, fail_every: int = 0,
+               max_rows: int = 1000) -> Tuple[ThreadingHTTPServer, StubState, str]:
+    """Sobe o stub em uma thread; devolve o servidor, o estado e a URL base (como .../rest/v1)"""
+
+    state = StubState(api_key, delay, fail_every, max_rows)
+    handler = type('StubHandler', (_Handler,), {'state': state})
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='postgrest-stub', daemon=True).start()
+    return server, state, f"http://127.0.0.1:{server.server_address[1]}/rest/v1"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Stub local do PostgREST para o PostgrestSink")
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--api-key', help="Exige essa chave nos cabeçalhos apikey e Authorization")
+    parser.add_argument('--delay', type=float, default=0.0, help="Segundos de espera por requisição")
+    parser.add_argument('--fail-every', type=int, default=0, help="Responde 503 a cada N requisições")
+    parser.add_argument('--max-rows', type=int, default=1000, help="Linhas no máximo por resposta de GET")
+    args = parser.parse_args()
+
+    server, state, url = start_stub(args.port, args.api_key, args.delay, args.fail_every, args.max_rows)
+    print(f"Stub do PostgREST em {url} (Ctrl+C para parar)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+        linhas = ', '.join(f"{table} {len(rows)}" for table, rows in state.tabelas.items())
+        print(f"{state.requisicoes} requisições ({dict(state.metodos)}) em {state.conexoes} conexões, "
+              f"até {state.max_simultaneas} simultâneas; linhas: {linhas}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Conferência da carga por PostgREST (shulchan_pipeline/postgrest.py) contra o stub local
+
+Processa o corpus sintético e carrega os simanim no stub (benchmarks/postgrest_stub.py)
+com o PostgrestSink, com 503 injetados e respostas de GET limitadas como no
+Supabase. Confere que:
+
+- as tabelas do stub têm exatamente as linhas de sql_rows de cada siman;
+- uma segunda carga, com simanim alterados (seifim e tags a menos) e
+  removidos, deixa só as linhas novas;
+- as requisições respeitam a concorrência, as conexões são reaproveitadas e
+  nunca há mais lotes em andamento do que conexões (o processamento espera);
+- uma chave errada termina com PostgrestError.
+
+Mede também a carga com latência simulada no stub, com 1 conexão e com
+--connections. Sai com código 1 se alguma conferência falhar.
+
+    python benchmarks/postgrest_upload_check.py
+    python benchmarks/postgrest_upload_check.py --connections 16 --delay 0.02
+"""
+
+import argparse
+import contextlib
+import io
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from postgrest_stub import start_stub  # noqa: E402
+from process_content_improved import ImprovedShulchanAruchProcessor  # noqa: E402
+from shulchan_pipeline.postgrest import PostgrestError, PostgrestSink  # noqa: E402
+from shulchan_pipeline.sql_writer import TABLES  # noqa: E402
+from synthetic_corpus import ROWS_1X, generate_corpus  # noqa: E402
+
+CHAVE = 'chave-de-teste'
+
+
+def esperado(simanim: List[Tuple[str, List[Tuple[str, Tuple[Any, ...]]]]]) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """Linhas esperadas no stub: {tabela: {id: {coluna: valor}}} (arrays como listas, como no JSON)"""
+
+    tabelas: Dict[str, Dict[str, Dict[str, Any]]] = {table: {} for table in TABLES}
+    for _, rows in simanim:
+        for table, row in rows:
+            valores = [list(valor) if isinstance(valor, tuple) else valor for valor in row]
+            tabelas[table][row[0]] = dict(zip(TABLES[table].column_names, valores))
+    return tabelas
+
+
+def carregar(url: str, secoes, simanim, connections: int, batch_size: int, request_rows: int = 1000,
+             removidos=(), api_key: str = CHAVE) -> Tuple[PostgrestSink, float, int]:
+    """Carrega os simanim; devolve o sink, a duração e o máximo de lotes em andamento"""
+
+    inicio = time.perf_counter()
+    em_andamento = 0
+    with PostgrestSink(url, secoes, batch_size, connections, backoff=0.01, api_key=api_key,
+                       request_rows=request_rows) as sink:
+        for siman_id, rows in simanim:
+            sink.write_siman(siman_id, rows)
+            em_andamento = max(em_andamento, sum(not future.done() for future in sink._futures))
+        for siman_id in removidos:
+            sink.delete_siman(siman_id)
+    return sink, time.perf_counter() - inicio, em_andamento
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Conferência da carga por PostgREST contra o stub")
+    parser.add_argument('--scale', type=float, default=0.5, help=f"Escala do corpus sintético ({ROWS_1X} simanim)")
+    parser.add_argument('--connections', type=int, default=8, help="Requisições e lotes simultâneos")
+    parser.add_argument('--batch-size', type=int, default=2000, help="Linhas por lote")
+    parser.add_argument('--delay', type=float, default=0.01, help="Latência simulada do stub na medição (s)")
+    args = parser.parse_args()
+
+    falhas = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        csv_file = generate_corpus(Path(temp_dir) / 'content_rows.csv', int(ROWS_1X * args.scale))
+        processor = ImprovedShulchanAruchProcessor()
+        with contextlib.redirect_stdout(io.StringIO()):
+            simanim = [(siman.original_id, processor.sql_rows(siman)) for siman in processor.iter_csv(str(csv_file))]
+    secoes = processor.sql_sections
+    linhas = sum(len(rows) for _, rows in simanim)
+
+    # Carga completa com falhas injetadas e GET limitado a 100 linhas por resposta
+    server, state, url = start_stub(api_key=CHAVE, fail_every=13, max_rows=100)
+    sink, duracao, em_andamento = carregar(url, secoes, simanim, args.connections, args.batch_size, request_rows=500)
+    if {table: state.rows(table) for table in TABLES} != esperado(simanim):
+        falhas.append("carga completa: linhas do stub diferentes de sql_rows")
+    if state.max_simultaneas > args.connections:
+        falhas.append(f"{state.max_simultaneas} requisições simultâneas (máximo {args.connections})")
+    if state.conexoes > args.connections:
+        falhas.append(f"{state.conexoes} conexões abertas (máximo {args.connections}, reaproveitadas)")
+    if em_andamento > args.connections:
+        falhas.append(f"{em_andamento} lotes em andamento (máximo {args.connections})")
+    if not sink.client.tentativas_refeitas:
+        falhas.append("nenhuma requisição refeita com os 503 injetados")
+    print(f"carga: {len(simanim)} simanim, {linhas} linhas em {sink.lotes} lotes, {sink.client.requisicoes} "
+          f"requisições ({dict(state.metodos)}), {state.conexoes} conexões, {sink.client.tentativas_refeitas} "
+          f"refeitas, até {state.max_simultaneas} simultâneas e {em_andamento} lotes em andamento; {duracao:.2f}s")
+
+    # Segunda carga: simanim alterados (último seif e última tag a menos) e removidos
+    alterados = []
+    for indice, (siman_id, rows) in enumerate(simanim):
+        if indice % 5 == 0:
+            seifim = [i for i, (table, _) in enumerate(rows) if table == 'seifim']
+            tags = [i for i, (table, _) in enumerate(rows) if table == 'siman_tags']
+            fora = {seifim[-1]} | set(tags[-1:])
+            rows = [linha for i, linha in enumerate(rows) if i not in fora]
+        alterados.append((siman_id, rows))
+    removidos = [siman_id for siman_id, _ in alterados[1::7]]
+    mantidos = [(siman_id, rows) for siman_id, rows in alterados if siman_id not in set(removidos)]
+    carregar(url, secoes, [item for item in alterados if item[0] not in set(removidos)], args.connections,
+             args.batch_size, removidos=removidos)
+    if {table: state.rows(table) for table in TABLES} != esperado(mantidos):
+        falhas.append("segunda carga: linhas alteradas ou removidas não conferem")
+    server.shutdown()
+
+    # Chave errada: o erro do endpoint chega ao processamento
+    server, state, url = start_stub(api_key=CHAVE)
+    try:
+        carregar(url, secoes, simanim[:50], args.connections, args.batch_size, api_key='errada')
+        falhas.append("chave errada: carga terminou sem erro")
+    except PostgrestError as erro:
+        if erro.status != 401:
+            falhas.append(f"chave errada: {erro}")
+    server.shutdown()
+
+    # Latência simulada: as requisições simultâneas escondem a espera de cada uma
+    for connections in (1, args.connections):
+        server, state, url = start_stub(api_key=CHAVE, delay=args.delay)
+        sink, duracao, _ = carregar(url, secoes, simanim, connections, args.batch_size)
+        server.shutdown()
+        print(f"{args.delay * 1000:.0f} ms por requisição, {connections:>2} conexões: {duracao:.2f}s "
+              f"({linhas / duracao:.0f} linhas/s, {sink.client.requisicoes} requisições)")
+
+    for falha in falhas[:10]:
+        print(f"   FALHA: {falha}")
+    sys.exit(1 if falhas else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Conferência dos seifim relacionados (shulchan_pipeline/related.py)
+
+Processa o corpus sintético e acrescenta um "comentário": cópias de seifim
+sorteados com uma parte das palavras trocada, cada uma em um siman próprio.
+Confere que:
+
+- cada cópia tem o seif de origem como o relacionado mais parecido (recall
+  mínimo RECALL_MINIMO);
+- nenhum relacionado é do mesmo siman e nenhum seif passa de LIMITE;
+- a similaridade estimada fica perto do Jaccard exato dos shingles;
+- o arquivo compacto devolve o mesmo que o cálculo em memória.
+
+Mede o tempo das assinaturas e do LSH, os pares comparados (contra todos os
+pares) e o tempo de uma consulta no arquivo. Sai com código 1 se alguma
+conferência falhar.
+
+    python benchmarks/related_seifim_check.py
+    python benchmarks/related_seifim_check.py --scale 5 --copies 2000 --noise 0.2
+"""
+
+import argparse
+import contextlib
+import io
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from process_content_improved import ImprovedShulchanAruchProcessor  # noqa: E402
+from shulchan_pipeline.ids import stable_id  # noqa: E402
+from shulchan_pipeline.related import LIMITE, RelatedSeifim, RelatedSeifimBuilder, shingles  # noqa: E402
+from synthetic_corpus import PALAVRAS_COMUNS, ROWS_1X, generate_corpus  # noqa: E402
+
+# Fração mínima das cópias que precisam achar a origem em primeiro lugar
+RECALL_MINIMO = 0.95
+# Diferença média máxima entre a similaridade estimada e o Jaccard exato
+ERRO_MAXIMO = 0.05
+
+
+def _copia(rng: random.Random, texto: str, ruido: float) -> str:
+    palavras = texto.split()
+    return " ".join(rng.choice(PALAVRAS_COMUNS) if rng.random() < ruido else palavra for palavra in palavras)
+
+
+def _jaccard(a: str, b: str) -> float:
+    x, y = set(shingles(a)), set(shingles(b))
+    return len(x & y) / len(x | y) if x | y else 0.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Conferência dos seifim relacionados (MinHash/LSH)")
+    parser.add_argument('--scale', type=float, default=1, help=f"Escala do corpus sintético ({ROWS_1X} simanim)")
+    parser.add_argument('--copies', type=int, default=500, help="Seifim copiados no comentário")
+    parser.add_argument('--noise', type=float, default=0.1, help="Fração das palavras trocadas em cada cópia")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    falhas = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        csv_file = generate_corpus(Path(temp_dir) / 'content_rows.csv', int(ROWS_1X * args.scale))
+        processor = ImprovedShulchanAruchProcessor()
+        with contextlib.redirect_stdout(io.StringIO()):
+            simanim = processor.process_csv(str(csv_file))
+
+        builder = RelatedSeifimBuilder()
+        textos = {}
+        inicio = time.perf_counter()
+        for siman in simanim:
+            builder.add_siman(siman)
+            for seif in siman.seifim:
+                textos[stable_id('seifim', siman.original_id, seif['numero'])] = seif['conteudo']
+        # Seifim com ao menos 2 frases: os curtos demais não têm shingles suficientes para uma cópia com ruído
+        origens = rng.sample(sorted(doc_id for doc_id, texto in textos.items() if texto.count('.') > 2), args.copies)
+        copias = {}
+        for numero, origem in enumerate(origens):
+            copia_id = stable_id('comentario', numero)
+            copias[copia_id] = origem
+            textos[copia_id] = _copia(rng, textos[origem], args.noise)
+            builder.add_document(copia_id, stable_id('comentario_siman', numero), textos[copia_id])
+        duracao_shingles = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        offsets, _, _ = builder.compute()
+        duracao = time.perf_counter() - inicio
+        documentos = len(builder)
+
+        ids = builder._ids
+        achadas = 0
+        erros = []
+        for documento, doc_id in enumerate(ids):
+            relacionados = builder.related(documento)
+            if len(relacionados) > LIMITE:
+                falhas.append(f"{doc_id}: {len(relacionados)} relacionados")
+            if any(relacionado.siman_id == builder._simanim[documento] for relacionado in relacionados):
+                falhas.append(f"{doc_id}: relacionado do mesmo siman")
+            if doc_id in copias:
+                achadas += bool(relacionados) and relacionados[0].id == copias[doc_id]
+            for relacionado in relacionados[:1]:
+                erros.append(abs(relacionado.similaridade - _jaccard(textos[doc_id], textos[relacionado.id])))
+        recall = achadas / len(copias)
+        if recall < RECALL_MINIMO:
+            falhas.append(f"recall {recall:.3f} (mínimo {RECALL_MINIMO})")
+        erro_medio = sum(erros) / len(erros) if erros else 0.0
+        if erro_medio > ERRO_MAXIMO:
+            falhas.append(f"erro médio da similaridade {erro_medio:.3f} (máximo {ERRO_MAXIMO})")
+
+        arquivo = Path(temp_dir) / 'seifim.related'
+        builder.write(arquivo)
+        with RelatedSeifim(arquivo) as relacionados:
+            for documento in range(0, documentos, 7):
+                if relacionados.related(ids[documento]) != builder.related(documento):
+                    falhas.append(f"{ids[documento]}: arquivo diferente do cálculo em memória")
+            inicio = time.perf_counter()
+            for doc_id in ids:
+                relacionados.related(doc_id)
+            consulta = (time.perf_counter() - inicio) / documentos
+        tamanho = arquivo.stat().st_size
+
+    pares = int(offsets[-1]) // 2
+    print(f"{documentos} seifim ({len(copias)} cópias com {args.noise:.0%} das palavras trocadas)")
+    print(f"   - shingles: {duracao_shingles * 1000:.0f} ms; assinaturas e LSH: {duracao * 1000:.0f} ms")
+    print(f"   - pares comparados: {builder.candidatos} de {documentos * (documentos - 1) // 2}; "
+          f"relacionados: {pares}")
+    print(f"   - recall das cópias: {recall:.3f}; erro médio da similaridade: {erro_medio:.3f}")
+    print(f"   - arquivo: {tamanho / 1024:.0f} KiB; consulta: {consulta * 1e6:.1f} µs")
+    for falha in falhas[:10]:
+        print(f"   FALHA: {falha}")
+    sys.exit(1 if falhas else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Benchmarks dos processadores do Shulchan Aruch sobre corpora sintéticos
+
+Para cada escala (múltiplos de 1.863 simanim) e cada processador, processa o
+CSV em streaming como o main() dos scripts e mede o tempo de cada etapa:
+análise do texto, cabeçalho/título, separação dos seifim, categorias e tags,
+palavras-chave e geração do SQL. O resultado vai para um arquivo JSON, que
+pode ser comparado com o de uma execução anterior (--compare).
+
+    python benchmarks/run_benchmarks.py --scales 1,10,100 -o benchmark_results.json
+    python benchmarks/run_benchmarks.py --scales 1 --compare benchmark_results.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+from process_content_improved import ImprovedShulchanAruchProcessor  # noqa: E402
+from process_content_with_ai import ShulchanAruchProcessor  # noqa: E402
+from shulchan_pipeline import SqlWriter  # noqa: E402
+from synthetic_corpus import ROWS_1X, generate_corpus  # noqa: E402
+
+PROCESSORS = {
+    'ai': ShulchanAruchProcessor,
+    'improved': ImprovedShulchanAruchProcessor,
+}
+
+# Método -> etapa, somando o tempo próprio (RunMetrics) de cada método: chamadas
+# aninhadas (ex.: rank_palavras_chave dentro de extract_seifim) contam na própria
+# etapa. O que sobra de process_batch (normalização e busca das palavras-chave) é a análise.
+STAGES = {
+    'process_batch': 'analise',
+    'extract_assunto_improved': 'cabecalho',
+    'generate_specific_title': 'cabecalho',
+    'extract_assunto': 'cabecalho',
+    'generate_assunto_from_content': 'cabecalho',
+    'parse_siman': 'seifim',
+    'extract_seifim': 'seifim',
+    'extract_seif_assunto': 'seifim',
+    'categorize_assunto': 'categorias_tags',
+    'extract_tags': 'categorias_tags',
+    'score_categories': 'categorias_tags',
+    'rank_palavras_chave': 'palavras_chave',
+    'rank_documentos': 'palavras_chave',
+    'sql_rows': 'sql',
+    'SqlWriter.write_many': 'sql',
+    'SqlWriter.close': 'sql',
+}
+
+
+class _NullOutput(io.TextIOBase):
+    """Saída descartada; conta só os caracteres escritos"""
+
+    def __init__(self):
+        self.caracteres = 0
+
+    def write(self, texto: str) -> int:
+        self.caracteres += len(texto)
+        return len(texto)
+
+
+def run_one(nome: str, csv_file: Path, formato: str) -> Dict[str, Any]:
+    """Processa o CSV com um processador e devolve as métricas"""
+
+    processor = PROCESSORS[nome]()
+    metrics = processor.metrics
+    # Além dos métodos instrumentados pelo processador
+    metrics.instrument(processor, ['process_batch', 'extract_seif_assunto'])
+
+    saida = _NullOutput()
+    simanim = seifim = 0
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        with SqlWriter(saida, processor.sql_sections, formato) as writer:
+            metrics.instrument(writer, ['write_many', 'close'], 'SqlWriter.')
+            for siman in processor.iter_csv(str(csv_file)):
+                writer.write_many(processor.sql_rows(siman))
+                simanim += 1
+                seifim += len(siman.seifim)
+    total = time.perf_counter() - inicio
+
+    segundos: Dict[str, float] = defaultdict(float)
+    chamadas: Counter = Counter()
+    for metodo, etapa in STAGES.items():
+        segundos[etapa] += metrics.segundos_proprios[metodo]
+        chamadas[etapa] += metrics.chamadas[metodo]
+    etapas = {
+        etapa: {'seconds': round(segundos[etapa], 4), 'calls': chamadas[etapa]}
+        for etapa in dict.fromkeys(STAGES.values())
+    }
+    # Leitura do CSV e o laço em si
+    etapas['csv'] = {'seconds': round(total - sum(segundos.values()), 4), 'calls': simanim}
+
+    return {
+        'processor': nome,
+        'format': formato,
+        'simanim': simanim,
+        'seifim': seifim,
+        'errors': len(processor.errors),
+        'sql_chars': saida.caracteres,
+        'seconds': round(total, 4),
+        'rows_per_second': round(simanim / total, 1) if total else None,
+        'stages': etapas,
+        'header_patterns': dict(metrics.contadores['padroes_cabecalho']),
+        'peak_memory_kb': metrics.peak_memory_kb()['processo'],
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=RAIZ, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(resultados: List[Dict[str, Any]], baseline_file: str) -> None:
+    """Mostra a razão (atual / anterior) do tempo de cada etapa"""
+
+    with open(baseline_file, 'r', encoding='utf-8') as f:
+        anteriores = {
+            (r['processor'], r['scale'], r['format']): r for r in json.load(f)['results']
+        }
+
+    print(f"\nComparação com {baseline_file} (atual / anterior):")
+    for atual in resultados:
+        anterior = anteriores.get((atual['processor'], atual['scale'], atual['format']))
+        if anterior is None:
+            continue
+        razoes = [f"total {atual['seconds'] / anterior['seconds']:.2f}x"]
+        for etapa, medida in atual['stages'].items():
+            antes = anterior['stages'].get(etapa, {}).get('seconds')
+            if antes:
+                razoes.append(f"{etapa} {medida['seconds'] / antes:.2f}x")
+        print(f"  {atual['processor']:>8} {atual['scale']:>5}x: " + ", ".join(razoes))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmarks dos processadores sobre corpora sintéticos")
+    parser.add_argument('--scales', default='1,10,100', help=f"Escalas (múltiplos de {ROWS_1X} simanim)")
+    parser.add_argument('--processors', default=','.join(PROCESSORS), help="Processadores: ai, improved")
+    parser.add_argument('--format', dest='formato', default='insert', help="Formato do SQL gerado")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--data-dir', help="Diretório para guardar e reaproveitar os CSVs gerados")
+    parser.add_argument('-o', '--output', default='benchmark_results.json')
+    parser.add_argument('--compare', help="Resultado anterior (JSON) para comparar")
+    args = parser.parse_args()
+
+    escalas = [float(escala) for escala in args.scales.split(',')]
+    nomes = [nome.strip() for nome in args.processors.split(',')]
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        data_dir = Path(args.data_dir or temp_dir)
+        data_dir.mkdir(parents=True, exist_ok=True)
+
+        resultados = []
+        for escala in escalas:
+            rows = int(ROWS_1X * escala)
+            csv_file = data_dir / f"content_rows_{rows}_seed{args.seed}.csv"
+            if not csv_file.exists():
+                print(f"Gerando corpus {escala:g}x ({rows} simanim)...")
+                generate_corpus(csv_file, rows, args.seed)
+
+            for nome in nomes:
+                resultado = run_one(nome, csv_file, args.formato)
+                resultado['scale'] = escala
+                resultado['csv_bytes'] = os.path.getsize(csv_file)
+                resultados.append(resultado)
+
+                etapas = ", ".join(f"{etapa} {medida['seconds']:.2f}s" for etapa, medida in resultado['stages'].items())
+                print(f"{nome:>8} {escala:>5g}x: {resultado['seconds']:.2f}s "
+                      f"({resultado['rows_per_second']} simanim/s) - {etapas}")
+
+    relatorio = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'git_commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'seed': args.seed,
+        },
+        'results': resultados,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, indent=2, ensure_ascii=False)
+    print(f"\nResultados gravados em {args.output}")
+
+    if args.compare:
+        compare(resultados, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Latência das buscas no índice BM25 (shulchan_pipeline/search_index.py)
+
+Processa o corpus, grava o índice e mede o tempo de SearchIndex.search para
+consultas de 1 a 3 termos sorteados pela frequência no corpus (termos
+comuns, com postings longos, são os mais sorteados). O corpus sintético tem
+um vocabulário pequeno, então cada termo aparece em boa parte dos seifim: é
+um caso pior que o real para o tamanho dos postings.
+Sai com código 1 se a mediana passar de LATENCIA_MAXIMA_MS (com NumPy; a
+pontuação em Python puro, --python, é só medida).
+
+    python benchmarks/search_latency.py                      # corpus sintético 1x
+    python benchmarks/search_latency.py --csv csv/content_rows.csv --queries 2000
+"""
+
+import argparse
+import contextlib
+import io
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from process_content_improved import ImprovedShulchanAruchProcessor  # noqa: E402
+from shulchan_pipeline.search_index import SearchIndex, SearchIndexBuilder, search_terms  # noqa: E402
+from synthetic_corpus import ROWS_1X, generate_corpus  # noqa: E402
+
+# Mediana máxima aceita por busca (10 resultados)
+LATENCIA_MAXIMA_MS = 1.0
+
+
+def build_index(csv_file: Path, index_file: Path) -> Counter:
+    """Grava o índice do CSV e devolve a frequência de cada termo indexado (para sortear consultas)"""
+
+    processor = ImprovedShulchanAruchProcessor()
+    builder = SearchIndexBuilder()
+    vocabulario: Counter = Counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for siman in processor.iter_csv(str(csv_file)):
+            builder.add_siman(siman)
+            vocabulario.update(search_terms(siman.assunto))
+            vocabulario.update(search_terms(siman.seifim.content))
+    builder.write(index_file)
+    return vocabulario
+
+
+def measure(index_file: Path, vocabulario: Counter, consultas: int, use_numpy: bool,
+            seed: int = 0) -> Dict[str, float]:
+    rng = random.Random(seed)
+    termos = sorted(vocabulario)
+    pesos = [vocabulario[termo] for termo in termos]
+    buscas = [' '.join(rng.choices(termos, pesos, k=rng.randint(1, 3))) for _ in range(consultas)]
+    tempos = []
+    with SearchIndex(index_file, use_numpy=use_numpy) as indice:
+        indice.search(buscas[0])
+        for busca in buscas:
+            inicio = time.perf_counter()
+            indice.search(busca, 10)
+            tempos.append(time.perf_counter() - inicio)
+        documentos = len(indice)
+
+    tempos.sort()
+    return {
+        'documentos': documentos,
+        'p50_ms': statistics.median(tempos) * 1000,
+        'p95_ms': tempos[int(len(tempos) * 0.95)] * 1000,
+        'max_ms': tempos[-1] * 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Latência das buscas no índice BM25")
+    parser.add_argument('--csv', dest='csv_file', help="CSV a indexar (padrão: corpus sintético)")
+    parser.add_argument('--scale', type=float, default=1, help=f"Escala do corpus sintético ({ROWS_1X} simanim)")
+    parser.add_argument('--queries', type=int, default=1000, help="Número de consultas")
+    parser.add_argument('--python', action='store_true', help="Pontua sem NumPy (só mede, sem limite)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        csv_file = Path(args.csv_file) if args.csv_file else generate_corpus(
+            Path(temp_dir) / 'content_rows.csv', int(ROWS_1X * args.scale))
+        index_file = Path(temp_dir) / 'seifim.bm25'
+        vocabulario = build_index(csv_file, index_file)
+        tamanho = index_file.stat().st_size
+        medidas = measure(index_file, vocabulario, args.queries, use_numpy=not args.python)
+
+    print(f"{medidas['documentos']} documentos, {len(vocabulario)} termos, índice com {tamanho / 2**20:.1f} MiB")
+    print(f"   - {args.queries} buscas: mediana {medidas['p50_ms']:.3f} ms, p95 {medidas['p95_ms']:.3f} ms, "
+          f"máximo {medidas['max_ms']:.3f} ms (limite da mediana: {LATENCIA_MAXIMA_MS} ms)")
+    sys.exit(0 if args.python or medidas['p50_ms'] <= LATENCIA_MAXIMA_MS else 1)
+
+
+if __name__ == "__main__":
+    main()
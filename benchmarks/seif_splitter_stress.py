@@ -0,0 +1,129 @@
+"""
+Teste de estresse da segmentação dos seifim em simanim muito longos
+
+Compara iter_seif_spans com as expressões regulares usadas antes em
+extract_seifim (mesmos seifim e offsets) e verifica que o tempo cresce de
+forma linear com o tamanho do siman. Sai com código 1 se algo falhar.
+
+    python benchmarks/seif_splitter_stress.py
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+from typing import Callable, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shulchan_pipeline.seifim import iter_seif_spans  # noqa: E402
+
+# Segmentação anterior (cabeçalho + lookahead a cada caractere)
+HEADER_PATTERN = re.compile(r'SIMAN\s+\d+.*?(?=\d+\.)', re.DOTALL)
+SEIF_PATTERN = re.compile(r'(\d+)\.\s+([^0-9].*?)(?=\d+\.|$)', re.DOTALL)
+
+PALAVRAS = ['lei', 'oração', 'sinagoga', 'carne', 'shabat', 'mulher', 'comunidade', 'tribunal', 'costume']
+
+# Razão máxima aceita entre o crescimento do tempo e o do tamanho
+TOLERANCIA = 2.0
+
+
+def legacy_spans(content: str) -> List[Tuple[int, str, int, int]]:
+    header = HEADER_PATTERN.match(content)
+    spans = []
+    for i, match in enumerate(SEIF_PATTERN.finditer(content, header.end() if header else 0)):
+        conteudo = match.group(2)
+        inicio = match.start(2) + len(conteudo) - len(conteudo.lstrip())
+        spans.append((i, match.group(1), inicio, inicio + len(conteudo.strip())))
+    return spans
+
+
+def new_spans(content: str) -> List[Tuple[int, str, int, int]]:
+    return [tuple(span) for span in iter_seif_spans(content)]
+
+
+def siman_texto(tamanho: int, rng: random.Random) -> str:
+    """Siman com seifim numerados e palavras comuns"""
+
+    partes = ["SIMAN 1 **Leis diversas Contém muitos seifim**\n"]
+    total = len(partes[0])
+    numero = 1
+    while total < tamanho:
+        seif = f"{numero}. " + " ".join(rng.choice(PALAVRAS) for _ in range(rng.randint(5, 40))) + ".\n"
+        partes.append(seif)
+        total += len(seif)
+        numero += 1
+    return "".join(partes)
+
+
+def siman_digitos(tamanho: int, rng: random.Random) -> str:
+    """Pior caso das expressões antigas: sequências longas de dígitos sem ponto"""
+
+    corpo = "".join(rng.choice("0123456789") for _ in range(tamanho))
+    return f"SIMAN 1 tabela\n1. valores {corpo} fim\n2. segundo seif com texto comum.\n"
+
+
+def medir(funcao: Callable[[str], object], content: str, repeticoes: int) -> float:
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(content)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument('--base', type=int, default=100_000, help="Tamanho (caracteres) do menor siman")
+    parser.add_argument('--passos', type=int, default=4, help="Quantidade de tamanhos (dobrando a cada passo)")
+    parser.add_argument('--legacy-max', type=int, default=20_000,
+                        help="Maior siman de dígitos medido com as expressões antigas (quadráticas)")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    ok = True
+
+    for nome, gerar in (('texto', siman_texto), ('digitos', siman_digitos)):
+        print(f"\n[{nome}]")
+        print(f"{'caracteres':>12} {'novo (s)':>10} {'antigo (s)':>11}")
+        tempos = []
+        for passo in range(args.passos):
+            tamanho = args.base * 2 ** passo
+            content = gerar(tamanho, rng)
+            novo = medir(new_spans, content, 3)
+            tempos.append((len(content), novo))
+
+            # As expressões antigas só terminam em tempo razoável no texto comum
+            antigo = ""
+            if nome == 'texto':
+                if legacy_spans(content) != new_spans(content):
+                    print(f"  seifim diferentes da segmentação antiga em {len(content)} caracteres")
+                    ok = False
+                antigo = f"{medir(legacy_spans, content, 1):11.4f}"
+            print(f"{len(content):12d} {novo:10.4f} {antigo:>11}")
+
+        # Linear: o tempo cresce na mesma proporção do tamanho
+        (tamanho_min, tempo_min), (tamanho_max, tempo_max) = tempos[0], tempos[-1]
+        crescimento = (tempo_max / tempo_min) / (tamanho_max / tamanho_min)
+        print(f"crescimento do tempo / crescimento do tamanho: {crescimento:.2f}")
+        if crescimento > TOLERANCIA:
+            print(f"  crescimento acima de {TOLERANCIA}: a segmentação não está linear")
+            ok = False
+
+    # Dígitos em tamanhos pequenos o bastante para as expressões antigas terminarem
+    print("\n[digitos, expressões antigas]")
+    for tamanho in (args.legacy_max // 4, args.legacy_max // 2, args.legacy_max):
+        content = siman_digitos(tamanho, rng)
+        if legacy_spans(content) != new_spans(content):
+            print(f"  seifim diferentes da segmentação antiga em {len(content)} caracteres")
+            ok = False
+        print(f"{len(content):12d} {medir(new_spans, content, 3):10.4f} {medir(legacy_spans, content, 1):11.4f}")
+
+    print("\nOK" if ok else "\nFALHOU")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
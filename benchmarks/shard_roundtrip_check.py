@@ -0,0 +1,120 @@
+"""
+Conferência dos shards de SQL (shulchan_pipeline/shards.py)
+
+Gera o SQL do corpus sintético em um arquivo único e em shards (em cada
+--format, com e sem gzip) e confere que:
+
+- os comandos e linhas de dados dos shards, juntos, são os mesmos do arquivo único;
+- cada shard respeita o limite de linhas e o de tamanho (só um lote sozinho pode passar dele);
+- o sha256 e as linhas de cada shard batem com o manifesto.
+
+Com --database também carrega os shards com load_shards (use um banco vazio
+com database_schema.sql aplicado) e confere as linhas de cada tabela no
+banco. Sai com código 1 se alguma conferência falhar.
+
+    python benchmarks/shard_roundtrip_check.py
+    python benchmarks/shard_roundtrip_check.py --database postgresql://localhost/shulchan_teste --jobs 8
+"""
+
+import argparse
+import contextlib
+import io
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from process_content_improved import ImprovedShulchanAruchProcessor  # noqa: E402
+from shulchan_pipeline.shards import ShardedSqlWriter, load_shards, open_shard, read_manifest, verify_shards  # noqa: E402
+from shulchan_pipeline.sql_writer import FORMATS, SqlWriter  # noqa: E402
+from synthetic_corpus import ROWS_1X, generate_corpus  # noqa: E402
+
+
+def _linhas(texto: str) -> Counter:
+    """Linhas de comando e de dados (sem comentários, linhas em branco e o início e fim de cada COPY)"""
+
+    return Counter(
+        linha for linha in texto.split("\n")
+        if linha.strip() and not linha.startswith(('--', 'COPY ')) and linha != "\\."
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Conferência dos shards de SQL")
+    parser.add_argument('--scale', type=float, default=1, help=f"Escala do corpus sintético ({ROWS_1X} simanim)")
+    parser.add_argument('--shard-size', type=float, default=0.5, help="Tamanho máximo de cada shard em MB")
+    parser.add_argument('--shard-rows', type=int, default=3000, help="Linhas no máximo por shard")
+    parser.add_argument('--database', metavar='URL', help="Também carrega os shards (formato copy, gzip) nesse banco")
+    parser.add_argument('--jobs', type=int, default=4, help="Conexões da carga")
+    args = parser.parse_args()
+
+    falhas = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        csv_file = generate_corpus(Path(temp_dir) / 'content_rows.csv', int(ROWS_1X * args.scale))
+        processor = ImprovedShulchanAruchProcessor()
+        with contextlib.redirect_stdout(io.StringIO()):
+            simanim = processor.process_csv(str(csv_file))
+        linhas_sql = [processor.sql_rows(siman) for siman in simanim]
+
+        for formato in sorted(FORMATS):
+            unico = io.StringIO()
+            with SqlWriter(unico, processor.sql_sections, formato) as writer:
+                for rows in linhas_sql:
+                    writer.write_many(rows)
+            esperado = _linhas(unico.getvalue())
+
+            for compressao in (None, 'gzip'):
+                diretorio = Path(temp_dir) / f"{formato}_{compressao}"
+                max_bytes = int(args.shard_size * 1024 * 1024)
+                inicio = time.perf_counter()
+                with ShardedSqlWriter(diretorio, processor.sql_sections, formato, max_bytes, args.shard_rows,
+                                      compressao) as writer:
+                    for rows in linhas_sql:
+                        writer.write_many(rows)
+                duracao = time.perf_counter() - inicio
+
+                shards = read_manifest(diretorio)
+                falhas.extend(f"{formato}/{compressao}: {problema}" for problema in verify_shards(diretorio, shards))
+                obtido = Counter()
+                lote = FORMATS[formato]().batch_size
+                for shard in shards:
+                    with open_shard(diretorio / shard.arquivo) as arquivo:
+                        linhas = _linhas(arquivo.read().decode('utf-8'))
+                    obtido += linhas
+                    if shard.linhas > args.shard_rows:
+                        falhas.append(f"{shard.arquivo}: {shard.linhas} linhas (máximo {args.shard_rows})")
+                    if shard.bytes > max_bytes and shard.linhas > lote:
+                        falhas.append(f"{shard.arquivo}: {shard.bytes} bytes (máximo {max_bytes} + um lote)")
+                if obtido != esperado:
+                    falhas.append(f"{formato}/{compressao}: linhas diferentes do arquivo único")
+                gravados = sum((diretorio / shard.arquivo).stat().st_size for shard in shards)
+                print(f"{formato:>6} {compressao or '-':>4}: {len(shards)} shards, "
+                      f"{sum(shard.bytes for shard in shards) / 1024:.0f} KiB de SQL, {gravados / 1024:.0f} KiB gravados, "
+                      f"{duracao:.2f}s")
+
+        if args.database:
+            diretorio = Path(temp_dir) / 'copy_gzip'
+            inicio = time.perf_counter()
+            cargas = load_shards(diretorio, args.database, args.jobs)
+            duracao = time.perf_counter() - inicio
+            linhas = sum(carga.shard.linhas for carga in cargas)
+            print(f"carga: {len(cargas)} shards, {linhas} linhas em {duracao:.2f}s com {args.jobs} conexões "
+                  f"(soma dos shards: {sum(carga.segundos for carga in cargas):.2f}s)")
+            import psycopg2
+            with contextlib.closing(psycopg2.connect(args.database)) as conn, conn.cursor() as cursor:
+                for tabela, _ in processor.sql_sections:
+                    cursor.execute(f"SELECT count(*) FROM {tabela}")
+                    esperado = sum(carga.shard.linhas for carga in cargas if carga.shard.tabela == tabela)
+                    if cursor.fetchone()[0] != esperado:
+                        falhas.append(f"carga: {tabela} com linhas diferentes do manifesto")
+
+    for falha in falhas[:10]:
+        print(f"   FALHA: {falha}")
+    sys.exit(1 if falhas else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+"""
+Conferência da carga direta no banco (shulchan_pipeline/sinks.py)
+
+Processa o corpus sintético e confere:
+
+- sqlite_schema: cria todas as tabelas geradas com as colunas de TABLES, a
+  semente de categorias e tags, nada do que é só do Postgres (GIN, triggers,
+  funções) e pode ser aplicado de novo no mesmo banco;
+- SqliteSink: o arquivo tem exatamente as linhas de sql_rows de cada siman, em
+  lotes de --batch-size linhas, e uma segunda carga no mesmo arquivo, com
+  simanim alterados (seifim e tags a menos) e removidos, deixa só as linhas novas;
+- PipelinedSink (com um sink de teste em memória): nunca há mais lotes em
+  andamento do que `pendentes` e o erro de um lote chega à gravação seguinte
+  ou ao close;
+- PostgresSink, só com DATABASE_URL (um banco de teste com database_schema.sql
+  aplicado): as mesmas cargas, com os lotes em paralelo nas conexões do pool.
+  Os simanim do corpus sintético são removidos no fim.
+
+Sai com código 1 se alguma conferência falhar.
+
+    python benchmarks/sinks_check.py
+    DATABASE_URL=postgresql://localhost/shulchan_teste python benchmarks/sinks_check.py --connections 8
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Sequence, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from process_content_improved import ImprovedShulchanAruchProcessor  # noqa: E402
+from shulchan_pipeline.ids import SCHEMA_PATH  # noqa: E402
+from shulchan_pipeline.sinks import (  # noqa: E402
+    Batch, PipelinedSink, PostgresSink, SqliteSink, psycopg2, sqlite_schema, sqlite_value,
+)
+from shulchan_pipeline.sql_writer import TABLES  # noqa: E402
+from synthetic_corpus import ROWS_1X, generate_corpus  # noqa: E402
+
+# O que não existe no SQLite e não pode sobrar na tradução
+_SO_POSTGRES = re.compile(r"\bUSING GIN\b|\bTRIGGER\b|\bFUNCTION\b|gen_random_uuid|\bNOW\(\)|\[\]", re.IGNORECASE)
+
+Simanim = List[Tuple[str, List[Tuple[str, Tuple[Any, ...]]]]]
+
+
+def esperado(simanim: Simanim) -> Dict[str, Dict[str, Tuple[Any, ...]]]:
+    """Linhas esperadas no banco: {tabela: {id: linha}}"""
+
+    tabelas: Dict[str, Dict[str, Tuple[Any, ...]]] = {table: {} for table in TABLES}
+    for _, rows in simanim:
+        for table, row in rows:
+            tabelas[table][row[0]] = row
+    return tabelas
+
+
+def alterar(simanim: Simanim) -> Tuple[Simanim, List[str]]:
+    """Simanim da segunda carga (1 em 5 sem o último seif e a última tag) e os removidos (1 em 7)"""
+
+    alterados = []
+    for indice, (siman_id, rows) in enumerate(simanim):
+        if indice % 5 == 0:
+            seifim = [i for i, (table, _) in enumerate(rows) if table == 'seifim']
+            tags = [i for i, (table, _) in enumerate(rows) if table == 'siman_tags']
+            fora = {seifim[-1]} | set(tags[-1:])
+            rows = [linha for i, linha in enumerate(rows) if i not in fora]
+        alterados.append((siman_id, rows))
+    removidos = {siman_id for siman_id, _ in alterados[1::7]}
+    return [item for item in alterados if item[0] not in removidos], sorted(removidos)
+
+
+def diferencas(nome: str, obtido: Dict[str, Dict[str, Tuple[Any, ...]]],
+               esperadas: Dict[str, Dict[str, Tuple[Any, ...]]], normalizar) -> List[str]:
+    """Tabelas em que as linhas do banco (normalizadas) diferem das esperadas"""
+
+    falhas = []
+    for table, spec in TABLES.items():
+        linhas = {id_: normalizar(spec, row) for id_, row in esperadas[table].items()}
+        if obtido[table] != linhas:
+            faltando = len(linhas.keys() - obtido[table].keys())
+            sobrando = len(obtido[table].keys() - linhas.keys())
+            diferentes = sum(obtido[table][id_] != linhas[id_] for id_ in linhas.keys() & obtido[table].keys())
+            falhas.append(f"{nome}: {table} com {faltando} linhas faltando, {sobrando} sobrando "
+                          f"e {diferentes} diferentes")
+    return falhas
+
+
+# --- SQLite ---
+
+def linhas_sqlite(path: Path) -> Dict[str, Dict[str, Tuple[Any, ...]]]:
+    conn = sqlite3.connect(str(path))
+    try:
+        return {table: {row[0]: row for row in conn.execute(f"SELECT {', '.join(spec.column_names)} FROM {table}")}
+                for table, spec in TABLES.items()}
+    finally:
+        conn.close()
+
+
+def normalizar_sqlite(spec, row: Tuple[Any, ...]) -> Tuple[Any, ...]:
+    return tuple(map(sqlite_value, row))
+
+
+def conferir_schema() -> List[str]:
+    falhas = []
+    comandos = list(sqlite_schema(SCHEMA_PATH))
+    for comando in comandos:
+        if _SO_POSTGRES.search(comando):
+            falhas.append(f"sqlite_schema: comando do Postgres traduzido: {comando.splitlines()[0]}")
+    conn = sqlite3.connect(':memory:')
+    try:
+        for _ in range(2):  # aplicado de novo no mesmo banco (SqliteSink em um arquivo existente)
+            with conn:
+                for comando in comandos:
+                    conn.execute(comando)
+        for table, spec in TABLES.items():
+            colunas = [coluna for _, coluna, *_ in conn.execute(f"PRAGMA table_info({table})")]
+            if not set(spec.column_names) <= set(colunas):
+                falhas.append(f"sqlite_schema: {table} sem {sorted(set(spec.column_names) - set(colunas))}")
+        semente = {nome: conn.execute(f"SELECT COUNT(*) FROM {nome}").fetchone()[0] for nome in ('categorias', 'tags')}
+        if not all(semente.values()):
+            falhas.append(f"sqlite_schema: semente incompleta {semente}")
+    except sqlite3.Error as erro:
+        falhas.append(f"sqlite_schema: {erro}")
+    finally:
+        conn.close()
+    return falhas
+
+
+def carregar(sink, simanim: Simanim, removidos: Sequence[str] = ()) -> Tuple[float, int]:
+    """Carrega os simanim; devolve a duração e o máximo de lotes em andamento"""
+
+    inicio = time.perf_counter()
+    em_andamento = 0
+    with sink:
+        for siman_id, rows in simanim:
+            sink.write_siman(siman_id, rows)
+            em_andamento = max(em_andamento, sum(not future.done() for future in getattr(sink, '_futures', [])))
+        for siman_id in removidos:
+            sink.delete_siman(siman_id)
+    return time.perf_counter() - inicio, em_andamento
+
+
+def conferir_sqlite(secoes, simanim: Simanim, batch_size: int, temp_dir: Path) -> List[str]:
+    falhas = []
+    path = temp_dir / 'shulchan.db'
+    linhas = sum(len(rows) for _, rows in simanim)
+
+    sink = SqliteSink(path, secoes, batch_size)
+    duracao, _ = carregar(sink, simanim)
+    falhas += diferencas("SQLite, carga completa", linhas_sqlite(path), esperado(simanim), normalizar_sqlite)
+    if sink.lotes < linhas // batch_size:
+        falhas.append(f"SQLite: {sink.lotes} lotes para {linhas} linhas em lotes de {batch_size}")
+    print(f"SQLite: {len(simanim)} simanim, {linhas} linhas em {sink.lotes} lotes; {duracao:.2f}s")
+
+    mantidos, removidos = alterar(simanim)
+    carregar(SqliteSink(path, secoes, batch_size), mantidos, removidos)
+    falhas += diferencas("SQLite, segunda carga", linhas_sqlite(path), esperado(mantidos), normalizar_sqlite)
+    return falhas
+
+
+# --- PipelinedSink ---
+
+class _MemorySink(PipelinedSink):
+    """Sink de teste: grava os lotes em um dicionário, em threads, com falha opcional no lote `falhar_em`"""
+
+    def __init__(self, sections, batch_size: int, pendentes: int, falhar_em: int = 0, espera: float = 0.01):
+        super().__init__(sections, batch_size, pendentes)
+        self.falhar_em = falhar_em
+        self.espera = espera
+        self.gravados: Dict[str, Dict[str, Tuple[Any, ...]]] = {table: {} for table in TABLES}
+        self.simultaneos = 0
+        self.max_simultaneos = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=pendentes + 2)  # mais threads que lotes permitidos
+
+    def _submit(self, batch: Batch) -> Future:
+        return self._executor.submit(self._gravar, batch, self.lotes)
+
+    def _gravar(self, batch: Batch, numero: int) -> None:
+        with self._lock:
+            self.simultaneos += 1
+            self.max_simultaneos = max(self.max_simultaneos, self.simultaneos)
+        try:
+            time.sleep(self.espera)
+            if numero == self.falhar_em:
+                raise RuntimeError(f"falha injetada no lote {numero}")
+            with self._lock:
+                for table in self.tables:
+                    for row in batch.rows[table]:
+                        self.gravados[table][row[0]] = row
+        finally:
+            with self._lock:
+                self.simultaneos -= 1
+
+    def _close_connections(self) -> None:
+        self._executor.shutdown(wait=True)
+
+
+def conferir_pipelined(secoes, simanim: Simanim, batch_size: int, pendentes: int) -> List[str]:
+    falhas = []
+    batch_size = max(1, batch_size // 10)  # lotes pequenos e lentos: o processamento chega ao limite
+    sink = _MemorySink(secoes, batch_size, pendentes)
+    _, em_andamento = carregar(sink, simanim)
+    if sink.gravados != esperado(simanim):
+        falhas.append("PipelinedSink: linhas gravadas diferentes de sql_rows")
+    if max(sink.max_simultaneos, em_andamento) > pendentes:
+        falhas.append(f"PipelinedSink: {max(sink.max_simultaneos, em_andamento)} lotes em andamento "
+                      f"(máximo {pendentes})")
+    elif pendentes > 1 and sink.max_simultaneos < 2:
+        falhas.append("PipelinedSink: lotes gravados um de cada vez")
+    if sink._futures:
+        falhas.append("PipelinedSink: lotes pendentes depois do close")
+
+    # O erro de um lote em segundo plano chega ao processamento
+    for falhar_em in (1, sink.lotes):
+        try:
+            carregar(_MemorySink(secoes, batch_size, pendentes, falhar_em), simanim)
+            falhas.append(f"PipelinedSink: falha no lote {falhar_em} de {sink.lotes} não chegou ao processamento")
+        except RuntimeError as erro:
+            if 'falha injetada' not in str(erro):
+                falhas.append(f"PipelinedSink: {erro}")
+    print(f"PipelinedSink: {sink.lotes} lotes, até {sink.max_simultaneos} em andamento ({pendentes} permitidos)")
+    return falhas
+
+
+# --- Postgres ---
+
+def linhas_postgres(dsn: str, simanim_ids: List[str]) -> Dict[str, Dict[str, Tuple[Any, ...]]]:
+    conn = psycopg2.connect(dsn)
+    conn.set_client_encoding('UTF8')
+    try:
+        with conn.cursor() as cursor:
+            tabelas = {}
+            for table, spec in TABLES.items():
+                cursor.execute(f"SELECT {', '.join(spec.column_names)} FROM {table} WHERE siman_id = ANY(%s::uuid[])",
+                               (simanim_ids,))
+                tabelas[table] = {row[0]: normalizar_postgres(spec, row) for row in cursor}
+            return tabelas
+    finally:
+        conn.close()
+
+
+def normalizar_postgres(spec, row: Tuple[Any, ...]) -> Tuple[Any, ...]:
+    """Valores comparáveis aos do banco: DECIMAL(3,2) com 2 casas e REAL[] com a precisão do float4"""
+
+    valores = []
+    for (_, tipo), valor in zip(spec.columns, row):
+        if valor is not None and tipo.startswith('DECIMAL'):
+            valor = round(float(valor), 2)
+        elif valor is not None and tipo == 'REAL[]':
+            valor = tuple(float(f"{float(item):.6g}") for item in valor)
+        elif isinstance(valor, (list, tuple)):
+            valor = tuple(str(item) for item in valor)
+        elif valor is not None and tipo == 'UUID':
+            valor = str(valor)
+        valores.append(valor)
+    return tuple(valores)
+
+
+def conferir_postgres(dsn: str, secoes, simanim: Simanim, batch_size: int, connections: int) -> List[str]:
+    falhas = []
+    ids = [siman_id for siman_id, _ in simanim]
+    linhas = sum(len(rows) for _, rows in simanim)
+    sink = PostgresSink(dsn, secoes, batch_size, connections, backoff=0.1)
+    try:
+        duracao, em_andamento = carregar(sink, simanim)
+        falhas += diferencas("Postgres, carga completa", linhas_postgres(dsn, ids), esperado(simanim),
+                             normalizar_postgres)
+        if em_andamento > connections:
+            falhas.append(f"Postgres: {em_andamento} lotes em andamento (máximo {connections})")
+        print(f"Postgres: {len(simanim)} simanim, {linhas} linhas em {sink.lotes} lotes, até {em_andamento} "
+              f"em andamento, {sink.tentativas_refeitas} refeitos; {duracao:.2f}s ({linhas / duracao:.0f} linhas/s)")
+
+        mantidos, removidos = alterar(simanim)
+        carregar(PostgresSink(dsn, secoes, batch_size, connections), mantidos, removidos)
+        falhas += diferencas("Postgres, segunda carga", linhas_postgres(dsn, ids), esperado(mantidos),
+                             normalizar_postgres)
+    finally:
+        # Tira do banco de teste os simanim do corpus sintético
+        carregar(PostgresSink(dsn, secoes, batch_size, connections), [], ids)
+    if any(linhas_postgres(dsn, ids).values()):
+        falhas.append("Postgres: simanim do corpus sintético ficaram no banco depois da remoção")
+    return falhas
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Conferência da carga direta no banco (SQLite e Postgres)")
+    parser.add_argument('--scale', type=float, default=0.25, help=f"Escala do corpus sintético ({ROWS_1X} simanim)")
+    parser.add_argument('--batch-size', type=int, default=2000, help="Linhas por lote")
+    parser.add_argument('--connections', type=int, default=4, help="Conexões do Postgres (e lotes em andamento)")
+    args = parser.parse_args()
+
+    falhas = conferir_schema()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        csv_file = generate_corpus(Path(temp_dir) / 'content_rows.csv', int(ROWS_1X * args.scale))
+        processor = ImprovedShulchanAruchProcessor()
+        with contextlib.redirect_stdout(io.StringIO()):
+            simanim = [(siman.original_id, processor.sql_rows(siman)) for siman in processor.iter_csv(str(csv_file))]
+        secoes = processor.sql_sections
+
+        falhas += conferir_sqlite(secoes, simanim, args.batch_size, Path(temp_dir))
+    falhas += conferir_pipelined(secoes, simanim, args.batch_size, args.connections)
+
+    dsn = os.environ.get('DATABASE_URL')
+    if not dsn:
+        print("Postgres: pulado (defina DATABASE_URL com um banco de teste)")
+    elif psycopg2 is None:
+        falhas.append("Postgres: DATABASE_URL definido, mas o psycopg2 não está instalado (pip install psycopg2-binary)")
+    else:
+        falhas += conferir_postgres(dsn, secoes, simanim, args.batch_size, args.connections)
+
+    for falha in falhas[:10]:
+        print(f"   FALHA: {falha}")
+    sys.exit(1 if falhas else 0)
+
+
+if __name__ == "__main__":
+    main()
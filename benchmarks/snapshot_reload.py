@@ -0,0 +1,69 @@
+"""
+Recarga do snapshot dos simanim processados (shulchan_pipeline/snapshot.py)
+
+Processa o corpus com process_csv(snapshot=...), reabre o snapshot com
+load_snapshot e confere que os simanim lidos são iguais aos processados.
+Mede o tempo de abertura (só cabeçalho e metadados) e o de montar todos os
+simanim, comparado ao de reprocessar o CSV.
+Sai com código 1 se algum siman for diferente ou se a abertura passar de
+ABERTURA_MAXIMA_MS.
+
+    python benchmarks/snapshot_reload.py                      # corpus sintético 1x
+    python benchmarks/snapshot_reload.py --csv csv/content_rows.csv
+"""
+
+import argparse
+import contextlib
+import io
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from process_content_improved import ImprovedShulchanAruchProcessor, ProcessedSiman  # noqa: E402
+from shulchan_pipeline.snapshot import load_snapshot  # noqa: E402
+from synthetic_corpus import ROWS_1X, generate_corpus  # noqa: E402
+
+# Tempo máximo aceito para abrir o snapshot
+ABERTURA_MAXIMA_MS = 10.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Recarga do snapshot dos simanim processados")
+    parser.add_argument('--csv', dest='csv_file', help="CSV a processar (padrão: corpus sintético)")
+    parser.add_argument('--scale', type=float, default=1, help=f"Escala do corpus sintético ({ROWS_1X} simanim)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        csv_file = Path(args.csv_file) if args.csv_file else generate_corpus(
+            Path(temp_dir) / 'content_rows.csv', int(ROWS_1X * args.scale))
+        snapshot_file = Path(temp_dir) / 'simanim.snapshot'
+
+        processor = ImprovedShulchanAruchProcessor()
+        inicio = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            processados = processor.process_csv(str(csv_file), snapshot=str(snapshot_file))
+        processamento = time.perf_counter() - inicio
+        tamanho = snapshot_file.stat().st_size
+
+        inicio = time.perf_counter()
+        snapshot = load_snapshot(snapshot_file, ProcessedSiman)
+        abertura = time.perf_counter() - inicio
+        with snapshot:
+            inicio = time.perf_counter()
+            carregados = list(snapshot)
+            montagem = time.perf_counter() - inicio
+
+    diferentes = sum(a != b for a, b in zip(processados, carregados)) + abs(len(processados) - len(carregados))
+    print(f"{len(processados)} simanim, snapshot com {tamanho / 2**20:.1f} MiB")
+    print(f"   - process_csv (com o snapshot): {processamento * 1000:.0f} ms")
+    print(f"   - load_snapshot: {abertura * 1000:.3f} ms (limite: {ABERTURA_MAXIMA_MS} ms)")
+    print(f"   - montar todos os simanim: {montagem * 1000:.0f} ms")
+    print(f"   - simanim diferentes dos processados: {diferentes}")
+    sys.exit(0 if not diferentes and abertura * 1000 <= ABERTURA_MAXIMA_MS else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Corpus sintético no formato do csv/content_rows.csv, para os benchmarks
+
+Os simanim seguem a forma dos dados reais: cabeçalho "SIMAN N **Assunto**"
+(e as variações sem ** e sem título que os padrões de extração tratam),
+seifim numerados "1. ...", em média 7,6 seifim por siman (14.141 / 1.863)
+e vocabulário com as palavras-chave de categorias, tags e temas. O corpus é
+determinístico para uma mesma semente.
+
+    python benchmarks/synthetic_corpus.py --scale 10 -o /tmp/content_rows_10x.csv
+"""
+
+import argparse
+import csv
+import random
+import uuid
+from pathlib import Path
+from typing import List, Union
+
+# Simanim no CSV real (escala 1x)
+ROWS_1X = 1863
+
+# Palavras-chave usadas por categorias, tags e títulos dos processadores
+PALAVRAS_CHAVE = (
+    "carne leite mercado vendedor idólatra sinagoga oração rezar shabat casamento mulher homem família "
+    "filho comércio contrato justiça tribunal testemunha tzedaká caridade chanucá festividade purificação "
+    "pureza sangue vinho pão obrigado deve precisa mitzvá proibido vedado ilegal permitido pode autorizado "
+    "legal costume tradição uso hábito emergência urgente necessidade feminino esposa filha masculino marido "
+    "menor infantil jovem velho ancião enfermo doença saúde viajar caminho estrada doméstico lar residência "
+    "comunidade público coletivo grupo individual pessoal privado pessoa"
+).split()
+
+# Palavras comuns do texto (inclui stop words)
+PALAVRAS_COMUNS = (
+    "o a de da do em na no para com por que se não é são foi ser ter mas então assim também muito mais "
+    "todos alguns outros mesmo lei regra halachá rabino sábio talmud bênção noite dia manhã tarde hora "
+    "momento lugar cidade povo israel torá mandamento eterno santo escrito dito quando onde como porque "
+    "ainda depois antes sempre nunca água fogo animal campo casa mesa livro porta janela roupa dinheiro "
+    "servo vizinho dono sócio juiz herança empréstimo juramento promessa voto jejum lua ano mês semana"
+).split()
+
+
+def _frase(rng: random.Random, minimo: int, maximo: int) -> str:
+    palavras = [
+        rng.choice(PALAVRAS_CHAVE) if rng.random() < 0.25 else rng.choice(PALAVRAS_COMUNS)
+        for _ in range(rng.randint(minimo, maximo))
+    ]
+    texto = " ".join(palavras)
+    return texto[0].upper() + texto[1:]
+
+
+def _seif(rng: random.Random, numero: int) -> str:
+    frases = [_frase(rng, 6, 30) for _ in range(rng.randint(1, 8))]
+    # Referências a outros seifim, como nas glosas ("ver seif 3")
+    if rng.random() < 0.1:
+        frases.append(f"Ver seif {rng.randint(1, 20)} acima")
+    return f"{numero}. " + ". ".join(frases) + "."
+
+
+def siman_content(rng: random.Random, numero: int) -> str:
+    """Conteúdo de um siman: cabeçalho e seifim numerados"""
+
+    tipo = rng.random()
+    assunto = _frase(rng, 3, 9)
+    if tipo < 0.65:
+        contem = f" Contém {rng.randint(2, 12)} seifim" if rng.random() < 0.3 else ""
+        cabecalho = f"SIMAN {numero} **{assunto}{contem}**\n"
+    elif tipo < 0.8:
+        cabecalho = f"SIMAN {numero} {assunto}\n"
+    elif tipo < 0.9:
+        cabecalho = f"SIMAN {numero} {assunto}. "
+    else:
+        cabecalho = f"SIMAN {numero} "
+
+    # Média de ~7,6 seifim, com alguns simanim bem longos
+    quantidade = min(1 + int(rng.expovariate(1 / 6.6)), 80)
+    seifim = [_seif(rng, indice) for indice in range(1, quantidade + 1)]
+    return cabecalho + "\n".join(seifim)
+
+
+def generate_corpus(path: Union[str, Path], rows: int, seed: int = 0) -> Path:
+    """Grava um CSV com `rows` simanim (id, chapter_id, content, created_at, updated_at)"""
+
+    rng = random.Random(seed)
+    capitulos: List[str] = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(max(1, rows // 10))]
+    path = Path(path)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['id', 'chapter_id', 'content', 'created_at', 'updated_at'])
+        for indice in range(rows):
+            writer.writerow([
+                str(uuid.UUID(int=rng.getrandbits(128))),
+                capitulos[indice * len(capitulos) // rows],
+                siman_content(rng, indice % ROWS_1X + 1),
+                '2025-05-08 00:51:32.624423+00',
+                '2025-05-08 00:51:32.624423+00',
+            ])
+    return path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Gera um content_rows.csv sintético")
+    parser.add_argument('--scale', type=float, default=1, help=f"Múltiplo de {ROWS_1X} simanim")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', default='content_rows_synthetic.csv')
+    args = parser.parse_args()
+
+    rows = int(ROWS_1X * args.scale)
+    generate_corpus(args.output, rows, args.seed)
+    print(f"{rows} simanim gravados em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
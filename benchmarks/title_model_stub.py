@@ -0,0 +1,117 @@
+"""
+Servidor local com o protocolo do endpoint de títulos (shulchan_pipeline/model_titles.py)
+
+Responde com títulos determinísticos montados pelas palavras mais
+frequentes do conteúdo, sem modelo nenhum, para testar o backend de títulos
+(concorrência, lotes, timeouts, novas tentativas e cache) sem rede. Conta as
+requisições, os itens e o máximo de requisições simultâneas.
+
+    python benchmarks/title_model_stub.py --port 8765 --delay 0.05
+    python process_content_improved.py --title-model http://127.0.0.1:8765/titulos
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Tuple
+
+_PALAVRA = re.compile(r'[^\W\d_]{5,}')
+
+
+def stub_title(conteudo: str) -> Tuple[str, str]:
+    """Título do stub: as duas palavras mais frequentes do texto (sem o cabeçalho SIMAN)"""
+
+    palavras = Counter(palavra.lower() for palavra in _PALAVRA.findall(conteudo) if palavra.upper() != 'SIMAN')
+    principais = [palavra for palavra, _ in palavras.most_common(2)] or ['diversos']
+    return f"Leis sobre {' e '.join(principais)} (modelo)", f"{principais[0]} (modelo)"
+
+
+class StubState:
+    """Contadores do stub e falhas injetadas"""
+
+    def __init__(self, delay: float = 0.0, fail_every: int = 0):
+        self.delay = delay
+        self.fail_every = fail_every
+        self.requisicoes = 0
+        self.itens = 0
+        self.maior_lote = 0
+        self.simultaneas = 0
+        self.max_simultaneas = 0
+        self.lock = threading.Lock()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    state: StubState
+
+    def do_POST(self) -> None:  # noqa: N802 - nome do http.server
+        state = self.state
+        with state.lock:
+            state.requisicoes += 1
+            numero = state.requisicoes
+            state.simultaneas += 1
+            state.max_simultaneas = max(state.max_simultaneas, state.simultaneas)
+        try:
+            pedido = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            time.sleep(state.delay)
+            if state.fail_every and numero % state.fail_every == 0:
+                self._send(503, {'erro': 'falha injetada'})
+                return
+            itens = []
+            for item in pedido['itens']:
+                assunto, resumido = stub_title(item['conteudo'])
+                itens.append({'id': item['id'], 'assunto': assunto, 'assunto_resumido': resumido})
+            with state.lock:
+                state.itens += len(itens)
+                state.maior_lote = max(state.maior_lote, len(itens))
+            self._send(200, {'itens': itens})
+        finally:
+            with state.lock:
+                state.simultaneas -= 1
+
+    def _send(self, status: int, corpo: Dict[str, Any]) -> None:
+        dados = json.dumps(corpo, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+def start_stub(port: int = 0, delay: float = 0.0, fail_every: int = 0) -> Tuple[ThreadingHTTPServer, StubState, str]:
+    """Sobe o stub em uma thread; devolve o servidor, os contadores e a URL do endpoint"""
+
+    state = StubState(delay, fail_every)
+    handler = type('StubHandler', (_Handler,), {'state': state})
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='title-model-stub', daemon=True).start()
+    return server, state, f"http://127.0.0.1:{server.server_address[1]}/titulos"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Stub local do endpoint de títulos")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--delay', type=float, default=0.0, help="Segundos de espera por requisição")
+    parser.add_argument('--fail-every', type=int, default=0, help="Responde 503 a cada N requisições")
+    args = parser.parse_args()
+
+    server, state, url = start_stub(args.port, args.delay, args.fail_every)
+    print(f"Stub de títulos em {url} (Ctrl+C para parar)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(f"{state.requisicoes} requisições, {state.itens} itens, "
+              f"até {state.max_simultaneas} simultâneas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Compara variantes de processamento (estratégias de título, categoria, tags e
+palavras-chave) lado a lado, com uma única análise de cada siman
+
+    python compare_strategies.py
+    python compare_strategies.py --variants improved --title novo=meus_titulos:extract_title
+
+Cada variante em --title usa as estratégias do processador MELHORADO com outra
+função de título, com a assinatura de extract_assunto_improved:
+(content, encontradas) -> (assunto, resumido, confianca[, tem_assunto_original[, padrao]]).
+"""
+
+import argparse
+import csv
+import importlib
+import json
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+from shulchan_pipeline import KeywordMatcher
+from shulchan_pipeline.spreadsheets import open_rows
+from shulchan_pipeline.strategies import ParsedSiman, StrategyResult, StrategySet, run_variants
+from process_content_improved import ImprovedShulchanAruchProcessor
+from process_content_with_ai import ShulchanAruchProcessor
+
+PROCESSORS = {
+    'ai': ShulchanAruchProcessor,
+    'improved': ImprovedShulchanAruchProcessor,
+}
+
+# Campos comparados entre as variantes
+CAMPOS = ['assunto', 'confianca', 'categoria', 'tags', 'palavras_chave']
+
+
+def _campos(resultado: StrategyResult) -> Dict[str, Any]:
+    return {
+        'assunto': resultado.titulo.assunto,
+        'confianca': resultado.titulo.confianca,
+        'categoria': resultado.categoria,
+        'tags': resultado.tags,
+        'palavras_chave': resultado.palavras_chave,
+    }
+
+
+def _load_callable(caminho: str) -> Any:
+    """'modulo:funcao' -> função"""
+
+    modulo, _, nome = caminho.partition(':')
+    if not nome:
+        raise ValueError(f"use modulo:funcao, não '{caminho}'")
+    return getattr(importlib.import_module(modulo), nome)
+
+
+def build_variants(nomes: List[str], titulos: List[str]) -> Tuple[Dict[str, StrategySet], KeywordMatcher]:
+    """Estratégias de cada variante (processadores pelo nome e títulos alternativos) e o autômato comum"""
+
+    processadores: Dict[str, Any] = {}
+
+    def processador(nome: str) -> Any:
+        if nome not in processadores:
+            processadores[nome] = PROCESSORS[nome]()
+        return processadores[nome]
+
+    variantes = {nome: processador(nome).strategies for nome in nomes}
+    for titulo in titulos:
+        nome, _, caminho = titulo.partition('=')
+        variantes[nome] = processador('improved').strategies._replace(title=_load_callable(caminho))
+
+    # Um único autômato com as palavras-chave de todos os processadores
+    keyword_matcher = KeywordMatcher([
+        keyword for p in processadores.values() for keyword in p.keyword_matcher.keywords
+    ])
+    return variantes, keyword_matcher
+
+
+def main():
+    """Função principal"""
+
+    parser = argparse.ArgumentParser(description="Compara estratégias de processamento lado a lado")
+    parser.add_argument('--csv', dest='csv_file', default='csv/content_rows.csv',
+                        help="CSV de conteúdo ou diretório com as planilhas exportadas do Supabase (tabelas/)")
+    parser.add_argument('--variants', default='ai,improved',
+                        help="Processadores a comparar, separados por vírgula (ai, improved)")
+    parser.add_argument('--title', action='append', default=[], metavar='NOME=MODULO:FUNCAO',
+                        help="Variante com outra estratégia de título (pode repetir)")
+    parser.add_argument('-o', '--output', default='strategy_comparison.csv',
+                        help="CSV com os resultados de cada variante lado a lado")
+    parser.add_argument('--summary', default='strategy_comparison.json',
+                        help="Resumo em JSON: divergências por campo e distribuições por variante")
+    args = parser.parse_args()
+
+    nomes = [nome.strip() for nome in args.variants.split(',') if nome.strip()]
+    variantes, keyword_matcher = build_variants(nomes, args.title)
+    if len(variantes) < 2:
+        parser.error("informe ao menos duas variantes")
+
+    total = 0
+    divergencias: Counter = Counter()
+    confiancas = {nome: Counter() for nome in variantes}
+    categorias = {nome: Counter() for nome in variantes}
+
+    colunas = ['id', 'chapter_id'] + [f"{nome}_{campo}" for nome in variantes for campo in CAMPOS] + ['divergencias']
+    with open_rows(args.csv_file) as entrada, \
+            open(args.output, 'w', encoding='utf-8', newline='') as saida:
+        writer = csv.writer(saida)
+        writer.writerow(colunas)
+
+        for row in entrada:
+            # Uma análise do siman para todas as variantes
+            resultados = run_variants(ParsedSiman(row, keyword_matcher), variantes)
+            campos = {nome: _campos(resultado) for nome, resultado in resultados.items()}
+
+            diferentes = [
+                campo for campo in CAMPOS
+                if len({json.dumps(valores[campo], ensure_ascii=False) for valores in campos.values()}) > 1
+            ]
+            divergencias.update(diferentes)
+            for nome, valores in campos.items():
+                confiancas[nome][str(valores['confianca'])] += 1
+                categorias[nome][valores['categoria']] += 1
+            total += 1
+
+            linha = [row['id'], row['chapter_id']]
+            for valores in campos.values():
+                linha += [valores['assunto'], valores['confianca'], valores['categoria'],
+                          ', '.join(valores['tags']), ', '.join(valores['palavras_chave'])]
+            writer.writerow(linha + [', '.join(diferentes)])
+
+    resumo = {
+        'simanim': total,
+        'variantes': list(variantes),
+        'divergencias': {campo: divergencias[campo] for campo in CAMPOS},
+        'confianca': {nome: dict(contagem) for nome, contagem in confiancas.items()},
+        'categorias': {nome: dict(contagem.most_common()) for nome, contagem in categorias.items()},
+    }
+    with open(args.summary, 'w', encoding='utf-8') as f:
+        json.dump(resumo, f, indent=2, ensure_ascii=False)
+
+    print(f"{total} simanim comparados entre {', '.join(variantes)}")
+    for campo in CAMPOS:
+        print(f"   - {campo}: {divergencias[campo]} simanim diferentes")
+    print(f"Arquivo '{args.output}' gerado com as variantes lado a lado")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Carga paralela no Postgres dos shards gravados pelo processamento com --shards
+
+Confere o sha256 de cada shard contra o manifesto e carrega fase por fase,
+com até --jobs shards (um por conexão, uma transação cada) ao mesmo tempo.
+
+    python process_content_improved.py --shards populated_data_improved.shards --format copy --compress gzip
+    python load_shards.py populated_data_improved.shards --database "$DATABASE_URL" --jobs 8
+"""
+
+import argparse
+import sys
+import time
+
+from shulchan_pipeline.shards import ShardLoad, ShardLoadError, load_shards, read_manifest, verify_shards
+from shulchan_pipeline.sinks import redact_url
+
+
+def main():
+    """Função principal"""
+
+    parser = argparse.ArgumentParser(description="Carrega no Postgres, em paralelo, os shards de SQL gerados com --shards")
+    parser.add_argument('diretorio', help="Diretório dos shards (com o manifest.json)")
+    parser.add_argument('--database', metavar='URL', required=True, help="postgresql://...")
+    parser.add_argument('--jobs', type=int, default=4, help="Shards carregados ao mesmo tempo (conexões; padrão 4)")
+    args = parser.parse_args()
+
+    shards = read_manifest(args.diretorio)
+    problemas = verify_shards(args.diretorio, shards)
+    if problemas:
+        for problema in problemas:
+            print(f"Erro: {problema}")
+        sys.exit(1)
+
+    linhas = sum(shard.linhas for shard in shards)
+    print(f"Carregando {len(shards)} shards ({linhas} linhas) em '{redact_url(args.database)}' com {args.jobs} conexões...")
+
+    def progresso(carga: ShardLoad) -> None:
+        print(f"   - {carga.shard.arquivo}: {carga.shard.linhas} linhas em {carga.segundos:.2f}s")
+
+    inicio = time.perf_counter()
+    try:
+        load_shards(args.diretorio, args.database, args.jobs, progresso)
+    except ShardLoadError as e:
+        print(f"Erro: {e} (os shards que já terminaram ficaram no banco)")
+        sys.exit(1)
+    duracao = time.perf_counter() - inicio
+    print(f"Carga concluída em {duracao:.2f}s ({linhas / duracao:.0f} linhas/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,26 +4,54 @@ Script para processar o CSV do Shulchan Aruch com IA
 Extrai assuntos, separa seifim e gera categorias/tags
 """
 
-import csv
+import argparse
+import cProfile
+import contextlib
+import io
 import json
 import re
-import uuid
-from typing import List, Dict, Any, Tuple
-from dataclasses import dataclass
+from collections import Counter
+from typing import Callable, Iterable, Iterator, List, Dict, Any, Optional, Sequence, Set, TextIO, Tuple
+from dataclasses import asdict, dataclass
 from datetime import datetime
 
+from shulchan_pipeline import KeywordMatcher, SimanAnalysis, SqlWriter
+from shulchan_pipeline.analysis import PALAVRA_PATTERN
+from shulchan_pipeline.categories import CategoryScores, CategoryScorer
+from shulchan_pipeline.csv_index import RowSelection, index_path, open_selected_rows, row_range
+from shulchan_pipeline.headers import HeaderParser
+from shulchan_pipeline.ids import SeedIds, stable_id
+from shulchan_pipeline.manifest import Manifest, ManifestDiff, processor_version
+from shulchan_pipeline.metrics import RunMetrics
+from shulchan_pipeline.model_titles import CACHE_PATH, PROMPT_VERSION, ModelTitleClient, ModelTitles, TitleCache
+from shulchan_pipeline.parallel import ProcessingError, process_parallel, process_rows, resolve_workers
+from shulchan_pipeline.records import SeifRecords, intern_all
+from shulchan_pipeline.related import RELATED_SECTION, RelatedSeifimBuilder
+from shulchan_pipeline.search_index import SearchIndexBuilder
+from shulchan_pipeline.shards import COMPRESSIONS, MAX_BYTES, ShardedSqlWriter
+from shulchan_pipeline.sinks import BATCH_SIZE, open_sink, redact_url
+from shulchan_pipeline.snapshot import SnapshotWriter, load_snapshot, save_snapshot
+from shulchan_pipeline.spreadsheets import open_rows
+from shulchan_pipeline.sql_writer import FORMATS
+from shulchan_pipeline.strategies import ParsedSiman, StrategySet, TitleResult, run_strategies
+from shulchan_pipeline.tfidf import TfidfKeywords
+
 @dataclass
 class ProcessedSiman:
-    """Estrutura para um siman processado"""
+    """Estrutura para um siman processado (compacta: slots, strings internadas e seifim por offsets)"""
+    __slots__ = ('original_id', 'chapter_id', 'assunto', 'assunto_resumido', 'categoria', 'categorias', 'tags',
+                 'seifim', 'confianca', 'palavras_chave')
+    
     original_id: str
     chapter_id: str
     assunto: str
     assunto_resumido: str
     categoria: str
-    tags: List[str]
-    seifim: List[Dict[str, Any]]
+    categorias: Tuple[Tuple[str, float], ...]  # categorias ponderadas (siman_categorias), a principal primeiro
+    tags: Tuple[str, ...]
+    seifim: SeifRecords
     confianca: float
-    palavras_chave: List[str]
+    palavras_chave: Tuple[str, ...]
 
 class ShulchanAruchProcessor:
     """Processador de IA para o Shulchan Aruch"""
@@ -75,88 +103,117 @@ class ShulchanAruchProcessor:
             'comunidade': ['comunidade', 'público', 'coletivo', 'grupo'],
             'indivíduo': ['individual', 'pessoal', 'privado', 'pessoa']
         }
+        
+        # Palavras-chave importantes para gerar assuntos a partir do conteúdo
+        self.assunto_keywords = ['carne', 'sinagoga', 'oração', 'shabat', 'casamento', 'comércio',
+                                 'justiça', 'tzedaká', 'festividade', 'pureza', 'família']
+        
+        # Palavras comuns para remover das palavras-chave
+        self.stop_words = {'o', 'a', 'de', 'da', 'do', 'em', 'na', 'no', 'para', 'com', 'por', 'que', 'se', 'não', 'é', 'são', 'foi', 'ser', 'ter', 'pode', 'deve', 'pode', 'não', 'mas', 'porém', 'então', 'assim', 'também', 'muito', 'mais', 'menos', 'todos', 'todas', 'alguns', 'algumas', 'outros', 'outras', 'mesmo', 'mesma', 'diferente', 'diferentes'}
+        
+        # Autômato único com todas as palavras-chave, montado uma vez por processador
+        self.keyword_matcher = KeywordMatcher(
+            list(self.categorias_map)
+            + [keyword for keywords in self.tags_map.values() for keyword in keywords]
+            + self.assunto_keywords
+        )
+        
+        # Ids das categorias e tags, resolvidos pela semente do database_schema.sql
+        seed_ids = SeedIds()
+        self.categoria_ids = {nome: seed_ids.categoria(nome) for nome in [*self.categorias_map.values(), 'Miscelânea']}
+        self.tag_ids = {nome: seed_ids.tag(nome) for nome in self.tags_map}
+        
+        # Categorias (com o vetor de pontuações) e tags de um bloco de simanim de uma vez
+        self.category_scorer = CategoryScorer(self.categorias_map, self.tags_map)
+        
+        # Ranking das palavras-chave por TF-IDF (fit_tfidf); None = por frequência
+        self.tfidf: Optional[TfidfKeywords] = None
+        
+        # Erros da última execução de iter_csv/process_csv
+        self.errors: List[ProcessingError] = []
+        
+        # Seções do arquivo SQL (tabela, título), na ordem em que aparecem
+        self.sql_sections = [
+            ('assuntos', "INSERÇÃO DOS ASSUNTOS PROCESSADOS"),
+            ('seifim', "INSERÇÃO DOS SEIFIM PROCESSADOS"),
+            ('siman_categorias', "INSERÇÃO DOS RELACIONAMENTOS CATEGORIA"),
+            ('siman_tags', "INSERÇÃO DOS RELACIONAMENTOS TAGS")
+        ]
+        
+        # Padrões de título do cabeçalho, em ordem de prioridade, resolvidos de uma vez nas ocorrências de SIMAN
+        self.header_parser = HeaderParser([
+            # Padrão 1: SIMAN X **Assunto**
+            ('padrao_1', r'SIMAN\s+\d+\s+\*\*(.*?)\*\*'),
+            # Padrão 2: SIMAN X Assunto (sem **)
+            ('padrao_2', r'SIMAN\s+\d+\s+([^1-9].*?)(?:\n|$)'),
+            # Padrão 3: Primeira frase após SIMAN X
+            ('padrao_3', r'SIMAN\s+\d+\s+([^1-9].*?)(?:\n|\.)'),
+        ], re.DOTALL)
+        
+        # Confianças dos assuntos gerados pelo fallback (o ProcessedSiman guarda só a confiança)
+        self.fallback_confidences = frozenset({0.6, 0.5})
+        
+        # Tempo e chamadas dos métodos de cada etapa, para o relatório da execução
+        self.metrics = RunMetrics()
+        self.metrics.instrument(self, [
+            'extract_assunto', 'generate_assunto_from_content', 'parse_siman', 'extract_seifim', 'categorize_assunto',
+            'extract_tags', 'extract_palavras_chave', 'rank_palavras_chave', 'rank_documentos', 'sql_rows',
+            'generate_sql', 'fit_tfidf', 'score_categories'
+        ])
+        
+        # Estratégias de título, categoria, tags e palavras-chave (ver shulchan_pipeline.strategies)
+        self.strategies = StrategySet(
+            title=self.extract_assunto, category=self.categorize_assunto,
+            tags=self.extract_tags, keywords=self.rank_documentos
+        )
+        # No processamento em bloco categorias e tags saem de score_categories
+        self.batch_strategies = self.strategies._replace(category=None, tags=None)
 
-    def extract_assunto(self, content: str) -> Tuple[str, str, float]:
-        """Extrai o assunto do siman usando IA"""
+    def extract_assunto(self, content: str, encontradas: Optional[Set[str]] = None) -> TitleResult:
+        """Extrai o assunto do siman usando IA (com o nome do padrão que deu o assunto)"""
+        
+        titulos = self.header_parser.parse(content)
         
         # Padrão 1: SIMAN X **Assunto**
-        pattern1 = r'SIMAN\s+\d+\s+\*\*(.*?)\*\*'
-        match1 = re.search(pattern1, content, re.DOTALL)
-        if match1:
-            assunto = match1.group(1).strip()
-            return assunto, assunto[:100], 0.9
-        
-        # Padrão 2: SIMAN X Assunto (sem **)
-        pattern2 = r'SIMAN\s+\d+\s+([^1-9].*?)(?:\n|$)'
-        match2 = re.search(pattern2, content, re.DOTALL)
-        if match2:
-            assunto = match2.group(1).strip()
-            # Remove quebras de linha e limita tamanho
-            assunto = re.sub(r'\s+', ' ', assunto)
-            if len(assunto) > 200:
-                assunto = assunto[:200] + '...'
-            return assunto, assunto[:100], 0.8
-        
-        # Padrão 3: Primeira frase após SIMAN X
-        pattern3 = r'SIMAN\s+\d+\s+([^1-9].*?)(?:\n|\.)'
-        match3 = re.search(pattern3, content, re.DOTALL)
-        if match3:
-            assunto = match3.group(1).strip()
-            assunto = re.sub(r'\s+', ' ', assunto)
-            if len(assunto) > 200:
-                assunto = assunto[:200] + '...'
-            return assunto, assunto[:100], 0.7
+        if 'padrao_1' in titulos:
+            assunto = titulos['padrao_1'].strip()
+            return TitleResult(assunto, assunto[:100], 0.9, padrao='padrao_1')
+        
+        # Padrão 2: SIMAN X Assunto (sem **); padrão 3: primeira frase após SIMAN X
+        for padrao, confianca in (('padrao_2', 0.8), ('padrao_3', 0.7)):
+            if padrao in titulos:
+                # Remove quebras de linha e limita tamanho
+                assunto = ' '.join(titulos[padrao].split())
+                if len(assunto) > 200:
+                    assunto = assunto[:200] + '...'
+                return TitleResult(assunto, assunto[:100], confianca, padrao=padrao)
         
         # Fallback: Gerar assunto baseado no conteúdo
-        return self.generate_assunto_from_content(content)
+        return self.generate_assunto_from_content(content, encontradas)
 
-    def generate_assunto_from_content(self, content: str) -> Tuple[str, str, float]:
+    def generate_assunto_from_content(self, content: str, encontradas: Optional[Set[str]] = None) -> TitleResult:
         """Gera assunto baseado no conteúdo quando não consegue extrair"""
         
-        # Palavras-chave importantes
-        keywords = ['carne', 'sinagoga', 'oração', 'shabat', 'casamento', 'comércio', 
-                   'justiça', 'tzedaká', 'festividade', 'pureza', 'família']
+        # Encontra palavras-chave no conteúdo (reaproveita a busca do process_siman)
+        if encontradas is None:
+            encontradas = self.keyword_matcher.find(content.lower())
         
-        # Encontra palavras-chave no conteúdo
-        found_keywords = []
-        content_lower = content.lower()
-        for keyword in keywords:
-            if keyword in content_lower:
-                found_keywords.append(keyword)
+        found_keywords = [keyword for keyword in self.assunto_keywords if keyword in encontradas]
         
         if found_keywords:
             assunto = f"Leis sobre {', '.join(found_keywords[:3])}"
-            return assunto, assunto, 0.6
+            return TitleResult(assunto, assunto, 0.6, padrao='fallback')
         
         # Fallback genérico
-        return "Leis haláchicas diversas", "Leis diversas", 0.5
+        return TitleResult("Leis haláchicas diversas", "Leis diversas", 0.5, padrao='fallback')
 
-    def extract_seifim(self, content: str) -> List[Dict[str, Any]]:
+    def extract_seifim(self, content: str, analise: Optional[SimanAnalysis] = None) -> SeifRecords:
         """Separa os seifim do conteúdo"""
         
-        seifim = []
-        
-        # Remove o cabeçalho do siman
-        content_clean = re.sub(r'^SIMAN\s+\d+.*?(?=\d+\.)', '', content, flags=re.DOTALL)
-        
-        # Padrão para encontrar seifim numerados
-        pattern = r'(\d+)\.\s+([^0-9].*?)(?=\d+\.|$)'
-        matches = re.findall(pattern, content_clean, re.DOTALL)
-        
-        for i, (numero, conteudo) in enumerate(matches):
-            conteudo_clean = conteudo.strip()
-            if len(conteudo_clean) > 10:  # Só inclui seifim com conteúdo significativo
-                seif = {
-                    'numero': int(numero),
-                    'conteudo': conteudo_clean,
-                    'assunto': self.extract_seif_assunto(conteudo_clean),
-                    'palavras_chave': self.extract_palavras_chave(conteudo_clean),
-                    'tamanho': len(conteudo_clean),
-                    'ordem': i + 1
-                }
-                seifim.append(seif)
-        
-        return seifim
+        parsed = ParsedSiman({'content': content}, self.keyword_matcher, analise)
+        
+        # Palavras-chave de todos os seifim, ranqueadas em lote
+        return parsed.seif_records(self.rank_documentos(parsed.palavras_seifim), self.extract_seif_assunto)
 
     def extract_seif_assunto(self, conteudo: str) -> str:
         """Extrai assunto específico de um seif"""
@@ -168,200 +225,511 @@ class ShulchanAruchProcessor:
         
         return primeira_frase
 
-    def categorize_assunto(self, assunto: str, conteudo: str) -> str:
+    def categorize_assunto(self, assunto: str, conteudo: str, encontradas: Optional[Set[str]] = None) -> str:
         """Categoriza o assunto baseado em palavras-chave"""
         
-        texto_completo = (assunto + ' ' + conteudo).lower()
-        
-        # Conta ocorrências de palavras-chave por categoria
-        categoria_scores = {}
-        for keyword, categoria in self.categorias_map.items():
-            if keyword in texto_completo:
-                categoria_scores[categoria] = categoria_scores.get(categoria, 0) + 1
-        
-        if categoria_scores:
-            return max(categoria_scores, key=categoria_scores.get)
+        if encontradas is None:
+            encontradas = self.keyword_matcher.find_joined(assunto.lower(), conteudo.lower())
         
-        return 'Miscelânea'
+        # Categoria com mais palavras-chave encontradas (Miscelânea se nenhuma)
+        return self.category_scorer.score([encontradas]).categorias[0]
 
-    def extract_tags(self, assunto: str, conteudo: str) -> List[str]:
+    def extract_tags(self, assunto: str, conteudo: str, encontradas: Optional[Set[str]] = None) -> List[str]:
         """Extrai tags relevantes"""
         
-        tags = []
-        texto_completo = (assunto + ' ' + conteudo).lower()
+        if encontradas is None:
+            encontradas = self.keyword_matcher.find_joined(assunto.lower(), conteudo.lower())
         
-        for tag, keywords in self.tags_map.items():
-            for keyword in keywords:
-                if keyword in texto_completo:
-                    tags.append(tag)
-                    break
-        
-        return list(set(tags))  # Remove duplicatas
+        return self.category_scorer.score([encontradas]).tags[0]  # Cada tag aparece uma vez, na ordem de tags_map
 
     def extract_palavras_chave(self, texto: str) -> List[str]:
         """Extrai palavras-chave importantes do texto"""
         
-        # Palavras comuns para remover
-        stop_words = {'o', 'a', 'de', 'da', 'do', 'em', 'na', 'no', 'para', 'com', 'por', 'que', 'se', 'não', 'é', 'são', 'foi', 'ser', 'ter', 'pode', 'deve', 'pode', 'não', 'mas', 'porém', 'então', 'assim', 'também', 'muito', 'mais', 'menos', 'todos', 'todas', 'alguns', 'algumas', 'outros', 'outras', 'mesmo', 'mesma', 'diferente', 'diferentes'}
+        # Extrai palavras significativas (mais de 3 caracteres)
+        return self.rank_palavras_chave(PALAVRA_PATTERN.findall(texto.lower()))
+
+    def rank_palavras_chave(self, palavras: List[str]) -> List[str]:
+        """Retorna as palavras mais frequentes (ou de maior TF-IDF), sem as stop words"""
         
-        # Extrai palavras significativas
-        palavras = re.findall(r'\b\w+\b', texto.lower())
-        palavras_filtradas = [p for p in palavras if len(p) > 3 and p not in stop_words]
+        if self.tfidf is not None:
+            return self.tfidf.rank([palavras])[0]
         
-        # Conta frequência
-        freq = {}
-        for palavra in palavras_filtradas:
-            freq[palavra] = freq.get(palavra, 0) + 1
+        # Conta frequência (a ordem de primeira ocorrência desempata)
+        freq = Counter(palavras)
+        for stop_word in self.stop_words:
+            freq.pop(stop_word, None)
         
         # Retorna as mais frequentes
-        return sorted(freq.keys(), key=lambda x: freq[x], reverse=True)[:10]
+        return sorted(freq, key=freq.__getitem__, reverse=True)[:10]
 
-    def process_siman(self, row: Dict[str, Any]) -> ProcessedSiman:
-        """Processa um siman completo"""
+    def rank_documentos(self, documentos: List[List[str]]) -> List[List[str]]:
+        """rank_palavras_chave de vários textos de uma vez (vetorizado com TF-IDF)"""
         
-        content = row['content']
+        if self.tfidf is not None:
+            return self.tfidf.rank(documentos)
+        return [self.rank_palavras_chave(palavras) for palavras in documentos]
+
+    def fit_tfidf(self, csv_file: str) -> None:
+        """Conta a frequência de documentos das palavras no CSV inteiro e passa a ranquear por TF-IDF"""
+        
+        tfidf = TfidfKeywords(self.stop_words)
+        with open_rows(csv_file) as rows:
+            for row in rows:
+                tfidf.add_siman(row['content'])
+        self.tfidf = tfidf
+
+    def parse_siman(self, row: Dict[str, Any]) -> ParsedSiman:
+        """Analisa o siman uma única vez: texto normalizado, seifim e tokens"""
         
-        # Extrai assunto
-        assunto, assunto_resumido, confianca = self.extract_assunto(content)
+        return ParsedSiman(row, self.keyword_matcher)
+
+    def process_siman(self, row: Dict[str, Any]) -> ProcessedSiman:
+        """Processa um siman completo"""
         
-        # Separa seifim
-        seifim = self.extract_seifim(content)
+        return self.process_batch([row])[0]
+
+    def score_categories(self, encontradas: Sequence[Set[str]]) -> CategoryScores:
+        """Categorias (principal, pontuações e pesos) e tags de vários simanim de uma vez"""
         
-        # Categoriza
-        categoria = self.categorize_assunto(assunto, content)
+        return self.category_scorer.score(encontradas)
+
+    def process_batch(self, rows: Sequence[Dict[str, Any]]) -> List[ProcessedSiman]:
+        """Processa um bloco de simanim: categorias e tags de todos são pontuadas de uma vez"""
+        
+        analisados = [self.parse_siman(row) for row in rows]
+        
+        # Assunto e palavras-chave pelas estratégias do processador; categorias e tags do bloco inteiro
+        resultados = [run_strategies(parsed, self.batch_strategies) for parsed in analisados]
+        pontuacao = self.score_categories([
+            parsed.analise.encontradas(resultado.titulo.assunto) for parsed, resultado in zip(analisados, resultados)
+        ])
+        
+        processados = []
+        for indice, (row, parsed, resultado) in enumerate(zip(rows, analisados, resultados)):
+            processados.append(ProcessedSiman(
+                original_id=row['id'],
+                chapter_id=row['chapter_id'],
+                assunto=resultado.titulo.assunto,
+                assunto_resumido=resultado.titulo.assunto_resumido,
+                categoria=pontuacao.categorias[indice],
+                categorias=pontuacao.pesos[indice],
+                tags=intern_all(pontuacao.tags[indice]),
+                seifim=parsed.seif_records(resultado.palavras_chave_seifim, self.extract_seif_assunto),
+                confianca=resultado.titulo.confianca,
+                palavras_chave=intern_all(resultado.palavras_chave)
+            ))
+        
+        # Contados só com o bloco inteiro pronto (um bloco com erro é refeito siman a siman)
+        for resultado in resultados:
+            # 'outro': estratégia de título que não informa o padrão (ex.: compare_strategies --title)
+            self.metrics.count('padroes_cabecalho', resultado.titulo.padrao or 'outro')
+        return processados
+
+    def uses_fallback_title(self, siman: ProcessedSiman) -> bool:
+        """O título do siman veio do fallback por palavras-chave (nenhum padrão de cabeçalho reconhecido)?"""
         
-        # Extrai tags
-        tags = self.extract_tags(assunto, content)
+        return siman.confianca in self.fallback_confidences
+
+    def apply_title(self, siman: ProcessedSiman, assunto: str, assunto_resumido: str) -> None:
+        """Troca o título do siman (ex.: o do modelo) e refaz o que depende dele: palavras-chave, categorias e tags"""
+        
+        analise = SimanAnalysis(siman.seifim.content, self.keyword_matcher)
+        pontuacao = self.score_categories([analise.encontradas(assunto)])
+        siman.assunto = assunto
+        siman.assunto_resumido = assunto_resumido
+        siman.categoria = pontuacao.categorias[0]
+        siman.categorias = pontuacao.pesos[0]
+        siman.tags = intern_all(pontuacao.tags[0])
+        siman.palavras_chave = intern_all(self.strategies.keywords([analise.palavras_siman(assunto)])[0])
+
+    def iter_csv(self, csv_file: str, workers: int = 1,
+                 filtro: Optional[Callable[[Dict[str, Any]], bool]] = None,
+                 selecao: Optional[RowSelection] = None) -> Iterator[ProcessedSiman]:
+        """Processa o CSV linha a linha, devolvendo cada siman assim que fica pronto
+        
+        csv_file também pode ser o diretório das planilhas exportadas (tabelas/), lidas em streaming.
+        Com workers > 1 as linhas são processadas em paralelo e devolvidas na ordem do CSV.
+        filtro, se informado, escolhe as linhas a processar. selecao (chapter_id, ids, faixa de linhas)
+        lê só as linhas escolhidas, pelo índice de offsets do CSV. Os erros de cada linha ficam em self.errors.
+        """
+        
+        self.errors = []
+        
+        with open_selected_rows(csv_file, selecao) as linhas:
+            if filtro is not None:
+                linhas = ((i, row) for i, row in linhas if filtro(row))
+            
+            if workers > 1:
+                processed_rows = process_parallel(self, linhas, workers)
+            else:
+                processed_rows = process_rows(self, linhas)
+            
+            for i, processed, erro in processed_rows:
+                if erro is not None:
+                    print(f"Erro ao processar linha {i}: {erro.tipo}: {erro}")
+                    self.errors.append(erro)
+                    self.metrics.row_failed()
+                    continue
+                
+                self.metrics.row_done(len(processed.seifim))
+                yield processed
+
+    def iter_snapshot(self, snapshot_file: str) -> Iterator[ProcessedSiman]:
+        """Devolve os simanim de um snapshot (process_csv com snapshot=...), sem reprocessar o CSV"""
         
-        # Extrai palavras-chave
-        palavras_chave = self.extract_palavras_chave(assunto + ' ' + content)
+        self.errors = []
         
-        return ProcessedSiman(
-            original_id=row['id'],
-            chapter_id=row['chapter_id'],
-            assunto=assunto,
-            assunto_resumido=assunto_resumido,
-            categoria=categoria,
-            tags=tags,
-            seifim=seifim,
-            confianca=confianca,
-            palavras_chave=palavras_chave
-        )
+        with load_snapshot(snapshot_file, ProcessedSiman) as snapshot:
+            for siman in snapshot:
+                self.metrics.row_done(len(siman.seifim))
+                yield siman
+
+    def snapshot_metadata(self, csv_file: str) -> Dict[str, str]:
+        """Metadados gravados no snapshot: processador, CSV de origem e versão do processador"""
+        
+        keywords = 'tfidf' if self.tfidf is not None else 'frequencia'
+        return {
+            'processador': type(self).__name__,
+            'csv': csv_file,
+            'keywords': keywords,
+            'processor_version': processor_version(__file__, keywords),
+        }
 
-    def process_csv(self, csv_file: str) -> List[ProcessedSiman]:
-        """Processa todo o CSV"""
+    def process_csv(self, csv_file: str, workers: int = 1, snapshot: Optional[str] = None) -> List[ProcessedSiman]:
+        """Processa todo o CSV
         
-        processed_simanim = []
-        
-        with open(csv_file, 'r', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            
-            for i, row in enumerate(reader):
-                if i % 100 == 0:
-                    print(f"Processando linha {i}...")
-                
-                try:
-                    processed = self.process_siman(row)
-                    processed_simanim.append(processed)
-                except Exception as e:
-                    print(f"Erro ao processar linha {i}: {e}")
-                    continue
+        snapshot, se informado, é o arquivo onde gravar o resultado para recarregar com load_snapshot.
+        """
         
+        processed_simanim = list(self.iter_csv(csv_file, workers))
+        if snapshot is not None:
+            save_snapshot(processed_simanim, snapshot, **self.snapshot_metadata(csv_file))
         return processed_simanim
 
-    def generate_sql(self, processed_simanim: List[ProcessedSiman]) -> str:
-        """Gera SQL com todos os dados processados"""
-        
-        sql_parts = []
+    def sql_rows(self, siman: ProcessedSiman) -> List[Tuple[str, Tuple[Any, ...]]]:
+        """Gera as linhas de um siman para cada tabela, como pares (tabela, valores)"""
+        
+        rows = []
+        
+        # Linha de assuntos
+        tipo = 'extraído'
+        rows.append(('assuntos', (
+            stable_id('assuntos', siman.original_id), siman.original_id, siman.chapter_id, siman.assunto,
+            siman.assunto_resumido, tipo, siman.confianca, siman.palavras_chave
+        )))
+        
+        # Linhas de seifim
+        for seif in siman.seifim:
+            rows.append(('seifim', (
+                stable_id('seifim', siman.original_id, seif['numero']),
+                siman.original_id, siman.chapter_id, seif['numero'], seif['conteudo'],
+                seif['assunto'], seif['palavras_chave'], seif['tamanho'], seif['ordem']
+            )))
+        
+        # Relacionamentos categoria, com o peso de cada uma (a principal primeiro)
+        for categoria, peso in siman.categorias:
+            rows.append(('siman_categorias', (
+                stable_id('siman_categorias', siman.original_id, categoria),
+                siman.original_id, self.categoria_ids[categoria], peso
+            )))
+        
+        # Relacionamentos tags
+        for tag in siman.tags:
+            rows.append(('siman_tags', (
+                stable_id('siman_tags', siman.original_id, tag), siman.original_id, self.tag_ids[tag], 1.0
+            )))
+        
+        return rows
+
+    def write_sql(self, processed_simanim: Iterable[ProcessedSiman], output: TextIO, formato: str = 'insert') -> None:
+        """Escreve o SQL dos simanim direto em um arquivo, sem montar o texto inteiro em memória"""
         
-        # INSERT para assuntos
-        sql_parts.append("-- =====================================================")
-        sql_parts.append("-- INSERÇÃO DOS ASSUNTOS PROCESSADOS")
-        sql_parts.append("-- =====================================================")
+        with SqlWriter(output, self.sql_sections, formato) as writer:
+            for siman in processed_simanim:
+                writer.write_many(self.sql_rows(siman))
+
+    def generate_sql(self, processed_simanim: List[ProcessedSiman], formato: str = 'insert') -> str:
+        """Gera SQL com todos os dados processados"""
         
-        for siman in processed_simanim:
-            assunto_escaped = siman.assunto.replace("'", "''")
-            assunto_resumido_escaped = siman.assunto_resumido.replace("'", "''")
-            palavras_chave_str = "{" + ",".join([f'"{p}"' for p in siman.palavras_chave]) + "}"
-            
-            sql = f"""
-INSERT INTO assuntos (id, siman_id, divisao_id, assunto, assunto_resumido, tipo, confianca, palavras_chave) VALUES
-('{uuid.uuid4()}', '{siman.original_id}', '{siman.chapter_id}', '{assunto_escaped}', '{assunto_resumido_escaped}', 'extraído', {siman.confianca}, '{palavras_chave_str}');"""
-            sql_parts.append(sql)
-        
-        # INSERT para seifim
-        sql_parts.append("\n-- =====================================================")
-        sql_parts.append("-- INSERÇÃO DOS SEIFIM PROCESSADOS")
-        sql_parts.append("-- =====================================================")
-        
-        for siman in processed_simanim:
-            for seif in siman.seifim:
-                conteudo_escaped = seif['conteudo'].replace("'", "''")
-                assunto_escaped = seif['assunto'].replace("'", "''")
-                palavras_chave_str = "{" + ",".join([f'"{p}"' for p in seif['palavras_chave']]) + "}"
-                
-                sql = f"""
-INSERT INTO seifim (id, siman_id, divisao_id, seif_numero, conteudo, assunto, palavras_chave, tamanho, ordem) VALUES
-('{uuid.uuid4()}', '{siman.original_id}', '{siman.chapter_id}', {seif['numero']}, '{conteudo_escaped}', '{assunto_escaped}', '{palavras_chave_str}', {seif['tamanho']}, {seif['ordem']});"""
-                sql_parts.append(sql)
-        
-        # INSERT para relacionamentos categoria
-        sql_parts.append("\n-- =====================================================")
-        sql_parts.append("-- INSERÇÃO DOS RELACIONAMENTOS CATEGORIA")
-        sql_parts.append("-- =====================================================")
-        
-        for siman in processed_simanim:
-            sql = f"""
-INSERT INTO siman_categorias (id, siman_id, categoria_id, confianca) VALUES
-('{uuid.uuid4()}', '{siman.original_id}', (SELECT id FROM categorias WHERE nome = '{siman.categoria}'), {siman.confianca});"""
-            sql_parts.append(sql)
-        
-        # INSERT para relacionamentos tags
-        sql_parts.append("\n-- =====================================================")
-        sql_parts.append("-- INSERÇÃO DOS RELACIONAMENTOS TAGS")
-        sql_parts.append("-- =====================================================")
-        
-        for siman in processed_simanim:
-            for tag in siman.tags:
-                sql = f"""
-INSERT INTO siman_tags (id, siman_id, tag_id, relevancia) VALUES
-('{uuid.uuid4()}', '{siman.original_id}', (SELECT id FROM tags WHERE nome = '{tag}'), 1.0);"""
-                sql_parts.append(sql)
-        
-        return "\n".join(sql_parts)
+        buffer = io.StringIO()
+        self.write_sql(processed_simanim, buffer, formato)
+        return buffer.getvalue()
 
 def main():
     """Função principal"""
     
+    parser = argparse.ArgumentParser(description="Processa o CSV do Shulchan Aruch e gera populated_data.sql")
+    parser.add_argument('--input', default='csv/content_rows.csv',
+                        help="CSV de conteúdo (padrão) ou diretório com as planilhas exportadas do Supabase "
+                             "(tabelas/: Content, Chapters e Books, lidas em streaming; exige openpyxl)")
+    parser.add_argument('--output', metavar='ARQUIVO',
+                        help="Arquivo SQL gerado (padrão populated_data.sql; populated_data_delta.sql "
+                             "com --incremental e populated_data_selecao.sql com --chapter-id, --ids ou --rows)")
+    parser.add_argument('--chapter-id', nargs='+', default=[], metavar='ID',
+                        help="Processa só as linhas desses chapter_id (separados por espaço ou vírgula)")
+    parser.add_argument('--ids', nargs='+', default=[], metavar='ID',
+                        help="Processa só as linhas com esses id (separados por espaço ou vírgula)")
+    parser.add_argument('--rows', type=row_range, metavar='INICIO:FIM',
+                        help="Processa só essa faixa de linhas do CSV (contadas a partir de 0, como nos erros; FIM "
+                             "não incluído; N para uma linha). Os filtros leem o CSV pelo índice de offsets "
+                             "'<csv>.idx', criado na primeira vez e refeito quando o CSV muda")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Número de processos para processar os simanim (0 = todos os núcleos)")
+    parser.add_argument('--format', dest='formato', choices=sorted(FORMATS), default='insert',
+                        help="insert: um INSERT por linha (padrão); values: INSERTs em lote, aceitos pelo "
+                             "SQL Editor do Supabase; copy: blocos COPY FROM STDIN para carregar com psql")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Processa só as linhas novas ou alteradas desde o último manifesto e gera "
+                             "populated_data_delta.sql com upserts e remoções")
+    parser.add_argument('--manifest', default='populated_data.manifest.json',
+                        help="Manifesto com o hash de cada linha já processada (atualizado a cada execução)")
+    parser.add_argument('--keywords', choices=['frequencia', 'tfidf'], default='frequencia',
+                        help="frequencia: palavras mais frequentes em cada texto (padrão); tfidf: pontuadas "
+                             "pelo IDF do corpus (uma passada extra pelo CSV)")
+    parser.add_argument('--report', default='populated_data.report.json',
+                        help="Relatório JSON da execução: tempo e chamadas por método, padrões de cabeçalho, "
+                             "simanim/s, pico de memória e erros")
+    parser.add_argument('--profile', metavar='ARQUIVO',
+                        help="Grava um perfil cProfile do processamento (só o processo principal; "
+                             "veja com python -m pstats ARQUIVO)")
+    parser.add_argument('--database', metavar='URL',
+                        help="Carrega direto no banco em vez de gerar o arquivo SQL: postgresql://... "
+                             "(COPY em lotes), sqlite:///arquivo.db (mesmo schema, sem servidor) ou "
+                             "https://<projeto>.supabase.co/rest/v1 (upserts por PostgREST; chave em POSTGREST_API_KEY)")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                        help=f"Linhas por lote (e por transação) com --database (padrão {BATCH_SIZE})")
+    parser.add_argument('--connections', type=int, default=4,
+                        help="Conexões (Postgres) ou requisições simultâneas (PostgREST) da carga com --database; "
+                             "com todas ocupadas o processamento espera (padrão 4)")
+    parser.add_argument('--search-index', metavar='ARQUIVO',
+                        help="Grava também o índice de busca BM25 dos seifim e assuntos (ex.: populated_data.bm25; "
+                             "consulte com search_seifim.py)")
+    parser.add_argument('--save-snapshot', metavar='ARQUIVO',
+                        help="Grava também um snapshot binário dos simanim processados (ex.: populated_data.snapshot), "
+                             "para gerar de novo o SQL, o banco ou o índice sem reprocessar o CSV")
+    parser.add_argument('--from-snapshot', metavar='ARQUIVO',
+                        help="Lê os simanim de um snapshot gravado com --save-snapshot em vez de processar o CSV "
+                             "(não usa nem atualiza o manifesto)")
+    parser.add_argument('--title-model', metavar='URL',
+                        help="Endpoint de modelo para os títulos dos simanim sem cabeçalho (só os que caem no "
+                             "fallback); veja shulchan_pipeline/model_titles.py e benchmarks/title_model_stub.py")
+    parser.add_argument('--title-cache', default=CACHE_PATH,
+                        help=f"Cache em disco dos títulos do modelo (padrão {CACHE_PATH}); novas execuções "
+                             "não chamam o endpoint para o mesmo conteúdo")
+    parser.add_argument('--title-concurrency', type=int, default=4,
+                        help="Requisições simultâneas ao endpoint de títulos (padrão 4)")
+    parser.add_argument('--title-batch', type=int, default=8, help="Simanim por requisição (padrão 8)")
+    parser.add_argument('--title-timeout', type=float, default=30.0,
+                        help="Timeout de cada requisição em segundos (padrão 30; refeita até 2 vezes)")
+    parser.add_argument('--related', metavar='ARQUIVO',
+                        help="Calcula os seifim relacionados (MinHash/LSH, exige NumPy): grava a tabela "
+                             "seifim_relacionados no SQL (ou no banco) e o arquivo compacto (ex.: populated_data.related)")
+    parser.add_argument('--shards', metavar='DIRETORIO',
+                        help="Grava o SQL em shards por tabela nesse diretório (ex.: populated_data.shards), com "
+                             "manifest.json (ordem de carga e sha256); carregue em paralelo com load_shards.py")
+    parser.add_argument('--shard-size', type=float, default=MAX_BYTES / 1024 / 1024,
+                        help=f"Tamanho máximo de cada shard em MB, sem compressão (padrão {MAX_BYTES // 1024 // 1024})")
+    parser.add_argument('--shard-rows', type=int, help="Linhas no máximo por shard (padrão: sem limite)")
+    parser.add_argument('--compress', choices=[compressao for compressao in COMPRESSIONS if compressao],
+                        help="Comprime os shards (zstd exige o zstandard)")
+    args = parser.parse_args()
+    selecao = RowSelection(
+        [valor for item in args.chapter_id for valor in item.split(',') if valor],
+        [valor for item in args.ids for valor in item.split(',') if valor],
+        args.rows,
+    )
+    if selecao and (args.incremental or args.from_snapshot or args.save_snapshot):
+        parser.error("--chapter-id, --ids e --rows escolhem parte do CSV e não podem ser usados com --incremental, "
+                     "--from-snapshot nem --save-snapshot")
+    if args.output and (args.database or args.shards):
+        parser.error("--output é o arquivo SQL e não pode ser usado com --database nem --shards")
+    if args.shards and (args.incremental or args.database):
+        parser.error("--shards divide o SQL do corpus inteiro e não pode ser usado com --incremental nem --database")
+    if args.compress and not args.shards:
+        parser.error("--compress vale só para os shards (use com --shards)")
+    if args.search_index and args.incremental:
+        parser.error("--search-index indexa o CSV inteiro e não pode ser usado com --incremental")
+    if (args.save_snapshot or args.from_snapshot) and args.incremental:
+        parser.error("--save-snapshot e --from-snapshot tratam o corpus inteiro e não podem ser usados "
+                     "com --incremental")
+    if args.related and args.incremental:
+        parser.error("--related compara os seifim do corpus inteiro e não pode ser usado com --incremental")
+    workers = resolve_workers(args.workers)
+    if args.output:
+        output = args.output
+    elif args.incremental:
+        output = 'populated_data_delta.sql'
+    elif selecao:
+        output = 'populated_data_selecao.sql'
+    else:
+        output = 'populated_data.sql'
+    if args.database:
+        output = redact_url(args.database)
+    elif args.shards:
+        output = args.shards
+    
     print("Iniciando processamento do Shulchan Aruch com IA...")
     
     processor = ShulchanAruchProcessor()
     
-    # Processa o CSV
-    print("Lendo e processando CSV...")
-    processed_simanim = processor.process_csv('csv/content_rows.csv')
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler is not None:
+        profiler.enable()
+    processor.metrics.start()
+    
+    # Opções que mudam o resultado entram na versão do processador (manifesto e snapshot)
+    opcoes_versao = [args.keywords] + ([PROMPT_VERSION, args.title_model] if args.title_model else [])
+    versao = processor_version(__file__, *opcoes_versao)
     
-    print(f"Processados {len(processed_simanim)} simanim")
+    if args.from_snapshot:
+        # As palavras-chave já estão no snapshot; só confere se ele é desta versão do processador
+        with load_snapshot(args.from_snapshot) as snapshot:
+            if snapshot.metadata.get('processor_version') != versao:
+                print(f"Aviso: '{args.from_snapshot}' foi gravado por outra versão do processador "
+                      f"(ou com --keywords {snapshot.metadata.get('keywords')})")
+    elif args.keywords == 'tfidf':
+        print("Calculando o IDF das palavras no corpus...")
+        processor.fit_tfidf(args.input)
     
-    # Gera SQL
+    # O IDF é do corpus inteiro: com --keywords tfidf, qualquer mudança no CSV muda as palavras-chave
+    # de todos os simanim, então o manifesto também depende dele (e tudo é reprocessado)
+    versao_manifesto = versao
+    if processor.tfidf is not None:
+        versao_manifesto = processor_version(__file__, *opcoes_versao, processor.tfidf.digest())
+    
+    # Estatísticas, acumuladas enquanto os simanim passam
+    tags_unicas = set()
+    indice_busca = SearchIndexBuilder() if args.search_index else None
+    snapshot_writer = SnapshotWriter(ProcessedSiman.__slots__) if args.save_snapshot else None
+    relacionados = RelatedSeifimBuilder() if args.related else None
+    secoes = processor.sql_sections + ([RELATED_SECTION] if relacionados is not None else [])
+    
+    # Processa o CSV e grava o SQL em streaming, um siman por vez
+    print("Lendo e processando CSV...")
     print("Gerando SQL...")
-    sql_content = processor.generate_sql(processed_simanim)
+    # O manifesto escolhe as linhas a reprocessar (no modo incremental) e registra os hashes
+    if args.from_snapshot:
+        diff = None
+        simanim = processor.iter_snapshot(args.from_snapshot)
+    elif selecao:
+        # Só parte do CSV: o manifesto não é usado nem atualizado
+        diff = None
+        simanim = processor.iter_csv(args.input, workers, selecao=selecao)
+    else:
+        diff = ManifestDiff(Manifest.load(args.manifest), versao_manifesto, args.incremental)
+        simanim = processor.iter_csv(args.input, workers, diff.wants)
+    titulos_modelo = None
+    with contextlib.ExitStack() as stack:
+        if args.title_model:
+            # Só os simanim que caem no fallback vão ao modelo (ou saem do cache)
+            client = ModelTitleClient(args.title_model, args.title_concurrency, args.title_timeout)
+            titulos_modelo = stack.enter_context(ModelTitles(client, TitleCache(args.title_cache), args.title_batch))
+            simanim = titulos_modelo.enrich(simanim, processor.uses_fallback_title, processor.apply_title)
+        if args.database:
+            # No banco cada siman substitui as linhas que já tinha (carga repetível)
+            writer = stack.enter_context(open_sink(args.database, secoes, args.batch_size, args.connections))
+        elif args.shards:
+            writer = stack.enter_context(ShardedSqlWriter(
+                args.shards, secoes, args.formato, int(args.shard_size * 1024 * 1024), args.shard_rows, args.compress
+            ))
+        else:
+            f = stack.enter_context(open(output, 'w', encoding='utf-8'))
+            writer = stack.enter_context(SqlWriter(f, secoes, args.formato, upsert=args.incremental))
+        processor.metrics.instrument(writer, ['write_many', 'write_siman'], type(writer).__name__ + '.')
+        for siman in simanim:
+            if args.incremental or args.database:
+                writer.write_siman(siman.original_id, processor.sql_rows(siman))
+            else:
+                writer.write_many(processor.sql_rows(siman))
+            if diff is not None:
+                diff.processed(siman.original_id)
+            if indice_busca is not None:
+                indice_busca.add_siman(siman)
+            if snapshot_writer is not None:
+                snapshot_writer.add(siman)
+            if relacionados is not None:
+                relacionados.add_siman(siman)
+            
+            tags_unicas.update(siman.tags)
+        
+        if relacionados is not None:
+            # Dependem de todos os seifim: vão depois do último siman
+            writer.write_many(relacionados.sql_rows())
+        if args.incremental:
+            for siman_id in diff.removidos:
+                writer.delete_siman(siman_id)
     
-    # Salva SQL
-    with open('populated_data.sql', 'w', encoding='utf-8') as f:
-        f.write(sql_content)
+    if diff is not None:
+        diff.manifest.save(args.manifest)
+    if indice_busca is not None:
+        indice_busca.write(args.search_index)
+    if snapshot_writer is not None:
+        metadados = {**processor.snapshot_metadata(args.input), 'processor_version': versao}
+        snapshot_writer.write(args.save_snapshot, **metadados)
+    if relacionados is not None:
+        relacionados.write(args.related)
     
-    print("Processamento concluido!")
-    print("Arquivo 'populated_data.sql' gerado com todos os dados processados")
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(args.profile)
     
-    # Estatísticas
-    total_seifim = sum(len(s.seifim) for s in processed_simanim)
-    total_tags = len(set(tag for s in processed_simanim for tag in s.tags))
+    total_simanim = processor.metrics.simanim
+    total_seifim = processor.metrics.seifim
+    
+    print(f"Processados {total_simanim} simanim")
+    
+    print("Processamento concluido!")
+    if args.database:
+        print(f"Dados carregados em '{output}' ({writer.lotes} lotes)")
+    elif args.shards:
+        print(f"Shards gerados em '{output}': {len(writer.shards)} arquivos, na ordem de carga em manifest.json")
+    else:
+        print(f"Arquivo '{output}' gerado com todos os dados processados")
     
     print(f"\nEstatisticas:")
-    print(f"   - Simanim processados: {len(processed_simanim)}")
+    print(f"   - Simanim processados: {total_simanim}")
+    if selecao.selecionadas is not None:
+        print(f"   - Linhas selecionadas: {selecao.selecionadas} de {selecao.total} "
+              f"(índice '{index_path(args.input)}' {selecao.indice})")
     print(f"   - Seifim extraidos: {total_seifim}")
-    print(f"   - Tags unicas: {total_tags}")
+    print(f"   - Tags unicas: {len(tags_unicas)}")
+    if args.incremental:
+        print(f"   - Simanim inalterados: {diff.inalterados}")
+        print(f"   - Simanim removidos: {len(writer.removidos)}")
+        if diff.completo:
+            print("   - Manifesto ausente ou de outra versão do processador: todas as linhas foram reprocessadas")
+    
+    if processor.errors:
+        print(f"   - Linhas com erro: {len(processor.errors)}")
+        for erro in processor.errors:
+            print(f"     linha {erro.linha} (worker {erro.worker}): {erro.tipo}: {erro.mensagem}")
+    
+    processor.metrics.write_report(
+        args.report,
+        processador=type(processor).__name__,
+        opcoes={'workers': workers, 'formato': args.formato, 'incremental': args.incremental,
+                'keywords': args.keywords, 'database': bool(args.database), 'from_snapshot': args.from_snapshot,
+                'title_model': bool(args.title_model), 'related': bool(args.related),
+                'shards': bool(args.shards), 'compress': args.compress,
+                'selecao': selecao.as_dict() if selecao else None},
+        titulos_modelo=titulos_modelo.report() if titulos_modelo is not None else None,
+        saida=output,
+        tags_unicas=len(tags_unicas),
+        linhas_com_erro=[asdict(erro) for erro in processor.errors],
+    )
+    if indice_busca is not None:
+        print(f"Índice de busca em '{args.search_index}' ({len(indice_busca)} documentos)")
+    if snapshot_writer is not None:
+        print(f"Snapshot dos simanim em '{args.save_snapshot}' ({snapshot_writer.simanim} simanim)")
+    if relacionados is not None:
+        print(f"Seifim relacionados em '{args.related}' ({len(relacionados)} seifim)")
+    if titulos_modelo is not None:
+        contadores = titulos_modelo.report()
+        print(f"Títulos do modelo: {contadores.get('modelo', 0)} do endpoint ({contadores['chamadas']} requisições), "
+              f"{contadores.get('cache', 0)} do cache, {contadores.get('sem_resposta', 0)} com o título do fallback")
+    print(f"Relatório da execução em '{args.report}'")
+    if args.profile:
+        print(f"Perfil cProfile em '{args.profile}'")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Busca ranqueada (BM25) nos seifim e assuntos, sem banco, usando o índice
+gravado pelo processamento com --search-index
+
+    python process_content_improved.py --search-index populated_data_improved.bm25
+    python search_seifim.py "carne com leite"
+    python search_seifim.py shabat vela --tipo seif -n 5 --json
+"""
+
+import argparse
+import json
+import time
+
+from shulchan_pipeline.search_index import TIPOS, SearchIndex
+
+
+def main():
+    """Função principal"""
+
+    parser = argparse.ArgumentParser(description="Busca nos seifim e assuntos pelo índice BM25")
+    parser.add_argument('consulta', nargs='+', help="Termos da busca")
+    parser.add_argument('--index', default='populated_data_improved.bm25', help="Arquivo do índice")
+    parser.add_argument('-n', '--limit', type=int, default=10, help="Número de resultados")
+    parser.add_argument('--tipo', choices=TIPOS, help="Só seifim ou só assuntos")
+    parser.add_argument('--json', action='store_true', help="Resultados em JSON, um por linha")
+    args = parser.parse_args()
+
+    consulta = ' '.join(args.consulta)
+    with SearchIndex(args.index) as indice:
+        inicio = time.perf_counter()
+        resultados = indice.search(consulta, args.limit, args.tipo)
+        duracao = time.perf_counter() - inicio
+
+        for resultado in resultados:
+            if args.json:
+                print(json.dumps(resultado._asdict(), ensure_ascii=False))
+            else:
+                local = f"seif {resultado.seif_numero}" if resultado.tipo == 'seif' else "assunto"
+                print(f"{resultado.score:7.3f}  {resultado.siman_id}  {local:>9}  {resultado.rotulo[:80]}")
+
+        if not args.json:
+            print(f"{len(resultados)} resultados em {duracao * 1000:.3f} ms ({len(indice)} documentos)")
+
+
+if __name__ == "__main__":
+    main()
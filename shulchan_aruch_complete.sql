@@ -100,6 +100,34 @@ CREATE TABLE IF NOT EXISTS seif_tags (
     UNIQUE(seif_id, tag_id)
 );
 
+-- Seifim relacionados (MinHash/LSH), calculados no processamento com --related:
+-- uma linha por seif, com os mais parecidos de outros simanim
+CREATE TABLE IF NOT EXISTS seifim_relacionados (
+    id UUID PRIMARY KEY,
+    siman_id UUID NOT NULL,
+    relacionados UUID[] NOT NULL,
+    similaridades REAL[] NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Colunas de busca (tsvector com pesos), calculadas quando a linha é gravada:
+-- assunto 'A', palavras-chave do processamento 'B', conteúdo do seif 'C'
+CREATE OR REPLACE FUNCTION palavras_chave_texto(palavras TEXT[])
+RETURNS TEXT AS $$
+    SELECT coalesce(array_to_string(palavras, ' '), '');
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+ALTER TABLE assuntos ADD COLUMN IF NOT EXISTS busca TSVECTOR GENERATED ALWAYS AS (
+    setweight(to_tsvector('portuguese', coalesce(assunto, '')), 'A') ||
+    setweight(to_tsvector('portuguese', palavras_chave_texto(palavras_chave)), 'B')
+) STORED;
+
+ALTER TABLE seifim ADD COLUMN IF NOT EXISTS busca TSVECTOR GENERATED ALWAYS AS (
+    setweight(to_tsvector('portuguese', coalesce(assunto, '')), 'A') ||
+    setweight(to_tsvector('portuguese', palavras_chave_texto(palavras_chave)), 'B') ||
+    setweight(to_tsvector('portuguese', conteudo), 'C')
+) STORED;
+
 -- =====================================================
 -- PARTE 2: ÍNDICES PARA PERFORMANCE
 -- =====================================================
@@ -107,14 +135,16 @@ CREATE TABLE IF NOT EXISTS seif_tags (
 -- Índices para assuntos
 CREATE INDEX IF NOT EXISTS idx_assuntos_siman_id ON assuntos(siman_id);
 CREATE INDEX IF NOT EXISTS idx_assuntos_divisao_id ON assuntos(divisao_id);
-CREATE INDEX IF NOT EXISTS idx_assuntos_assunto_gin ON assuntos USING gin(to_tsvector('portuguese', assunto));
+DROP INDEX IF EXISTS idx_assuntos_assunto_gin;
+CREATE INDEX IF NOT EXISTS idx_assuntos_busca ON assuntos USING gin(busca);
 CREATE INDEX IF NOT EXISTS idx_assuntos_palavras_chave ON assuntos USING gin(palavras_chave);
 
 -- Índices para seifim
 CREATE INDEX IF NOT EXISTS idx_seifim_siman_id ON seifim(siman_id);
 CREATE INDEX IF NOT EXISTS idx_seifim_divisao_id ON seifim(divisao_id);
 CREATE INDEX IF NOT EXISTS idx_seifim_numero ON seifim(seif_numero);
-CREATE INDEX IF NOT EXISTS idx_seifim_conteudo_gin ON seifim USING gin(to_tsvector('portuguese', conteudo));
+DROP INDEX IF EXISTS idx_seifim_conteudo_gin;
+CREATE INDEX IF NOT EXISTS idx_seifim_busca ON seifim USING gin(busca);
 CREATE INDEX IF NOT EXISTS idx_seifim_palavras_chave ON seifim USING gin(palavras_chave);
 
 -- Índices para relacionamentos
@@ -124,6 +154,7 @@ CREATE INDEX IF NOT EXISTS idx_siman_tags_siman_id ON siman_tags(siman_id);
 CREATE INDEX IF NOT EXISTS idx_siman_tags_tag_id ON siman_tags(tag_id);
 CREATE INDEX IF NOT EXISTS idx_seif_tags_seif_id ON seif_tags(seif_id);
 CREATE INDEX IF NOT EXISTS idx_seif_tags_tag_id ON seif_tags(tag_id);
+CREATE INDEX IF NOT EXISTS idx_seifim_relacionados_siman_id ON seifim_relacionados(siman_id);
 
 -- Índices para categorias e tags
 CREATE INDEX IF NOT EXISTS idx_categorias_nome ON categorias(nome);
@@ -134,37 +165,37 @@ CREATE INDEX IF NOT EXISTS idx_tags_nome ON tags(nome);
 -- =====================================================
 
 -- Categorias básicas
-INSERT INTO categorias (nome, descricao, cor, icone, ordem) VALUES
-('Orações', 'Leis relacionadas às orações diárias, Shabat e festividades', '#3B82F6', 'prayer', 1),
-('Kashrut', 'Leis sobre alimentos permitidos e proibidos', '#10B981', 'food', 2),
-('Casamento', 'Leis sobre casamento, divórcio e relacionamentos', '#F59E0B', 'heart', 3),
-('Shabat', 'Leis específicas do Shabat', '#8B5CF6', 'calendar', 4),
-('Festividades', 'Leis das festividades judaicas', '#EF4444', 'star', 5),
-('Comércio', 'Leis comerciais e contratos', '#06B6D4', 'briefcase', 6),
-('Tzedaká', 'Caridade e justiça social', '#84CC16', 'gift', 7),
-('Sinagoga', 'Leis sobre sinagogas e locais sagrados', '#F97316', 'building', 8),
-('Família', 'Leis familiares e educação', '#EC4899', 'users', 9),
-('Pureza', 'Leis de pureza ritual', '#6366F1', 'droplet', 10),
-('Justiça', 'Leis judiciais e procedimentos legais', '#14B8A6', 'scale', 11),
-('Miscelânea', 'Outros assuntos diversos', '#6B7280', 'more-horizontal', 99)
+INSERT INTO categorias (id, nome, descricao, cor, icone, ordem) VALUES
+('13d364c3-fc09-505e-8d48-c95aec3c3a99', 'Orações', 'Leis relacionadas às orações diárias, Shabat e festividades', '#3B82F6', 'prayer', 1),
+('991162a5-eb9c-5f53-a040-a02a1c9f12d4', 'Kashrut', 'Leis sobre alimentos permitidos e proibidos', '#10B981', 'food', 2),
+('95d75883-977e-563e-9050-8f808473b187', 'Casamento', 'Leis sobre casamento, divórcio e relacionamentos', '#F59E0B', 'heart', 3),
+('59b718ad-3f79-5e8d-b218-066814536735', 'Shabat', 'Leis específicas do Shabat', '#8B5CF6', 'calendar', 4),
+('53afaee7-7db6-52a7-8ec0-044e252c9444', 'Festividades', 'Leis das festividades judaicas', '#EF4444', 'star', 5),
+('8e537118-13ec-5777-b958-71b3c84b2aee', 'Comércio', 'Leis comerciais e contratos', '#06B6D4', 'briefcase', 6),
+('636fdf3d-f366-5026-8cbc-24331eed2310', 'Tzedaká', 'Caridade e justiça social', '#84CC16', 'gift', 7),
+('20d882ec-3187-56c5-99fb-ec997fbbea47', 'Sinagoga', 'Leis sobre sinagogas e locais sagrados', '#F97316', 'building', 8),
+('d6c5730f-d653-598d-bd6b-f3210e9ebb67', 'Família', 'Leis familiares e educação', '#EC4899', 'users', 9),
+('f3679023-e404-5358-9144-c71d4ddbc3d1', 'Pureza', 'Leis de pureza ritual', '#6366F1', 'droplet', 10),
+('48ef6e25-c85b-560a-8124-9cb8d704c76b', 'Justiça', 'Leis judiciais e procedimentos legais', '#14B8A6', 'scale', 11),
+('cabb1653-dd5f-5cb3-a63c-30270c7f02a7', 'Miscelânea', 'Outros assuntos diversos', '#6B7280', 'more-horizontal', 99)
 ON CONFLICT (nome) DO NOTHING;
 
 -- Tags básicas
-INSERT INTO tags (nome, descricao, cor) VALUES
-('obrigação', 'Leis obrigatórias', '#EF4444'),
-('proibição', 'Leis proibitivas', '#DC2626'),
-('permissão', 'Leis permissivas', '#10B981'),
-('costume', 'Costumes locais', '#F59E0B'),
-('emergência', 'Casos de emergência', '#F97316'),
-('mulher', 'Leis específicas para mulheres', '#EC4899'),
-('homem', 'Leis específicas para homens', '#3B82F6'),
-('criança', 'Leis relacionadas a crianças', '#84CC16'),
-('idoso', 'Leis relacionadas a idosos', '#6B7280'),
-('doente', 'Leis para pessoas doentes', '#8B5CF6'),
-('viagem', 'Leis para viajantes', '#06B6D4'),
-('casa', 'Leis domésticas', '#14B8A6'),
-('comunidade', 'Leis comunitárias', '#6366F1'),
-('indivíduo', 'Leis individuais', '#F59E0B')
+INSERT INTO tags (id, nome, descricao, cor) VALUES
+('4073dcec-130a-59ff-bac0-d52450883a63', 'obrigação', 'Leis obrigatórias', '#EF4444'),
+('1b7966d1-3a90-5480-a944-86eb4a96276e', 'proibição', 'Leis proibitivas', '#DC2626'),
+('a01f641f-e43a-5e76-9cf1-081b62645e8b', 'permissão', 'Leis permissivas', '#10B981'),
+('62c0df48-83db-56e7-b808-69a78ee2d94d', 'costume', 'Costumes locais', '#F59E0B'),
+('c059e18e-f00d-5718-909d-b9e0a2ef199c', 'emergência', 'Casos de emergência', '#F97316'),
+('955993b6-6106-5546-9ba5-d8e453eaad4d', 'mulher', 'Leis específicas para mulheres', '#EC4899'),
+('bd727bbe-c6a4-5e8f-b5ab-ce60be76415e', 'homem', 'Leis específicas para homens', '#3B82F6'),
+('1e1e79ac-faa3-5ed5-b6a3-bcc3b527d9dc', 'criança', 'Leis relacionadas a crianças', '#84CC16'),
+('e0a92aa1-983b-5957-a05f-196598c260ec', 'idoso', 'Leis relacionadas a idosos', '#6B7280'),
+('7eca4c4f-129d-5745-8958-98d6e711ab43', 'doente', 'Leis para pessoas doentes', '#8B5CF6'),
+('052e75fd-b41c-5014-9bc3-cdafd92f8ce3', 'viagem', 'Leis para viajantes', '#06B6D4'),
+('044a639e-ebfe-534e-9673-417528b153c2', 'casa', 'Leis domésticas', '#14B8A6'),
+('270a4b69-06a0-5f47-84c3-580adfe2cd09', 'comunidade', 'Leis comunitárias', '#6366F1'),
+('5fb752c2-4b6d-5185-962b-b4eb2b84e901', 'indivíduo', 'Leis individuais', '#F59E0B')
 ON CONFLICT (nome) DO NOTHING;
 
 -- =====================================================
@@ -251,9 +282,9 @@ BEGIN
         a.siman_id,
         a.assunto,
         a.divisao_id,
-        ts_rank(to_tsvector('portuguese', a.assunto), plainto_tsquery('portuguese', termo_busca)) as relevancia
-    FROM assuntos a
-    WHERE to_tsvector('portuguese', a.assunto) @@ plainto_tsquery('portuguese', termo_busca)
+        ts_rank(a.busca, consulta) as relevancia
+    FROM assuntos a, plainto_tsquery('portuguese', termo_busca) consulta
+    WHERE a.busca @@ consulta
     ORDER BY relevancia DESC;
 END;
 $$ LANGUAGE plpgsql;
@@ -274,13 +305,29 @@ BEGIN
         s.siman_id,
         s.seif_numero,
         s.conteudo,
-        ts_rank(to_tsvector('portuguese', s.conteudo), plainto_tsquery('portuguese', termo_busca)) as relevancia
-    FROM seifim s
-    WHERE to_tsvector('portuguese', s.conteudo) @@ plainto_tsquery('portuguese', termo_busca)
+        ts_rank(s.busca, consulta) as relevancia
+    FROM seifim s, plainto_tsquery('portuguese', termo_busca) consulta
+    WHERE s.busca @@ consulta
     ORDER BY relevancia DESC;
 END;
 $$ LANGUAGE plpgsql;
 
+-- Seifim relacionados a um seif (leitura pela chave primária)
+CREATE OR REPLACE FUNCTION buscar_seifim_relacionados(seif UUID)
+RETURNS TABLE (
+    seif_id UUID,
+    siman_id UUID,
+    seif_numero INTEGER,
+    similaridade REAL
+) AS $$
+    SELECT s.id, s.siman_id, s.seif_numero, r.similaridade
+    FROM seifim_relacionados sr,
+         unnest(sr.relacionados, sr.similaridades) WITH ORDINALITY AS r(seif_id, similaridade, posicao)
+    JOIN seifim s ON s.id = r.seif_id
+    WHERE sr.id = seif
+    ORDER BY r.posicao;
+$$ LANGUAGE sql STABLE;
+
 -- =====================================================
 -- PARTE 7: DADOS PROCESSADOS COM IA
 -- =====================================================
@@ -0,0 +1,10 @@
+"""
+Componentes compartilhados pelos scripts de processamento do Shulchan Aruch
+(process_content_with_ai.py e process_content_improved.py)
+"""
+
+from .analysis import SimanAnalysis
+from .keywords import KeywordMatcher
+from .sql_writer import SqlWriter
+
+__all__ = ['KeywordMatcher', 'SimanAnalysis', 'SqlWriter']
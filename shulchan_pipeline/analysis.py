@@ -0,0 +1,100 @@
+"""
+Análise compartilhada de um siman: o texto é normalizado e tokenizado uma única vez
+"""
+
+import re
+from typing import List, Optional, Sequence, Set, Tuple
+
+from .keywords import KeywordMatcher
+
+# Palavras significativas: sequências de \w com mais de 3 caracteres. Equivale a
+# re.findall(r'\b\w+\b', texto) filtrado por len(p) > 3, sem criar os tokens curtos
+PALAVRA_PATTERN = re.compile(r'\w{4,}')
+CARACTERE_PALAVRA_PATTERN = re.compile(r'\w')
+
+
+class SimanAnalysis:
+    """Texto de um siman em minúsculas, suas palavras-chave e seus tokens
+
+    Categorias, tags e títulos usam as palavras-chave encontradas no texto em
+    minúsculas; as palavras-chave do siman e de cada seif saem de uma única
+    tokenização do conteúdo, segmentada nos limites (offsets) dos seifim.
+    """
+
+    def __init__(self, content: str, keyword_matcher: KeywordMatcher):
+        self.content = content
+        self.content_lower = content.lower()
+        self.keyword_matcher = keyword_matcher
+        self._encontradas_conteudo: Optional[Set[str]] = None
+        self._segmentos: Optional[List[List[str]]] = None
+        self._indices_seifim: List[int] = []
+        self._palavras_conteudo: Optional[List[str]] = None
+        # Alguns caracteres mudam de tamanho em lower(); aí os offsets do
+        # conteúdo original não valem para o texto em minúsculas
+        self._offsets_validos = len(self.content_lower) == len(content)
+
+    @property
+    def encontradas_conteudo(self) -> Set[str]:
+        """Palavras-chave (categorias, tags e temas) presentes no conteúdo"""
+
+        if self._encontradas_conteudo is None:
+            self._encontradas_conteudo = self.keyword_matcher.find(self.content_lower)
+        return self._encontradas_conteudo
+
+    def encontradas(self, assunto: str) -> Set[str]:
+        """Palavras-chave presentes em (assunto + ' ' + conteúdo)"""
+
+        return self.keyword_matcher.find_joined(assunto.lower(), self.content_lower, self.encontradas_conteudo)
+
+    def tokenize(self, spans: Sequence[Tuple[int, int]]) -> None:
+        """Tokeniza o conteúdo uma única vez, segmentado nos offsets dos seifim
+
+        spans são os intervalos (início, fim) de cada seif no conteúdo, em ordem
+        e sem sobreposição.
+        """
+
+        texto = self.content_lower
+        limites = [0]
+        self._indices_seifim = []
+        for inicio, fim in spans:
+            if inicio != limites[-1]:
+                limites.append(inicio)
+            self._indices_seifim.append(len(limites) - 1)
+            limites.append(fim)
+        if limites[-1] != len(texto):
+            limites.append(len(texto))
+
+        if not self._offsets_validos:
+            self._segmentos = [
+                PALAVRA_PATTERN.findall(self.content[inicio:fim].lower())
+                for inicio, fim in zip(limites, limites[1:])
+            ]
+            self._palavras_conteudo = PALAVRA_PATTERN.findall(texto)
+            return
+
+        self._segmentos = [PALAVRA_PATTERN.findall(texto, inicio, fim) for inicio, fim in zip(limites, limites[1:])]
+
+        # Uma palavra cortada no limite de um seif (ex.: "termo12.") é um único
+        # token no siman; nesse caso raro o conteúdo é tokenizado por inteiro
+        cortada = any(
+            CARACTERE_PALAVRA_PATTERN.match(texto, limite - 1) and CARACTERE_PALAVRA_PATTERN.match(texto, limite)
+            for limite in limites[1:-1]
+        )
+        if cortada:
+            self._palavras_conteudo = PALAVRA_PATTERN.findall(texto)
+        else:
+            self._palavras_conteudo = [palavra for segmento in self._segmentos for palavra in segmento]
+
+    def palavras_seif(self, indice: int) -> List[str]:
+        """Palavras significativas do seif de índice `indice` em tokenize()"""
+
+        if self._segmentos is None:
+            raise RuntimeError('tokenize() deve ser chamado antes de palavras_seif()')
+        return self._segmentos[self._indices_seifim[indice]]
+
+    def palavras_siman(self, assunto: str) -> List[str]:
+        """Palavras significativas de (assunto + ' ' + conteúdo)"""
+
+        if self._palavras_conteudo is None:
+            self.tokenize(())
+        return PALAVRA_PATTERN.findall(assunto.lower()) + self._palavras_conteudo
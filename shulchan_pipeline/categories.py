@@ -0,0 +1,163 @@
+"""
+Categorias e tags de um bloco de simanim de uma vez, por operações de matriz
+
+As palavras-chave encontradas em cada siman (KeywordMatcher) viram uma
+matriz documentos x palavras-chave, montada em uma passada. Com as matrizes
+palavras-chave x categorias (de categorias_map) e palavras-chave x tags (de
+tags_map), as pontuações de todas as categorias e as tags de todos os
+simanim saem de dois produtos de matrizes:
+
+    pontuacoes = acertos @ categorias     (palavras-chave de cada categoria)
+    tags       = acertos @ tags > 0       (alguma palavra-chave da tag)
+
+A categoria principal e as tags são as mesmas de categorize_assunto e
+extract_tags. Além delas fica o vetor de pontuações de cada siman, de onde
+saem as categorias ponderadas (pontuação / soma) gravadas em siman_categorias.
+
+NumPy é opcional: sem ele (ou em blocos pequenos, em que o custo fixo das
+chamadas domina) o mesmo cálculo é feito em Python, com o mesmo resultado.
+"""
+
+from itertools import compress
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Sequence, Set, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depende do ambiente
+    np = None
+
+# Categoria dos simanim sem nenhuma palavra-chave de categoria
+CATEGORIA_PADRAO = 'Miscelânea'
+
+# Peso mínimo de uma categoria secundária para virar linha em siman_categorias
+PESO_MINIMO = 0.2
+
+
+class CategoryScores(NamedTuple):
+    """Resultado de um bloco de simanim, na ordem de entrada"""
+    pontuacoes: List[List[int]]  # palavras-chave de cada categoria (colunas: CategoryScorer.categorias)
+    categorias: List[str]  # categoria principal
+    tags: List[List[str]]  # na ordem de tags_map
+    pesos: List[Tuple[Tuple[str, float], ...]]  # categorias ponderadas, a principal primeiro
+
+
+class CategoryScorer:
+    """Pontua categorias e tags de vários simanim a partir das palavras-chave encontradas
+
+    Empates na categoria principal são decididos como em categorize_assunto:
+    vence a categoria cuja primeira palavra-chave encontrada vem antes em
+    categorias_map.
+    """
+
+    # Ponto de equilíbrio medido no CPython 3.11 com NumPy 2
+    VECTORIZE_THRESHOLD = 8
+
+    def __init__(self, categorias_map: Mapping[str, str], tags_map: Mapping[str, Sequence[str]],
+                 peso_minimo: float = PESO_MINIMO, use_numpy: Optional[bool] = None):
+        self.categorias_map = dict(categorias_map)
+        self.tags_map = {tag: list(dict.fromkeys(keywords)) for tag, keywords in tags_map.items()}
+        self.peso_minimo = peso_minimo
+        self.use_numpy = np is not None if use_numpy is None else use_numpy and np is not None
+
+        # Colunas: palavras-chave de categorias e tags (sem repetição), categorias e tags
+        self.keywords: Tuple[str, ...] = tuple(dict.fromkeys(
+            [*self.categorias_map, *(keyword for keywords in self.tags_map.values() for keyword in keywords)]
+        ))
+        self.categorias: Tuple[str, ...] = tuple(dict.fromkeys(self.categorias_map.values()))
+        self.tags: Tuple[str, ...] = tuple(self.tags_map)
+        self._coluna: Dict[str, int] = {keyword: indice for indice, keyword in enumerate(self.keywords)}
+
+        self._matriz_categorias = self._matriz_tags = None
+        if self.use_numpy:
+            self._matriz_categorias = np.zeros((len(self.keywords), len(self.categorias)), dtype=np.int32)
+            for keyword, categoria in self.categorias_map.items():
+                self._matriz_categorias[self._coluna[keyword], self.categorias.index(categoria)] = 1
+            self._matriz_tags = np.zeros((len(self.keywords), len(self.tags)), dtype=np.int32)
+            for indice, keywords in enumerate(self.tags_map.values()):
+                for keyword in keywords:
+                    self._matriz_tags[self._coluna[keyword], indice] = 1
+            # Desempate: colunas das palavras-chave de categorias_map agrupadas por categoria (em ordem de
+            # posição dentro do grupo), para achar com um reduceat a primeira encontrada de cada categoria
+            indice_categoria = [self.categorias.index(categoria) for categoria in self.categorias_map.values()]
+            self._por_categoria = np.array(sorted(range(len(indice_categoria)), key=indice_categoria.__getitem__))
+            self._inicios_categorias = np.searchsorted(np.sort(indice_categoria), np.arange(len(self.categorias)))
+
+    def hits(self, encontradas: Sequence[Set[str]]) -> Any:
+        """Matriz documentos x palavras-chave (1 = encontrada), montada em uma passada"""
+
+        linhas: List[int] = []
+        colunas: List[int] = []
+        for documento, palavras in enumerate(encontradas):
+            for palavra in palavras:
+                coluna = self._coluna.get(palavra)
+                if coluna is not None:
+                    linhas.append(documento)
+                    colunas.append(coluna)
+        acertos = np.zeros((len(encontradas), len(self.keywords)), dtype=np.int32)
+        acertos[linhas, colunas] = 1
+        return acertos
+
+    def score(self, encontradas: Sequence[Set[str]]) -> CategoryScores:
+        """Categorias (principal e ponderadas) e tags de cada documento"""
+
+        if self.use_numpy and len(encontradas) >= self.VECTORIZE_THRESHOLD:
+            return self._score_numpy(encontradas)
+        return self._score_python(encontradas)
+
+    def _score_numpy(self, encontradas: Sequence[Set[str]]) -> CategoryScores:
+        acertos = self.hits(encontradas)
+        pontuacoes = acertos @ self._matriz_categorias
+        tem_tag = (acertos @ self._matriz_tags) > 0
+
+        # Posição da primeira palavra-chave encontrada de cada categoria (len(keywords) se nenhuma)
+        sem_acerto = len(self.keywords)
+        posicoes = np.where(acertos[:, self._por_categoria] > 0, self._por_categoria, sem_acerto)
+        primeira = np.minimum.reduceat(posicoes, self._inicios_categorias, axis=1)
+        # Mais palavras-chave primeiro; no empate, a que tem a primeira palavra-chave antes
+        ordem = np.argsort(primeira - pontuacoes * (sem_acerto + 1), axis=1, kind='stable')
+
+        categorias = []
+        pesos = []
+        for colunas, valores, total in zip(ordem.tolist(), pontuacoes.tolist(), pontuacoes.sum(axis=1).tolist()):
+            if not total:
+                categorias.append(CATEGORIA_PADRAO)
+                pesos.append(((CATEGORIA_PADRAO, 1.0),))
+                continue
+            categorias.append(self.categorias[colunas[0]])
+            pesos.append(self._pesos([(self.categorias[coluna], valores[coluna]) for coluna in colunas], total))
+
+        tags = [list(compress(self.tags, linha)) for linha in tem_tag.tolist()]
+        return CategoryScores(pontuacoes.tolist(), categorias, tags, pesos)
+
+    def _score_python(self, encontradas: Sequence[Set[str]]) -> CategoryScores:
+        resultado = CategoryScores([], [], [], [])
+        for palavras in encontradas:
+            # Mesma contagem de categorize_assunto: a ordem de inserção decide os empates
+            pontuacao: Dict[str, int] = {}
+            for keyword, categoria in self.categorias_map.items():
+                if keyword in palavras:
+                    pontuacao[categoria] = pontuacao.get(categoria, 0) + 1
+            resultado.pontuacoes.append([pontuacao.get(categoria, 0) for categoria in self.categorias])
+            if pontuacao:
+                ordenadas = sorted(pontuacao.items(), key=lambda item: -item[1])
+                resultado.categorias.append(ordenadas[0][0])
+                resultado.pesos.append(self._pesos(ordenadas, sum(pontuacao.values())))
+            else:
+                resultado.categorias.append(CATEGORIA_PADRAO)
+                resultado.pesos.append(((CATEGORIA_PADRAO, 1.0),))
+            resultado.tags.append([
+                tag for tag, keywords in self.tags_map.items() if any(keyword in palavras for keyword in keywords)
+            ])
+        return resultado
+
+    def _pesos(self, ordenadas: List[Tuple[str, int]], total: int) -> Tuple[Tuple[str, float], ...]:
+        """Categorias com pontuação, em ordem, com peso = pontuação / total (a principal sempre fica)"""
+
+        pesos = []
+        for categoria, pontuacao in ordenadas:
+            if not pontuacao:
+                break
+            peso = round(pontuacao / total, 2)
+            if not pesos or peso >= self.peso_minimo:
+                pesos.append((categoria, peso))
+        return tuple(pesos)
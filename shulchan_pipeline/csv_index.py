@@ -0,0 +1,294 @@
+"""
+Índice de offsets do CSV de conteúdo, para processar só algumas linhas
+
+O índice guarda, para cada registro do CSV (na ordem do csv.DictReader), o
+offset e o fim em bytes, o id e o chapter_id. Fica em '<csv>.idx', ao lado do
+CSV, e é refeito sozinho quando o tamanho ou a data de modificação do CSV
+mudam. Com ele os filtros de RowSelection leem só os registros escolhidos,
+com seek, sem passar pelo resto do arquivo; cada registro é lido pelo mesmo
+csv.DictReader, então as linhas são idênticas às da leitura completa.
+
+    selecao = RowSelection(ids=['...'])
+    with open_selected_rows('csv/content_rows.csv', selecao) as linhas:
+        for numero, row in linhas:      # numero: posição da linha no CSV (0 = primeira)
+            ...
+
+Formato (little-endian):
+
+    cabeçalho   MAGIC, versão, linhas, tamanho dos metadados
+    metadados   JSON: tamanho e mtime_ns do CSV, campos do cabeçalho, bytes dos ids
+    inícios     u64 por linha
+    fins        u64 por linha
+    ids         UTF-8, separados por NUL (tamanho em bytes nos metadados)
+    chapter_ids UTF-8, separados por NUL
+"""
+
+import contextlib
+import csv
+import io
+import itertools
+import json
+import os
+import re
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .spreadsheets import is_spreadsheet_source, open_rows
+
+MAGIC = b'SACSVIDX'
+VERSAO = 1
+
+_CABECALHO = struct.Struct('<8sIII')
+# Uma linha física do CSV, terminada como o modo texto do Python entende ('\n', '\r\n' ou '\r')
+_LINHA = re.compile(rb'[^\r\n]*(?:\r\n|\r|\n)|[^\r\n]+')
+
+
+def index_path(csv_file: Union[str, Path]) -> Path:
+    """Arquivo do índice de um CSV"""
+
+    return Path(f"{csv_file}.idx")
+
+
+def _assinatura(csv_file: Union[str, Path]) -> Dict[str, int]:
+    estado = os.stat(csv_file)
+    return {'tamanho': estado.st_size, 'mtime_ns': estado.st_mtime_ns}
+
+
+def _texto(dados: bytes) -> str:
+    """Registro lido do CSV, com as quebras de linha traduzidas como no modo texto"""
+
+    return dados.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+
+
+def row_range(texto: str) -> range:
+    """Faixa de linhas 'N', 'INICIO:FIM', 'INICIO:' ou ':FIM' (FIM não incluído, linhas contadas a partir de 0)
+
+    Sem FIM, a faixa vai até sys.maxsize (ver _fim).
+    """
+
+    inicio, separador, fim = texto.partition(':')
+    try:
+        primeira = int(inicio) if inicio.strip() else 0
+        ultima = (int(fim) if fim.strip() else None) if separador else primeira + 1
+    except ValueError:
+        raise ValueError(f"faixa de linhas inválida: {texto!r}") from None
+    if primeira < 0 or (ultima is not None and ultima < primeira):
+        raise ValueError(f"faixa de linhas inválida: {texto!r}")
+    return range(primeira, ultima if ultima is not None else sys.maxsize)
+
+
+def _fim(faixa: range) -> Optional[int]:
+    """Fim da faixa, ou None se ela não tem fim ('INICIO:')"""
+
+    return None if faixa.stop >= sys.maxsize else faixa.stop
+
+
+class CsvIndex:
+    """Offsets, ids e chapter_ids de cada linha do CSV"""
+
+    def __init__(self, campos: List[str], inicios: array, fins: array, ids: List[str], chapter_ids: List[str],
+                 assinatura: Optional[Dict[str, int]] = None):
+        self.campos = campos
+        self.inicios = inicios
+        self.fins = fins
+        self.ids = ids
+        self.chapter_ids = chapter_ids
+        self.assinatura = assinatura or {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, csv_file: Union[str, Path]) -> 'CsvIndex':
+        """Lê o CSV inteiro uma vez, registrando onde começa e termina cada linha do csv.DictReader"""
+
+        assinatura = _assinatura(csv_file)
+        inicios, fins = array('Q'), array('Q')
+        ids: List[str] = []
+        chapter_ids: List[str] = []
+        posicao = 0
+
+        with open(csv_file, 'rb') as arquivo:
+            def linhas() -> Iterator[str]:
+                # O csv.reader só pede a próxima linha física quando precisa dela, então
+                # a posição depois de cada registro é o fim dele
+                nonlocal posicao
+                for bruta in arquivo:
+                    for pedaco in _LINHA.findall(bruta):
+                        posicao += len(pedaco)
+                        yield _texto(pedaco)
+
+            reader = csv.reader(linhas())
+            campos = next(reader, [])
+            coluna_id = campos.index('id') if 'id' in campos else None
+            coluna_capitulo = campos.index('chapter_id') if 'chapter_id' in campos else None
+            inicio = posicao
+            for row in reader:
+                if row:
+                    # Como no DictReader: colunas que faltam ficam vazias no índice
+                    chave = row[coluna_id] if coluna_id is not None and coluna_id < len(row) else ''
+                    capitulo = row[coluna_capitulo] if coluna_capitulo is not None and coluna_capitulo < len(row) else ''
+                    if '\0' in chave or '\0' in capitulo:
+                        raise ValueError(f"linha {len(ids)} do CSV tem NUL no id ou no chapter_id")
+                    inicios.append(inicio)
+                    fins.append(posicao)
+                    ids.append(chave)
+                    chapter_ids.append(capitulo)
+                inicio = posicao
+
+        return cls(campos, inicios, fins, ids, chapter_ids, assinatura)
+
+    def save(self, path: Union[str, Path]) -> None:
+        """Grava o índice de forma atômica"""
+
+        ids = '\0'.join(self.ids).encode('utf-8')
+        metadados = json.dumps({**self.assinatura, 'campos': self.campos, 'bytes_ids': len(ids)}).encode('utf-8')
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(_CABECALHO.pack(MAGIC, VERSAO, len(self), len(metadados)))
+            f.write(metadados)
+            f.write(self.inicios.tobytes())
+            f.write(self.fins.tobytes())
+            f.write(ids)
+            f.write('\0'.join(self.chapter_ids).encode('utf-8'))
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> Optional['CsvIndex']:
+        """Lê um índice gravado com save (None se o arquivo não for um índice desta versão)"""
+
+        with open(path, 'rb') as f:
+            dados = f.read()
+        if len(dados) < _CABECALHO.size:
+            return None
+        magic, versao, linhas, tamanho = _CABECALHO.unpack_from(dados)
+        if magic != MAGIC or versao != VERSAO:
+            return None
+        posicao = _CABECALHO.size
+        metadados = json.loads(dados[posicao:posicao + tamanho])
+        posicao += tamanho
+        inicios, fins = array('Q'), array('Q')
+        inicios.frombytes(dados[posicao:posicao + 8 * linhas])
+        fins.frombytes(dados[posicao + 8 * linhas:posicao + 16 * linhas])
+        posicao += 16 * linhas
+        fim_ids = posicao + metadados.pop('bytes_ids')
+        ids = dados[posicao:fim_ids].decode('utf-8').split('\0') if linhas else []
+        chapter_ids = dados[fim_ids:].decode('utf-8').split('\0') if linhas else []
+        campos = metadados.pop('campos')
+        return cls(campos, inicios, fins, ids, chapter_ids, metadados)
+
+    @classmethod
+    def open(cls, csv_file: Union[str, Path]) -> Tuple['CsvIndex', bool]:
+        """Índice atualizado do CSV: lido de '<csv>.idx' ou refeito (e gravado) se o CSV mudou
+
+        Devolve o índice e se ele precisou ser refeito. Se não der para gravar
+        o arquivo (diretório sem permissão), o índice é usado só em memória.
+        """
+
+        path = index_path(csv_file)
+        if path.exists():
+            indice = cls.load(path)
+            if indice is not None and indice.assinatura == _assinatura(csv_file):
+                return indice, False
+        indice = cls.build(csv_file)
+        try:
+            indice.save(path)
+        except OSError:
+            pass
+        return indice, True
+
+    def read_rows(self, csv_file: Union[str, Path], numeros: Iterable[int]) -> Iterator[Tuple[int, Dict[str, str]]]:
+        """Linhas escolhidas (numeros em ordem crescente), lidas com seek, como pares (numero, row)"""
+
+        with open(csv_file, 'rb') as arquivo:
+            for numero in numeros:
+                inicio = self.inicios[numero]
+                arquivo.seek(inicio)
+                texto = _texto(arquivo.read(self.fins[numero] - inicio))
+                yield numero, next(csv.DictReader(io.StringIO(texto), fieldnames=self.campos))
+
+
+class RowSelection:
+    """Filtros de linhas do CSV: chapter_id, id e faixa de linhas (a linha precisa passar em todos os informados)
+
+    Depois de open_selected_rows, total e selecionadas têm o número de linhas
+    do CSV e das escolhidas (só com o índice; lendo as planilhas ficam None) e
+    indice diz se o índice foi lido ('lido') ou refeito ('refeito').
+    """
+
+    def __init__(self, chapter_ids: Iterable[str] = (), ids: Iterable[str] = (), faixa: Optional[range] = None):
+        self.chapter_ids = frozenset(chapter_ids)
+        self.ids = frozenset(ids)
+        self.faixa = faixa
+        self.total: Optional[int] = None
+        self.selecionadas: Optional[int] = None
+        self.indice: Optional[str] = None
+
+    def __bool__(self) -> bool:
+        return bool(self.chapter_ids or self.ids or self.faixa is not None)
+
+    def matches(self, numero: int, row: Dict[str, Any]) -> bool:
+        return ((not self.chapter_ids or row.get('chapter_id') in self.chapter_ids)
+                and (not self.ids or row.get('id') in self.ids)
+                and (self.faixa is None or numero in self.faixa))
+
+    def numbers(self, indice: CsvIndex) -> List[int]:
+        """Números das linhas escolhidas, em ordem, pelo índice"""
+
+        faixa = self.faixa if self.faixa is not None else range(len(indice))
+        faixa = range(faixa.start, min(faixa.stop, len(indice)))
+        if self.ids:
+            candidatos = (i for i in faixa if indice.ids[i] in self.ids)
+        else:
+            candidatos = iter(faixa)
+        if self.chapter_ids:
+            candidatos = (i for i in candidatos if indice.chapter_ids[i] in self.chapter_ids)
+        return list(candidatos)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Filtros, para o relatório da execução"""
+
+        faixa = None
+        if self.faixa is not None:
+            faixa = [self.faixa.start, _fim(self.faixa)]
+        return {'chapter_ids': sorted(self.chapter_ids), 'ids': sorted(self.ids), 'linhas': faixa,
+                'total': self.total, 'selecionadas': self.selecionadas, 'indice': self.indice}
+
+
+@contextlib.contextmanager
+def open_selected_rows(path: Union[str, Path],
+                       selecao: Optional[RowSelection] = None) -> Iterator[Iterator[Tuple[int, Dict[str, str]]]]:
+    """Pares (numero, row) das linhas escolhidas por selecao (todas, sem seleção)
+
+    Um CSV é lido pelo índice de offsets; as planilhas (tabelas/) não têm
+    índice e são lidas até o fim da faixa, com os filtros aplicados a cada linha.
+    """
+
+    if not selecao or is_spreadsheet_source(path):
+        with open_rows(path) as rows:
+            linhas = enumerate(rows)
+            if selecao:
+                if selecao.faixa is not None:
+                    linhas = itertools.islice(linhas, selecao.faixa.start, _fim(selecao.faixa))
+                linhas = ((i, row) for i, row in linhas if selecao.matches(i, row))
+            yield linhas
+        return
+
+    try:
+        indice, refeito = CsvIndex.open(path)
+    except ValueError:
+        # Ids com NUL não cabem no índice: filtra lendo o CSV inteiro
+        with open_rows(path) as rows:
+            yield ((i, row) for i, row in enumerate(rows) if selecao.matches(i, row))
+        return
+    numeros = selecao.numbers(indice)
+    selecao.total, selecao.selecionadas = len(indice), len(numeros)
+    selecao.indice = 'refeito' if refeito else 'lido'
+    linhas = indice.read_rows(path, numeros)
+    try:
+        yield linhas
+    finally:
+        linhas.close()
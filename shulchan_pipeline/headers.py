@@ -0,0 +1,79 @@
+"""
+Títulos do cabeçalho 'SIMAN <n> ...' por uma única expressão pré-compilada
+
+Os padrões de título dos processadores (negrito, linha de título, primeira
+frase) eram procurados um a um com re.search em todo o conteúdo. Aqui cada
+padrão vira um lookahead opcional de uma só expressão, testada apenas nas
+ocorrências de 'SIMAN' (achadas com str.find): uma chamada resolve todos os
+padrões, e a busca para assim que o padrão de maior prioridade casa, quase
+sempre no começo do conteúdo. Como cada padrão é casado no conteúdo inteiro a
+partir dessas posições, o título é o mesmo do re.search (o primeiro match de
+cada padrão), esteja o cabeçalho onde estiver.
+"""
+
+import re
+from typing import Dict, Sequence, Tuple
+
+# Remoção de "Contém N seções/seifim/parágrafos" do fim de um título em negrito
+CONTEM_PATTERNS = (
+    re.compile(r'\s*Contém\s+\d+\s+seções?.*$'),
+    re.compile(r'\s*Contém\s+\d+\s+seifim.*$'),
+    re.compile(r'\s*Contém\s+\d+\s+parágrafos?.*$'),
+)
+CONTEM_PATTERN = re.compile(r'\s*Contém\s+\d+\s+(?:seções?|seifim|parágrafos?).*$')
+
+# Título que é, na verdade, o começo de um seif ('12. ...')
+NUMERO_SEIF_PATTERN = re.compile(r'\d+\.')
+
+
+def remove_contagem(titulo: str) -> str:
+    """Remove "Contém N seções/seifim/parágrafos" do título (mesmo resultado dos três re.sub em sequência)"""
+
+    # Com uma só ocorrência (o caso normal) as três remoções equivalem a um único sub
+    ocorrencias = titulo.count('Contém')
+    if not ocorrencias:
+        return titulo
+    if ocorrencias == 1:
+        return CONTEM_PATTERN.sub('', titulo)
+    for pattern in CONTEM_PATTERNS:
+        titulo = pattern.sub('', titulo)
+    return titulo
+
+
+class HeaderParser:
+    """Resolve os padrões de título do cabeçalho de uma vez
+
+    padroes são pares (nome, expressão), em ordem de prioridade; cada expressão
+    começa com 'SIMAN' e tem um grupo, o título. Flags (ex.: re.DOTALL) valem
+    para todas.
+    """
+
+    def __init__(self, padroes: Sequence[Tuple[str, str]], flags: int = 0):
+        self.nomes = tuple(nome for nome, _ in padroes)
+        for nome, expressao in padroes:
+            if not expressao.startswith('SIMAN') or re.compile(expressao, flags).groups != 1:
+                raise ValueError(f"Padrão de título {nome!r}: precisa começar com 'SIMAN' e ter um grupo")
+        # Cada padrão é um lookahead opcional, então todos são testados na mesma posição; o padrão
+        # k fica no grupo 2k + 1 e o título dele no grupo 2k + 2
+        self.pattern = re.compile(''.join(f'(?=({expressao}))?' for _, expressao in padroes), flags)
+
+    def parse(self, content: str) -> Dict[str, str]:
+        """Primeiro título de cada padrão, pelo nome (padrões sem match ficam de fora)
+
+        Quando o primeiro padrão (o de maior prioridade) casa, os que ainda
+        não casaram não são mais procurados: quem usa os títulos em ordem de
+        prioridade não chega a eles.
+        """
+
+        titulos: Dict[str, str] = {}
+        principal = self.nomes[0]
+        posicao = content.find('SIMAN')
+        while posicao >= 0:
+            grupos = self.pattern.match(content, posicao).groups()
+            for indice, nome in enumerate(self.nomes):
+                if grupos[2 * indice] is not None and nome not in titulos:
+                    titulos[nome] = grupos[2 * indice + 1]
+            if principal in titulos or len(titulos) == len(self.nomes):
+                break  # sem procurar o próximo 'SIMAN' no resto do conteúdo
+            posicao = content.find('SIMAN', posicao + 1)
+        return titulos
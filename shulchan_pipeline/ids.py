@@ -0,0 +1,68 @@
+"""
+IDs determinísticos das linhas geradas e ids das categorias/tags da semente
+"""
+
+import re
+import uuid
+from pathlib import Path
+from typing import Dict, Union
+
+# Namespace dos uuid5 do projeto (uuid5(NAMESPACE_URL, URL do repositório))
+NAMESPACE = uuid.UUID('edf40966-3286-52be-8c2a-3791d33674e3')
+
+# Schema com a semente de categorias e tags
+SCHEMA_PATH = Path(__file__).resolve().parent.parent / 'database_schema.sql'
+
+# INSERT INTO categorias (id, nome, ...) VALUES ... ;
+_SEED_INSERT_PATTERN = re.compile(
+    r"INSERT INTO (\w+) \(id, nome\b[^)]*\) VALUES(.*?);", re.DOTALL
+)
+# ('<uuid>', '<nome>', ...
+_SEED_ROW_PATTERN = re.compile(r"\(\s*'([0-9a-fA-F-]{36})',\s*'((?:[^']|'')*)'")
+
+
+def stable_id(table: str, *chave: object) -> str:
+    """UUID derivado da tabela e da chave natural da linha
+
+    O mesmo conteúdo gera o mesmo id em qualquer execução, então as saídas
+    podem ser comparadas e carregadas com upsert.
+    """
+
+    nome = ":".join([table, *(str(parte) for parte in chave)])
+    return str(uuid.uuid5(NAMESPACE, nome))
+
+
+def load_seed_ids(schema_path: Union[str, Path] = SCHEMA_PATH) -> Dict[str, Dict[str, str]]:
+    """Lê os ids fixos da semente do schema: {tabela: {nome: id}}"""
+
+    texto = Path(schema_path).read_text(encoding='utf-8')
+    seed: Dict[str, Dict[str, str]] = {}
+    for match in _SEED_INSERT_PATTERN.finditer(texto):
+        ids = seed.setdefault(match.group(1), {})
+        for row in _SEED_ROW_PATTERN.finditer(match.group(2)):
+            ids[row.group(2).replace("''", "'")] = row.group(1).lower()
+    return seed
+
+
+class SeedIds:
+    """Ids das categorias e tags resolvidos em Python a partir da semente"""
+
+    def __init__(self, schema_path: Union[str, Path] = SCHEMA_PATH):
+        self.schema_path = schema_path
+        seed = load_seed_ids(schema_path)
+        self.categorias = seed.get('categorias', {})
+        self.tags = seed.get('tags', {})
+
+    def _resolve(self, ids: Dict[str, str], tabela: str, nome: str) -> str:
+        try:
+            return ids[nome]
+        except KeyError:
+            raise ValueError(
+                f"{tabela} '{nome}' não está na semente de {self.schema_path}"
+            ) from None
+
+    def categoria(self, nome: str) -> str:
+        return self._resolve(self.categorias, 'categorias', nome)
+
+    def tag(self, nome: str) -> str:
+        return self._resolve(self.tags, 'tags', nome)
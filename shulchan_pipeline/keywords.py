@@ -0,0 +1,94 @@
+"""
+Busca de várias palavras-chave em uma única passada sobre o texto
+"""
+
+import re
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+
+class KeywordMatcher:
+    """Encontra todas as palavras-chave (como substrings) presentes em um texto
+
+    O conjunto de palavras-chave é montado uma única vez por processador,
+    reunindo categorias, tags e temas, e o resultado de uma busca alimenta
+    categorize_assunto, extract_tags e generate_specific_title juntos.
+
+    Com muitas palavras-chave a busca é feita por um autômato (trie estilo
+    Aho-Corasick compilado em uma única regex), cujo custo é linear no texto
+    e não cresce com o número de palavras. Com poucas palavras a busca de cada
+    uma com `in` (feita em C) ainda é mais rápida no CPython, então o autômato
+    só é usado acima de AUTOMATON_THRESHOLD palavras.
+    """
+
+    # Ponto de equilíbrio medido no CPython 3.11 sobre simanim de ~3 KB
+    AUTOMATON_THRESHOLD = 200
+
+    def __init__(self, keywords: Iterable[str], use_automaton: Optional[bool] = None):
+        # Remove duplicatas preservando a ordem
+        self.keywords: Tuple[str, ...] = tuple(dict.fromkeys(k for k in keywords if k))
+        self.max_length = max((len(k) for k in self.keywords), default=0)
+
+        if use_automaton is None:
+            use_automaton = len(self.keywords) > self.AUTOMATON_THRESHOLD
+
+        self._automaton = None
+        self._prefixes: Dict[str, Tuple[str, ...]] = {}
+        if use_automaton and self.keywords:
+            self._automaton = re.compile('(?=(' + self._build_trie_pattern() + '))')
+            # Em cada posição o autômato devolve o casamento mais longo; as
+            # palavras-chave que são prefixo dele também estão no texto
+            keyword_set = set(self.keywords)
+            for keyword in self.keywords:
+                self._prefixes[keyword] = tuple(
+                    keyword[:i] for i in range(1, len(keyword) + 1) if keyword[:i] in keyword_set
+                )
+
+    def _build_trie_pattern(self) -> str:
+        """Monta a trie das palavras-chave e a converte em um padrão regex"""
+
+        trie: Dict[str, dict] = {}
+        for keyword in self.keywords:
+            node = trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[''] = {}
+
+        def build(node: Dict[str, dict]) -> str:
+            branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+            if not branches:
+                return ''
+            body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+            # Nó terminal com continuações: o restante é opcional (guloso)
+            return f'(?:{body})?' if '' in node else body
+
+        return build(trie)
+
+    def find(self, texto: str) -> Set[str]:
+        """Retorna as palavras-chave contidas no texto (já em minúsculas)"""
+
+        if self._automaton is None:
+            return {keyword for keyword in self.keywords if keyword in texto}
+
+        found: Set[str] = set()
+        for match in self._automaton.finditer(texto):
+            found.update(self._prefixes[match.group(1)])
+        return found
+
+    def find_joined(self, esquerda: str, direita: str, found_direita: Optional[Set[str]] = None,
+                    separador: str = ' ') -> Set[str]:
+        """Retorna as palavras-chave de esquerda + separador + direita sem concatenar os textos
+
+        Útil para buscar em (assunto + ' ' + conteudo) reaproveitando a busca já
+        feita no conteúdo: só a emenda entre os dois textos é examinada de novo.
+        """
+
+        if found_direita is None:
+            found_direita = self.find(direita)
+
+        found = self.find(esquerda) | found_direita
+        if self.max_length > 1:
+            margem = self.max_length - 1
+            found |= self.find(esquerda[-margem:] + separador + direita[:margem])
+        else:
+            found |= self.find(separador)
+        return found
@@ -0,0 +1,103 @@
+"""
+Manifesto do último processamento, para reprocessar só as linhas alteradas do CSV
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Union
+
+from .ids import SCHEMA_PATH
+
+# Fontes que afetam o SQL gerado, além do script de processamento
+PACKAGE_SOURCES = sorted(Path(__file__).resolve().parent.glob('*.py'))
+
+
+def content_hash(row: Dict[str, Any]) -> str:
+    """Hash das colunas da linha do CSV usadas no processamento"""
+
+    dados = f"{row['chapter_id']}\0{row['content']}"
+    return hashlib.sha256(dados.encode('utf-8')).hexdigest()
+
+
+def processor_version(script: Union[str, Path], *opcoes: str) -> str:
+    """Versão do processador: hash do script, do pacote, da semente do schema e das opções
+
+    Qualquer mudança no código (ou nas opções que alteram o resultado, como
+    --keywords) invalida o manifesto e força o reprocessamento completo.
+    """
+
+    digest = hashlib.sha256()
+    for opcao in opcoes:
+        digest.update(opcao.encode('utf-8') + b'\0')
+    for path in [Path(script), *PACKAGE_SOURCES, SCHEMA_PATH]:
+        digest.update(path.name.encode('utf-8') + b'\0')
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+class Manifest:
+    """Hash do conteúdo de cada siman (por siman_id) e versão do processador que o gerou"""
+
+    def __init__(self, version: str, rows: Optional[Dict[str, str]] = None):
+        self.version = version
+        self.rows: Dict[str, str] = rows if rows is not None else {}
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> 'Manifest':
+        """Lê o manifesto; sem arquivo, devolve um manifesto vazio"""
+
+        if not os.path.exists(path):
+            return cls('')
+        with open(path, 'r', encoding='utf-8') as f:
+            dados = json.load(f)
+        return cls(dados['processor_version'], dados['rows'])
+
+    def save(self, path: Union[str, Path]) -> None:
+        """Grava o manifesto de forma atômica"""
+
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'processor_version': self.version, 'rows': self.rows}, f, indent=0, sort_keys=True)
+        os.replace(temp_path, path)
+
+
+class ManifestDiff:
+    """Compara as linhas do CSV com o manifesto anterior durante o processamento
+
+    wants() serve de filtro para iter_csv: escolhe as linhas novas ou alteradas
+    (todas, se a versão do processador mudou ou incremental=False). Cada siman
+    processado com sucesso é registrado com processed(); os que falharem ficam
+    fora do novo manifesto e são reprocessados na próxima execução.
+    """
+
+    def __init__(self, anterior: Manifest, version: str, incremental: bool = True):
+        self.anterior = anterior
+        self.manifest = Manifest(version)
+        self.completo = not incremental or anterior.version != version
+        self.inalterados = 0
+        self._hashes: Dict[str, str] = {}
+        self._vistos: Set[str] = set()
+
+    def wants(self, row: Dict[str, Any]) -> bool:
+        siman_id = row['id']
+        hash_atual = content_hash(row)
+        self._vistos.add(siman_id)
+
+        if not self.completo and self.anterior.rows.get(siman_id) == hash_atual:
+            self.manifest.rows[siman_id] = hash_atual
+            self.inalterados += 1
+            return False
+
+        self._hashes[siman_id] = hash_atual
+        return True
+
+    def processed(self, siman_id: str) -> None:
+        self.manifest.rows[siman_id] = self._hashes.pop(siman_id)
+
+    @property
+    def removidos(self) -> List[str]:
+        """Simanim do manifesto anterior que não estão mais no CSV (após ler todo o CSV)"""
+
+        return [siman_id for siman_id in self.anterior.rows if siman_id not in self._vistos]
@@ -0,0 +1,174 @@
+"""
+Instrumentação do processamento: tempo e chamadas por método, padrões de
+cabeçalho, progresso e relatório JSON da execução
+"""
+
+import json
+import platform
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - Windows
+    resource = None
+
+# Intervalo mínimo (segundos) entre as mensagens de progresso
+PROGRESS_INTERVAL = 5.0
+
+
+class _TimedMethod:
+    """Método de uma instância substituído por uma versão medida
+
+    Guarda o objeto e o nome do método (não um closure), então o processador
+    instrumentado continua podendo ser enviado aos workers com pickle.
+    """
+
+    def __init__(self, metrics: 'RunMetrics', objeto: Any, nome: str, rotulo: str):
+        self.metrics = metrics
+        self.objeto = objeto
+        self.nome = nome
+        self.rotulo = rotulo
+
+    def __call__(self, *args, **kwargs):
+        metrics = self.metrics
+        metrics._filhos.append(0.0)
+        inicio = time.perf_counter()
+        try:
+            return getattr(type(self.objeto), self.nome)(self.objeto, *args, **kwargs)
+        finally:
+            total = time.perf_counter() - inicio
+            filhos = metrics._filhos.pop()
+            metrics.segundos[self.rotulo] += total
+            metrics.segundos_proprios[self.rotulo] += total - filhos
+            metrics.chamadas[self.rotulo] += 1
+            if metrics._filhos:
+                metrics._filhos[-1] += total
+
+
+class RunMetrics:
+    """Métricas de uma execução do processador
+
+    Para cada método instrumentado guarda o número de chamadas, o tempo total
+    (incluindo os métodos instrumentados que ele chama) e o tempo próprio
+    (excluindo-os). Nos workers as métricas são acumuladas na cópia do
+    processador e devolvidas com cada bloco (drain/merge).
+    """
+
+    def __init__(self, progress_interval: float = PROGRESS_INTERVAL):
+        self.progress_interval = progress_interval
+        self.segundos: Dict[str, float] = defaultdict(float)
+        self.segundos_proprios: Dict[str, float] = defaultdict(float)
+        self.chamadas: Counter = Counter()
+        self.contadores: Dict[str, Counter] = defaultdict(Counter)
+        self.simanim = 0
+        self.seifim = 0
+        self.erros = 0
+        self.inicio = time.perf_counter()
+        self._ultimo_progresso = self.inicio
+        self._filhos: List[float] = []
+
+    def instrument(self, objeto: Any, metodos: Iterable[str], prefixo: str = '') -> None:
+        """Substitui os métodos (na instância) por versões medidas; ignora os que não existem"""
+
+        for nome in metodos:
+            if hasattr(type(objeto), nome):
+                setattr(objeto, nome, _TimedMethod(self, objeto, nome, prefixo + nome))
+
+    def count(self, grupo: str, chave: str) -> None:
+        self.contadores[grupo][chave] += 1
+
+    def start(self) -> None:
+        """Reinicia o relógio da execução (as contagens são mantidas)"""
+
+        self.inicio = self._ultimo_progresso = time.perf_counter()
+
+    def row_done(self, seifim: int) -> None:
+        """Registra um siman processado e mostra o progresso a cada progress_interval segundos"""
+
+        self.simanim += 1
+        self.seifim += seifim
+        agora = time.perf_counter()
+        if agora - self._ultimo_progresso >= self.progress_interval:
+            self._ultimo_progresso = agora
+            print(f"Processados {self.simanim} simanim ({self.simanim / (agora - self.inicio):.0f} simanim/s)...")
+
+    def row_failed(self) -> None:
+        self.erros += 1
+
+    def drain(self) -> Dict[str, Any]:
+        """Métricas dos métodos acumuladas até aqui, zerando-as (usado pelos workers)"""
+
+        dados = {
+            'segundos': dict(self.segundos),
+            'segundos_proprios': dict(self.segundos_proprios),
+            'chamadas': dict(self.chamadas),
+            'contadores': {grupo: dict(contagem) for grupo, contagem in self.contadores.items()},
+        }
+        self.segundos.clear()
+        self.segundos_proprios.clear()
+        self.chamadas.clear()
+        self.contadores.clear()
+        return dados
+
+    def merge(self, dados: Dict[str, Any]) -> None:
+        """Soma as métricas devolvidas por drain() em outro processo"""
+
+        for rotulo, segundos in dados['segundos'].items():
+            self.segundos[rotulo] += segundos
+        for rotulo, segundos in dados['segundos_proprios'].items():
+            self.segundos_proprios[rotulo] += segundos
+        self.chamadas.update(dados['chamadas'])
+        for grupo, contagem in dados['contadores'].items():
+            self.contadores[grupo].update(contagem)
+
+    @staticmethod
+    def peak_memory_kb() -> Dict[str, Optional[int]]:
+        """Pico de memória residente deste processo e dos workers já encerrados (KB)"""
+
+        if resource is None:
+            return {'processo': None, 'workers': None}
+        # ru_maxrss é em KB no Linux e em bytes no macOS
+        escala = 1024 if sys.platform == 'darwin' else 1
+        return {
+            'processo': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // escala,
+            'workers': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss // escala,
+        }
+
+    def report(self, **extra: Any) -> Dict[str, Any]:
+        """Relatório da execução, com os campos extras informados"""
+
+        segundos = time.perf_counter() - self.inicio
+        metodos = {
+            rotulo: {
+                'chamadas': self.chamadas[rotulo],
+                'segundos': round(self.segundos[rotulo], 4),
+                'segundos_proprios': round(self.segundos_proprios[rotulo], 4),
+            }
+            for rotulo in sorted(self.chamadas, key=self.segundos_proprios.__getitem__, reverse=True)
+        }
+        return {
+            'data': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'segundos': round(segundos, 3),
+            'simanim': self.simanim,
+            'seifim': self.seifim,
+            'erros': self.erros,
+            'simanim_por_segundo': round(self.simanim / segundos, 1) if segundos else None,
+            'pico_memoria_kb': self.peak_memory_kb(),
+            'metodos': metodos,
+            **{grupo: dict(contagem) for grupo, contagem in sorted(self.contadores.items())},
+            **extra,
+        }
+
+    def write_report(self, path: Union[str, Path], **extra: Any) -> Dict[str, Any]:
+        """Grava o relatório em JSON e o devolve"""
+
+        relatorio = self.report(**extra)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(relatorio, f, indent=2, ensure_ascii=False)
+        return relatorio
@@ -0,0 +1,296 @@
+"""
+Títulos de fallback gerados por um modelo, com cache em disco
+
+Os simanim sem cabeçalho reconhecível recebem dos processadores um título
+montado por palavras-chave ("Leis sobre X, Y", "Leis haláchicas diversas").
+ModelTitles substitui esses títulos (e o resumo) pelos de um endpoint de
+modelo configurável, só para os simanim que chegaram ao fallback; com
+apply_title (o dos processadores) as palavras-chave, categorias e tags do
+siman são refeitas a partir do novo título:
+
+- as requisições são assíncronas (asyncio em uma thread própria), com no
+  máximo `concurrency` em andamento e até `batch_size` simanim em cada uma;
+- cada requisição tem timeout e é refeita com espera crescente se falhar;
+  se ainda assim falhar, o siman fica com o título do fallback;
+- as respostas ficam em um cache JSONL, pela chave sha256(versão do prompt +
+  endpoint + conteúdo), então uma nova execução não chama o endpoint para o
+  mesmo texto (e trocar de endpoint não reaproveita os títulos do outro);
+- os simanim saem na ordem em que entraram, com um número limitado deles
+  esperando resposta.
+
+Protocolo do endpoint (POST JSON):
+
+    {"prompt_version": "...", "instrucoes": "...",
+     "itens": [{"id": "<siman>", "conteudo": "..."}]}
+    -> {"itens": [{"id": "<siman>", "assunto": "...", "assunto_resumido": "..."}]}
+
+benchmarks/title_model_stub.py é um servidor local com esse protocolo.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+from collections import Counter, deque
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+# Mudar o prompt (ou o protocolo) exige outra versão: as respostas antigas deixam de valer no cache
+PROMPT_VERSION = 'titulos-v1'
+PROMPT = (
+    "Para cada siman do Shulchan Aruch, escreva em português um título específico e curto "
+    "(até 80 caracteres) com o assunto das leis do texto e um resumo do título com até 40 caracteres. "
+    "Responda só com os campos assunto e assunto_resumido de cada item."
+)
+
+# Caracteres do siman enviados ao modelo (o começo basta para o título)
+MAX_CONTEUDO = 4000
+
+# assunto_resumido cortado como o dos títulos dos cabeçalhos
+MAX_RESUMIDO = 100
+
+CACHE_PATH = 'titulos_modelo.cache.jsonl'
+
+
+def content_key(content: str, endpoint: str, prompt_version: str = PROMPT_VERSION) -> str:
+    """Chave do cache: hash da versão do prompt, do endpoint (o modelo) e do conteúdo do siman"""
+
+    return hashlib.sha256(f"{prompt_version}\0{endpoint}\0{content}".encode('utf-8')).hexdigest()
+
+
+class TitleCache:
+    """Cache dos títulos em um arquivo JSONL (uma resposta por linha, só acrescentadas)"""
+
+    def __init__(self, path: Union[str, Path] = CACHE_PATH):
+        self.path = Path(path)
+        self._titulos: Dict[str, Tuple[str, str]] = {}
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for linha in f:
+                    try:
+                        item = json.loads(linha)
+                        self._titulos[item['chave']] = (item['assunto'], item['assunto_resumido'])
+                    except (ValueError, KeyError, TypeError):
+                        continue  # linha truncada por uma execução interrompida
+        self._arquivo = None
+
+    def get(self, chave: str) -> Optional[Tuple[str, str]]:
+        return self._titulos.get(chave)
+
+    def put(self, chave: str, assunto: str, assunto_resumido: str) -> None:
+        if self._arquivo is None:
+            self._arquivo = open(self.path, 'a', encoding='utf-8')
+        self._titulos[chave] = (assunto, assunto_resumido)
+        self._arquivo.write(json.dumps({'chave': chave, 'assunto': assunto, 'assunto_resumido': assunto_resumido},
+                                       ensure_ascii=False) + '\n')
+        self._arquivo.flush()
+
+    def __len__(self) -> int:
+        return len(self._titulos)
+
+    def close(self) -> None:
+        if self._arquivo is not None:
+            self._arquivo.close()
+            self._arquivo = None
+
+
+class ModelTitleClient:
+    """Cliente assíncrono do endpoint de títulos: concorrência limitada, timeout e novas tentativas"""
+
+    def __init__(self, endpoint: str, concurrency: int = 4, timeout: float = 30.0, retries: int = 2,
+                 backoff: float = 0.5, api_key: Optional[str] = None):
+        self.endpoint = endpoint
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.api_key = api_key if api_key is not None else os.environ.get('TITLE_MODEL_API_KEY')
+        self._semaforo: Optional[asyncio.Semaphore] = None
+        self.chamadas = 0
+        self.tentativas_refeitas = 0
+
+    def _post(self, corpo: bytes) -> Dict[str, Any]:
+        headers = {'Content-Type': 'application/json'}
+        if self.api_key:
+            headers['Authorization'] = f"Bearer {self.api_key}"
+        request = urllib.request.Request(self.endpoint, data=corpo, headers=headers, method='POST')
+        with urllib.request.urlopen(request, timeout=self.timeout) as resposta:
+            return json.loads(resposta.read().decode('utf-8'))
+
+    async def titles(self, itens: List[Tuple[str, str]]) -> Dict[str, Tuple[str, str]]:
+        """Títulos de um lote de (siman_id, conteúdo): {siman_id: (assunto, assunto_resumido)}"""
+
+        if self._semaforo is None:
+            self._semaforo = asyncio.Semaphore(self.concurrency)
+        corpo = json.dumps({
+            'prompt_version': PROMPT_VERSION,
+            'instrucoes': PROMPT,
+            'itens': [{'id': siman_id, 'conteudo': content[:MAX_CONTEUDO]} for siman_id, content in itens],
+        }, ensure_ascii=False).encode('utf-8')
+
+        async with self._semaforo:
+            for tentativa in range(self.retries + 1):
+                try:
+                    self.chamadas += 1
+                    resposta = await asyncio.wait_for(asyncio.to_thread(self._post, corpo), self.timeout)
+                    return {
+                        str(item['id']): (str(item['assunto']).strip(), str(item['assunto_resumido']).strip())
+                        for item in resposta['itens'] if item.get('assunto')
+                    }
+                except (OSError, urllib.error.URLError, asyncio.TimeoutError, ValueError, KeyError, TypeError):
+                    if tentativa == self.retries:
+                        raise
+                    self.tentativas_refeitas += 1
+                    await asyncio.sleep(self.backoff * 2 ** tentativa)
+
+
+class _Pendente:
+    """Siman esperando o título do modelo (ou já resolvido pelo cache)"""
+
+    __slots__ = ('siman', 'chave', 'lote', 'titulo')
+
+    def __init__(self, siman: Any, chave: Optional[str] = None, titulo: Optional[Tuple[str, str]] = None):
+        self.siman = siman
+        self.chave = chave
+        self.lote: Optional[Future] = None
+        self.titulo = titulo
+
+    def pronto(self) -> bool:
+        # Sem chave: não é fallback; com título: veio do cache
+        return self.chave is None or self.titulo is not None or (self.lote is not None and self.lote.done())
+
+
+class ModelTitles:
+    """Troca os títulos de fallback dos simanim pelos do modelo, em streaming e na ordem de entrada"""
+
+    def __init__(self, client: ModelTitleClient, cache: TitleCache, batch_size: int = 8,
+                 max_pending: Optional[int] = None):
+        self.client = client
+        self.cache = cache
+        self.batch_size = max(1, batch_size)
+        # Simanim esperando resposta: o suficiente para manter todas as requisições ocupadas
+        self.max_pending = max_pending or 2 * self.batch_size * client.concurrency
+        self.contadores: Counter = Counter()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._apply_title: Optional[Callable[[Any, str, str], None]] = None
+
+    def start(self) -> None:
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._loop.run_forever, name='model-titles', daemon=True)
+            self._thread.start()
+
+    def close(self) -> None:
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._loop = None
+        self.cache.close()
+
+    def __enter__(self) -> 'ModelTitles':
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def _enviar(self, lote: List[_Pendente]) -> None:
+        itens = [(pendente.siman.original_id, pendente.siman.seifim.content) for pendente in lote]
+        futuro = asyncio.run_coroutine_threadsafe(self.client.titles(itens), self._loop)
+        for pendente in lote:
+            pendente.lote = futuro
+
+    def _concluir(self, pendente: _Pendente) -> Any:
+        """Aplica ao siman o título do cache ou da resposta (ou mantém o do fallback)"""
+
+        siman = pendente.siman
+        titulo = pendente.titulo
+        if titulo is None and pendente.lote is not None:
+            try:
+                titulo = pendente.lote.result().get(siman.original_id)
+            except Exception as erro:  # noqa: BLE001 - o siman segue com o título do fallback
+                self.contadores[f"falha:{type(erro).__name__}"] += 1
+                titulo = None
+            if titulo is not None:
+                self.cache.put(pendente.chave, *titulo)
+                self.contadores['modelo'] += 1
+            else:
+                self.contadores['sem_resposta'] += 1
+        if titulo is not None:
+            assunto, assunto_resumido = titulo
+            assunto_resumido = assunto_resumido[:MAX_RESUMIDO]
+            if self._apply_title is not None:
+                self._apply_title(siman, assunto, assunto_resumido)
+            else:
+                siman.assunto, siman.assunto_resumido = assunto, assunto_resumido
+        return siman
+
+    def enrich(self, simanim: Iterable[Any], fallback: Callable[[Any], bool],
+               apply_title: Optional[Callable[[Any, str, str], None]] = None) -> Iterator[Any]:
+        """Devolve os simanim na mesma ordem, com o título do modelo nos que fallback(siman) indica
+
+        apply_title(siman, assunto, assunto_resumido), se informado, aplica o
+        título (e refaz o que depende dele); sem ele só assunto e
+        assunto_resumido mudam.
+        """
+
+        self.start()
+        self._apply_title = apply_title
+        fila: Deque[_Pendente] = deque()
+        lote: List[_Pendente] = []
+        esperando = 0
+
+        for siman in simanim:
+            if not fallback(siman):
+                fila.append(_Pendente(siman))
+            else:
+                chave = content_key(siman.seifim.content, self.client.endpoint)
+                titulo = self.cache.get(chave)
+                if titulo is not None:
+                    self.contadores['cache'] += 1
+                    fila.append(_Pendente(siman, chave, titulo))
+                else:
+                    pendente = _Pendente(siman, chave)
+                    fila.append(pendente)
+                    lote.append(pendente)
+                    esperando += 1
+                    if len(lote) >= self.batch_size:
+                        self._enviar(lote)
+                        lote = []
+
+            # Devolve o que já está pronto no início da fila
+            while fila and fila[0].pronto():
+                pendente = fila.popleft()
+                esperando -= pendente.lote is not None
+                yield self._concluir(pendente)
+
+            # Muitos simanim esperando: envia o lote incompleto e espera o primeiro da fila
+            while esperando >= self.max_pending:
+                if lote:
+                    self._enviar(lote)
+                    lote = []
+                pendente = fila.popleft()
+                esperando -= pendente.lote is not None
+                yield self._concluir(pendente)
+
+        if lote:
+            self._enviar(lote)
+        while fila:
+            yield self._concluir(fila.popleft())
+
+    def report(self) -> Dict[str, Any]:
+        """Contadores para o relatório da execução"""
+
+        return {
+            **self.contadores,
+            'chamadas': self.client.chamadas,
+            'tentativas_refeitas': self.client.tentativas_refeitas,
+            'cache_entradas': len(self.cache),
+        }
+
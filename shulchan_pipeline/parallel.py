@@ -0,0 +1,123 @@
+"""
+Processamento dos simanim em vários processos, com saída na ordem da entrada
+"""
+
+import os
+import traceback
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import islice
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Linhas do CSV enviadas a cada processo por vez
+CHUNK_SIZE = 64
+
+
+@dataclass
+class ProcessingError:
+    """Erro ao processar uma linha do CSV"""
+    linha: int
+    tipo: str
+    mensagem: str
+    worker: int  # pid do processo que processou a linha
+    traceback: str = ''
+
+    def __str__(self) -> str:
+        return self.mensagem
+
+
+# (linha, siman processado, erro) - exatamente um dos dois últimos é None
+ProcessedRow = Tuple[int, Any, Optional[ProcessingError]]
+
+# Processador de cada worker, criado uma única vez no initializer
+_worker_processor = None
+
+
+def resolve_workers(workers: int) -> int:
+    """Converte --workers em número de processos (0 = todos os núcleos)"""
+
+    if workers <= 0:
+        return os.cpu_count() or 1
+    return workers
+
+
+def process_rows(processor: Any, rows: Iterable[Tuple[int, Dict[str, Any]]],
+                 chunk_size: int = CHUNK_SIZE) -> Iterator[ProcessedRow]:
+    """Processa linhas numeradas, coletando os erros em vez de interromper
+
+    Processadores com process_batch recebem blocos de chunk_size linhas (categorias e tags do bloco são
+    pontuadas de uma vez); se o bloco falha, as linhas dele são refeitas uma a uma para isolar o erro.
+    """
+
+    pid = os.getpid()
+    process_batch = getattr(processor, 'process_batch', None)
+    linhas = iter(rows)
+    while True:
+        chunk = list(islice(linhas, chunk_size if process_batch is not None else 1))
+        if not chunk:
+            return
+        if process_batch is not None:
+            try:
+                processados = process_batch([row for _, row in chunk])
+            except Exception:
+                processados = None
+            if processados is not None:
+                for (linha, _), processed in zip(chunk, processados):
+                    yield linha, processed, None
+                continue
+
+        for linha, row in chunk:
+            try:
+                processed = processor.process_siman(row)
+            except Exception as e:
+                yield linha, None, ProcessingError(linha, type(e).__name__, str(e), pid, traceback.format_exc())
+                continue
+            yield linha, processed, None
+
+
+def _init_worker(processor: Any) -> None:
+    global _worker_processor
+    _worker_processor = processor
+
+
+def _process_chunk(chunk: List[Tuple[int, Dict[str, Any]]]) -> Tuple[List[ProcessedRow], Optional[Dict[str, Any]]]:
+    resultados = list(process_rows(_worker_processor, chunk))
+    # Métricas acumuladas pelo worker neste bloco, somadas às do processador principal
+    metrics = getattr(_worker_processor, 'metrics', None)
+    return resultados, metrics.drain() if metrics is not None else None
+
+
+def process_parallel(processor: Any, rows: Iterable[Tuple[int, Dict[str, Any]]], workers: int,
+                     chunk_size: int = CHUNK_SIZE) -> Iterator[ProcessedRow]:
+    """Distribui blocos de linhas numeradas entre processos e devolve os resultados na ordem da entrada
+
+    Cada worker recebe uma cópia do processador (com seus mapas e autômato já
+    montados). No máximo 2 blocos por worker ficam em andamento, então a
+    leitura do CSV acompanha o consumo e a memória continua limitada.
+    """
+
+    linhas = iter(rows)
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(processor,))
+    pendentes: Deque[Future] = deque()
+
+    def submit_next() -> bool:
+        chunk = list(islice(linhas, chunk_size))
+        if not chunk:
+            return False
+        pendentes.append(executor.submit(_process_chunk, chunk))
+        return True
+
+    try:
+        for _ in range(workers * 2):
+            if not submit_next():
+                break
+
+        while pendentes:
+            resultados, metricas = pendentes.popleft().result()
+            if metricas is not None:
+                processor.metrics.merge(metricas)
+            submit_next()
+            yield from resultados
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
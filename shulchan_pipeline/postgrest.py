@@ -0,0 +1,338 @@
+"""
+Carga por HTTP em um endpoint PostgREST (a API REST do Supabase), sem o arquivo SQL
+
+PostgrestSink tem a mesma interface dos sinks de sinks.py e é escolhido por
+open_sink para URLs http(s)://, como https://<projeto>.supabase.co/rest/v1.
+A chave (no Supabase, a service_role) vem de POSTGREST_API_KEY e vai nos
+cabeçalhos apikey e Authorization.
+
+- cada lote vira requisições de até request_rows linhas por tabela:
+  POST /<tabela>?on_conflict=id com Prefer: resolution=merge-duplicates
+  (upsert pelo id estável, então a carga pode ser repetida);
+- antes dos upserts, as linhas que os simanim do lote tinham e não vieram de
+  novo são procuradas (GET ?select=id, paginado) e removidas (DELETE ?id=in.(...));
+- as requisições são assíncronas (asyncio em uma thread própria), com no
+  máximo `connections` em andamento, cada uma em uma conexão HTTP/1.1
+  keep-alive reaproveitada;
+- falhas de conexão, timeouts e respostas 408/429/5xx são refeitas com espera
+  crescente (ou a do Retry-After); as requisições são idempotentes;
+- com `connections` lotes em andamento a próxima gravação espera, o que segura
+  o processamento.
+
+Cada requisição é uma transação no PostgREST, então um lote não é atômico como
+no PostgresSink; se a carga falhar, repeti-la deixa o banco correto.
+benchmarks/postgrest_stub.py é um servidor local com o mesmo protocolo.
+"""
+
+import asyncio
+import json
+import os
+import re
+import ssl
+import threading
+import urllib.parse
+from concurrent.futures import Future
+from typing import Any, Awaitable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .sinks import BATCH_SIZE, Batch, PipelinedSink
+from .sql_writer import TABLES
+
+# Linhas no máximo por requisição de upsert
+REQUEST_ROWS = 1000
+
+# Tamanho máximo da lista de valores de um filtro na URL (ids separados por vírgula)
+MAX_FILTRO = 6000
+
+# Respostas que justificam refazer a requisição
+RETRY_STATUS = frozenset({408, 429, 500, 502, 503, 504})
+
+_VALOR_SIMPLES = re.compile(r'[\w\-]+')
+
+
+class PostgrestError(RuntimeError):
+    """Resposta de erro do endpoint (depois das novas tentativas, se couberem)"""
+
+    def __init__(self, status: int, mensagem: str):
+        super().__init__(f"HTTP {status}: {mensagem}")
+        self.status = status
+
+
+class _RespostaInvalida(ConnectionError):
+    """Resposta HTTP truncada ou fora do formato"""
+
+
+def filter_list(valores: Iterable[str]) -> str:
+    """Lista de um filtro in.(...) do PostgREST (valores com vírgula, ponto, aspas etc. entre aspas)"""
+
+    return ",".join(
+        valor if _VALOR_SIMPLES.fullmatch(valor) else '"' + valor.replace('\\', '\\\\').replace('"', '\\"') + '"'
+        for valor in valores
+    )
+
+
+def _partes(valores: Sequence[str], limite: int = MAX_FILTRO) -> Iterator[List[str]]:
+    """Divide os valores em listas cujo filtro cabe na URL"""
+
+    parte: List[str] = []
+    tamanho = 0
+    for valor in valores:
+        if parte and tamanho + len(valor) + 1 > limite:
+            yield parte
+            parte, tamanho = [], 0
+        parte.append(valor)
+        tamanho += len(valor) + 1
+    if parte:
+        yield parte
+
+
+async def _todas(corotinas: Iterable[Awaitable[Any]]) -> None:
+    """Espera todas as corotinas; se uma falhar, cancela as outras e propaga o erro"""
+
+    tarefas = [asyncio.ensure_future(corotina) for corotina in corotinas]
+    try:
+        await asyncio.gather(*tarefas)
+    except BaseException:
+        for tarefa in tarefas:
+            tarefa.cancel()
+        await asyncio.gather(*tarefas, return_exceptions=True)
+        raise
+
+
+class RestClient:
+    """Cliente HTTP/1.1 assíncrono mínimo (asyncio streams), com conexões keep-alive reaproveitadas
+
+    No máximo `concurrency` requisições ao mesmo tempo, cada uma com `timeout`
+    segundos e até `retries` novas tentativas. Usado só de dentro de um loop asyncio.
+    """
+
+    def __init__(self, base_url: str, concurrency: int = 4, timeout: float = 60.0, retries: int = 3,
+                 backoff: float = 1.0, headers: Optional[Dict[str, str]] = None):
+        partes = urllib.parse.urlsplit(base_url)
+        if partes.scheme not in ('http', 'https') or not partes.hostname:
+            raise ValueError(f"URL do endpoint inválida: '{base_url}'")
+        self.host = partes.hostname
+        self.port = partes.port or (443 if partes.scheme == 'https' else 80)
+        self.ssl = ssl.create_default_context() if partes.scheme == 'https' else None
+        self.prefixo = partes.path.rstrip('/')
+        padrao = self.port == (443 if partes.scheme == 'https' else 80)
+        self.host_header = self.host if padrao else f"{self.host}:{self.port}"
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.headers = headers or {}
+        self.requisicoes = 0
+        self.tentativas_refeitas = 0
+        self.conexoes = 0
+        self._semaforo: Optional[asyncio.Semaphore] = None
+        self._livres: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+
+    async def request(self, method: str, path: str, body: Optional[bytes] = None,
+                      headers: Optional[Dict[str, str]] = None) -> Tuple[int, Dict[str, str], bytes]:
+        """(status, cabeçalhos em minúsculas, corpo) de uma resposta 2xx; outras levantam PostgrestError"""
+
+        if self._semaforo is None:
+            self._semaforo = asyncio.Semaphore(self.concurrency)
+        dados = self._request_bytes(method, path, body, headers)
+
+        for tentativa in range(self.retries + 1):
+            espera = self.backoff * 2 ** tentativa
+            async with self._semaforo:
+                try:
+                    self.requisicoes += 1
+                    status, cabecalhos, corpo = await asyncio.wait_for(self._send(method, dados), self.timeout)
+                except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+                    if tentativa == self.retries:
+                        raise
+                else:
+                    if 200 <= status < 300:
+                        return status, cabecalhos, corpo
+                    mensagem = f"{method} {path[:200]}: {corpo[:500].decode('utf-8', 'replace')}"
+                    if status not in RETRY_STATUS or tentativa == self.retries:
+                        raise PostgrestError(status, mensagem)
+                    retry_after = cabecalhos.get('retry-after', '')
+                    if retry_after.isdigit():
+                        espera = max(espera, float(retry_after))
+            # Espera fora do semáforo: as outras requisições seguem
+            self.tentativas_refeitas += 1
+            await asyncio.sleep(espera)
+
+    def _request_bytes(self, method: str, path: str, body: Optional[bytes],
+                       headers: Optional[Dict[str, str]]) -> bytes:
+        linhas = [f"{method} {self.prefixo}{path} HTTP/1.1", f"Host: {self.host_header}", "Accept: application/json"]
+        linhas += [f"{nome}: {valor}" for nome, valor in {**self.headers, **(headers or {})}.items()]
+        if body is not None:
+            linhas += ["Content-Type: application/json", f"Content-Length: {len(body)}"]
+        return ("\r\n".join(linhas) + "\r\n\r\n").encode('latin-1') + (body or b"")
+
+    async def _send(self, method: str, dados: bytes) -> Tuple[int, Dict[str, str], bytes]:
+        while True:
+            reaproveitada = bool(self._livres)
+            if reaproveitada:
+                reader, writer = self._livres.pop()
+            else:
+                reader, writer = await asyncio.open_connection(self.host, self.port, ssl=self.ssl)
+                self.conexoes += 1
+            try:
+                writer.write(dados)
+                await writer.drain()
+                linha = await reader.readline()
+                if not linha and reaproveitada:
+                    # O servidor fechou a conexão ociosa: manda de novo em uma conexão nova
+                    writer.close()
+                    continue
+                status, cabecalhos, corpo, fechar = await self._read_response(reader, linha, method)
+            except (ConnectionResetError, BrokenPipeError):
+                writer.close()
+                if reaproveitada:
+                    continue
+                raise
+            except BaseException:
+                writer.close()  # conexão em estado desconhecido
+                raise
+            if fechar:
+                writer.close()
+            else:
+                self._livres.append((reader, writer))
+            return status, cabecalhos, corpo
+
+    @staticmethod
+    async def _read_response(reader: asyncio.StreamReader, linha: bytes,
+                             method: str) -> Tuple[int, Dict[str, str], bytes, bool]:
+        partes = linha.decode('latin-1').split(None, 2)
+        if len(partes) < 2 or not partes[0].startswith('HTTP/') or not partes[1].isdigit():
+            raise _RespostaInvalida(f"linha de status inválida: {linha[:100]!r}")
+        versao, status = partes[0], int(partes[1])
+
+        cabecalhos: Dict[str, str] = {}
+        while True:
+            linha = await reader.readline()
+            if not linha:
+                raise _RespostaInvalida("resposta truncada nos cabeçalhos")
+            if linha in (b"\r\n", b"\n"):
+                break
+            nome, _, valor = linha.decode('latin-1').partition(':')
+            cabecalhos[nome.strip().lower()] = valor.strip()
+
+        conexao = cabecalhos.get('connection', '').lower()
+        fechar = conexao == 'close' or (versao == 'HTTP/1.0' and conexao != 'keep-alive')
+        if method == 'HEAD' or status in (204, 304) or status < 200:
+            corpo = b""
+        elif 'chunked' in cabecalhos.get('transfer-encoding', '').lower():
+            pedacos = []
+            while True:
+                tamanho = int((await reader.readline()).split(b';')[0].strip() or b'0', 16)
+                if tamanho == 0:
+                    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass  # trailers
+                    break
+                pedacos.append(await reader.readexactly(tamanho))
+                await reader.readexactly(2)
+            corpo = b"".join(pedacos)
+        elif 'content-length' in cabecalhos:
+            corpo = await reader.readexactly(int(cabecalhos['content-length']))
+        else:
+            corpo = await reader.read()
+            fechar = True
+        return status, cabecalhos, corpo, fechar
+
+    async def close(self) -> None:
+        """Fecha as conexões ociosas"""
+
+        livres, self._livres = self._livres, []
+        for _, writer in livres:
+            writer.close()
+        for _, writer in livres:
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+
+class PostgrestSink(PipelinedSink):
+    """Carga em um endpoint PostgREST com upserts em lote
+
+    Os lotes são gravados em paralelo (têm simanim distintos e as únicas
+    chaves estrangeiras apontam para categorias e tags), com no máximo
+    `connections` lotes e `connections` requisições em andamento.
+    """
+
+    def __init__(self, url: str, sections: Sequence[Tuple[str, str]], batch_size: int = BATCH_SIZE,
+                 connections: int = 4, retries: int = 3, backoff: float = 1.0, api_key: Optional[str] = None,
+                 timeout: float = 60.0, request_rows: int = REQUEST_ROWS):
+        super().__init__(sections, batch_size, connections)
+        chave = api_key if api_key is not None else os.environ.get('POSTGREST_API_KEY')
+        headers = {'apikey': chave, 'Authorization': f"Bearer {chave}"} if chave else {}
+        self.client = RestClient(url, connections, timeout, retries, backoff, headers)
+        self.request_rows = max(1, request_rows)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='postgrest-sink', daemon=True)
+        self._thread.start()
+
+    def _submit(self, batch: Batch) -> Future:
+        return asyncio.run_coroutine_threadsafe(self._write_batch(batch), self._loop)
+
+    async def _write_batch(self, batch: Batch) -> None:
+        # Remoções primeiro, como no PostgresSink; depois os upserts de todas as tabelas em paralelo
+        await _todas(self._delete(table, batch) for table in self.tables)
+        await _todas(
+            self._upsert(table, batch.rows[table][inicio:inicio + self.request_rows])
+            for table in self.tables
+            for inicio in range(0, len(batch.rows[table]), self.request_rows)
+        )
+
+    async def _upsert(self, table: str, rows: List[Tuple[Any, ...]]) -> None:
+        colunas = TABLES[table].column_names
+        corpo = json.dumps([dict(zip(colunas, row)) for row in rows], ensure_ascii=False,
+                           separators=(',', ':')).encode('utf-8')
+        await self.client.request('POST', f"/{table}?on_conflict=id", corpo,
+                                  {'Prefer': 'resolution=merge-duplicates,return=minimal'})
+
+    async def _delete(self, table: str, batch: Batch) -> None:
+        for parte in _partes(batch.removidos):
+            await self.client.request('DELETE', f"/{table}?siman_id=in.({self._quote(parte)})",
+                                      headers={'Prefer': 'return=minimal'})
+        if batch.alterados:
+            novos = {row[0] for row in batch.rows[table]}
+            sobras = [id_ for id_ in await self._existing_ids(table, batch.alterados) if id_ not in novos]
+            for parte in _partes(sobras):
+                await self.client.request('DELETE', f"/{table}?id=in.({self._quote(parte)})",
+                                          headers={'Prefer': 'return=minimal'})
+
+    async def _existing_ids(self, table: str, simanim: Sequence[str]) -> List[str]:
+        """Ids das linhas que os simanim já têm na tabela (paginado: o servidor pode limitar as linhas por resposta)"""
+
+        ids: List[str] = []
+        for parte in _partes(simanim):
+            filtro = f"/{table}?select=id&siman_id=in.({self._quote(parte)})&order=id"
+            inicio = 0
+            while True:
+                _, cabecalhos, corpo = await self.client.request('GET', f"{filtro}&offset={inicio}",
+                                                                 headers={'Prefer': 'count=exact'})
+                pagina = [str(item['id']) for item in json.loads(corpo or b'[]')]
+                ids.extend(pagina)
+                inicio += len(pagina)
+                # Content-Range: 0-999/1234 (total depois da barra; '*' se o servidor não contar)
+                total = cabecalhos.get('content-range', '').rpartition('/')[2]
+                if not pagina or (total.isdigit() and inicio >= int(total)):
+                    break
+        return ids
+
+    @staticmethod
+    def _quote(valores: Sequence[str]) -> str:
+        return urllib.parse.quote(filter_list(valores), safe=',-_')
+
+    async def _shutdown(self) -> None:
+        # Lotes ainda em andamento (só depois de um erro) são cancelados
+        tarefas = [tarefa for tarefa in asyncio.all_tasks() if tarefa is not asyncio.current_task()]
+        await asyncio.gather(*tarefas, return_exceptions=True)
+        await self.client.close()
+
+    def _close_connections(self) -> None:
+        for future in self._futures:
+            future.cancel()
+        if self._loop.is_running():
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+        self._loop.close()
@@ -0,0 +1,212 @@
+"""
+Representação compacta dos seifim processados
+
+Os seifim de um siman ficam em um único array de inteiros (offsets no conteúdo
+original, número, ordem e fim do assunto), sem copiar o texto: o conteúdo e o
+assunto de cada seif são fatiados do conteúdo do siman quando lidos. As
+palavras-chave ficam em um segundo array, como índices de um vocabulário
+único do processo, então cada palavra existe uma única vez. Cada seif é lido como um Mapping com as mesmas chaves do dicionário
+usado antes (numero, conteudo, assunto, palavras_chave, tamanho, ordem).
+"""
+
+import sys
+from array import array
+from collections.abc import Mapping, Sequence
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+# Campos de cada seif no array: início e fim do texto, número, ordem, fim do
+# assunto e fim das suas palavras-chave no array de palavras
+_INICIO, _FIM, _NUMERO, _ORDEM, _ASSUNTO, _PALAVRAS = range(6)
+_CAMPOS_ARRAY = 6
+
+# Sufixo do assunto truncado (ver extract_seif_assunto)
+RETICENCIAS = '...'
+
+CAMPOS = ('numero', 'conteudo', 'assunto', 'palavras_chave', 'tamanho', 'ordem')
+
+
+# Vocabulário das palavras-chave dos seifim (palavra -> índice e índice -> palavra)
+_INDICES_VOCABULARIO: Dict[str, int] = {}
+_VOCABULARIO: List[str] = []
+
+
+def intern_all(palavras: Iterable[str]) -> Tuple[str, ...]:
+    """Tupla das palavras internadas (uma única cópia de cada string no processo)"""
+
+    return tuple(map(sys.intern, palavras))
+
+
+def vocabulary_index(palavra: str) -> int:
+    """Índice da palavra no vocabulário do processo (acrescentada se ainda não estiver)"""
+
+    indice = _INDICES_VOCABULARIO.get(palavra)
+    if indice is None:
+        indice = _INDICES_VOCABULARIO[palavra] = len(_VOCABULARIO)
+        _VOCABULARIO.append(sys.intern(palavra))
+    return indice
+
+
+def vocabulary_word(indice: int) -> str:
+    """Palavra de um índice de vocabulary_index"""
+
+    return _VOCABULARIO[indice]
+
+
+def compact_seif_data(dados: List[int]) -> Union[array, List[int]]:
+    """Dados dos seifim em 'i' (32 bits, o intervalo da coluna INTEGER de seifim.numero)
+
+    Um número de seif fora desse intervalo (texto malformado, ex.: 50 dígitos)
+    não derruba o siman: os dados ficam em 'q' (64 bits) ou, se nem assim
+    couberem, em uma lista.
+    """
+
+    for typecode in ('i', 'q'):
+        try:
+            return array(typecode, dados)
+        except OverflowError:
+            continue
+    return dados
+
+
+class SeifRecord(Mapping):
+    """Um seif de SeifRecords, lido sob demanda"""
+
+    __slots__ = ('_seifim', '_indice')
+
+    def __init__(self, seifim: 'SeifRecords', indice: int):
+        self._seifim = seifim
+        self._indice = indice
+
+    def _campo(self, campo: int) -> int:
+        return self._seifim._dados[self._indice * _CAMPOS_ARRAY + campo]
+
+    @property
+    def numero(self) -> int:
+        return self._campo(_NUMERO)
+
+    @property
+    def ordem(self) -> int:
+        return self._campo(_ORDEM)
+
+    @property
+    def tamanho(self) -> int:
+        return self._campo(_FIM) - self._campo(_INICIO)
+
+    @property
+    def conteudo(self) -> str:
+        return self._seifim.content[self._campo(_INICIO):self._campo(_FIM)]
+
+    @property
+    def assunto(self) -> str:
+        return self._seifim._assunto(self._indice)
+
+    @property
+    def palavras_chave(self) -> Tuple[str, ...]:
+        return self._seifim._palavras(self._indice)
+
+    def __getitem__(self, campo: str) -> Any:
+        if campo not in CAMPOS:
+            raise KeyError(campo)
+        return getattr(self, campo)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(CAMPOS)
+
+    def __len__(self) -> int:
+        return len(CAMPOS)
+
+    def __repr__(self) -> str:
+        return f"SeifRecord({dict(self)!r})"
+
+
+class SeifRecords(Sequence):
+    """Seifim de um siman, como offsets no conteúdo do siman"""
+
+    __slots__ = ('content', '_dados', '_palavras_chave', '_assuntos')
+
+    def __init__(self, content: str, seifim: Iterable[Tuple[int, int, int, int, str, Iterable[str]]] = ()):
+        """seifim: (início, fim, número, ordem, assunto, palavras_chave) de cada seif"""
+
+        self.content = content
+        # Assuntos que não são um prefixo do seif (raro; só com outra extract_seif_assunto)
+        self._assuntos: Optional[Dict[int, str]] = None
+
+        # Os arrays são montados de uma vez, sem a folga de crescimento do append
+        dados: List[int] = []
+        palavras: List[int] = []
+        for indice, (inicio, fim, numero, ordem, assunto, palavras_chave) in enumerate(seifim):
+            palavras.extend(map(vocabulary_index, palavras_chave))
+            dados.extend((inicio, fim, numero, ordem, self._assunto_fim(inicio, fim, indice, assunto), len(palavras)))
+        self._dados = compact_seif_data(dados)
+        self._palavras_chave = array('I', palavras)
+
+    @classmethod
+    def from_arrays(cls, content: str, dados: Union[array, List[int]], palavras_chave: array,
+                    assuntos: Optional[Dict[int, str]] = None) -> 'SeifRecords':
+        """SeifRecords a partir dos arrays já montados (palavras como índices de vocabulary_index)"""
+
+        seifim = cls(content)
+        seifim._dados = dados
+        seifim._palavras_chave = palavras_chave
+        seifim._assuntos = assuntos
+        return seifim
+
+    def arrays(self) -> Tuple[Union[array, List[int]], array, Optional[Dict[int, str]]]:
+        """Arrays internos (dados dos seifim, índices das palavras-chave, assuntos à parte), para from_arrays"""
+
+        return self._dados, self._palavras_chave, self._assuntos
+
+    def _assunto_fim(self, inicio: int, fim: int, indice: int, assunto: str) -> int:
+        """Fim do assunto no conteúdo (negativo se truncado com reticências)"""
+
+        if self.content.startswith(assunto, inicio, fim):
+            return inicio + len(assunto)
+        if assunto.endswith(RETICENCIAS) and self.content.startswith(assunto[:-len(RETICENCIAS)], inicio, fim):
+            return -(inicio + len(assunto) - len(RETICENCIAS)) - 1
+        if self._assuntos is None:
+            self._assuntos = {}
+        self._assuntos[indice] = assunto
+        return inicio
+
+    def _assunto(self, indice: int) -> str:
+        if self._assuntos is not None and indice in self._assuntos:
+            return self._assuntos[indice]
+        inicio = self._dados[indice * _CAMPOS_ARRAY + _INICIO]
+        fim = self._dados[indice * _CAMPOS_ARRAY + _ASSUNTO]
+        if fim < 0:
+            return self.content[inicio:-fim - 1] + RETICENCIAS
+        return self.content[inicio:fim]
+
+    def _palavras(self, indice: int) -> Tuple[str, ...]:
+        inicio = self._dados[(indice - 1) * _CAMPOS_ARRAY + _PALAVRAS] if indice else 0
+        fim = self._dados[indice * _CAMPOS_ARRAY + _PALAVRAS]
+        return tuple(map(_VOCABULARIO.__getitem__, self._palavras_chave[inicio:fim]))
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            return [self[i] for i in range(*indice.indices(len(self)))]
+        if indice < 0:
+            indice += len(self)
+        if not 0 <= indice < len(self):
+            raise IndexError('seif fora do intervalo')
+        return SeifRecord(self, indice)
+
+    def __len__(self) -> int:
+        return len(self._dados) // _CAMPOS_ARRAY
+
+    def __eq__(self, outro: Any) -> bool:
+        if not isinstance(outro, Sequence):
+            return NotImplemented
+        return len(outro) == len(self) and all(dict(a) == dict(b) for a, b in zip(self, outro))
+
+    def __repr__(self) -> str:
+        return f"SeifRecords({[dict(seif) for seif in self]!r})"
+
+    def __reduce__(self) -> Tuple[Callable, Tuple[Any, ...]]:
+        # Os índices valem só no vocabulário deste processo: vão as palavras
+        palavras = [_VOCABULARIO[indice] for indice in self._palavras_chave]
+        return _rebuild, (self.content, self._dados, palavras, self._assuntos)
+
+
+def _rebuild(content: str, dados: Union[array, List[int]], palavras: List[str], assuntos: Optional[Dict[int, str]]) -> SeifRecords:
+    return SeifRecords.from_arrays(content, dados, array('I', map(vocabulary_index, palavras)), assuntos)
@@ -0,0 +1,379 @@
+"""
+Seifim relacionados (paralelos) por MinHash/LSH, calculados no processamento
+
+Cada seif vira o conjunto dos seus shingles (sequências de SHINGLE termos,
+na forma de search_terms). As assinaturas MinHash de todos os seifim são
+calculadas em lote com NumPy (NUM_PERM hashes multiply-shift, mínimo por
+seif com np.minimum.reduceat) e agrupadas por LSH: BANDAS faixas de linhas,
+e só seifim que caem no mesmo balde de alguma faixa são comparados. Não há comparação de todos os pares, então o custo cresce com o
+número de seifim (e de comentários acrescentados), não com o quadrado dele.
+
+Para cada seif ficam os LIMITE relacionados mais parecidos (Jaccard estimado
+pelas assinaturas, no mínimo SIMILARIDADE_MINIMA), de outros simanim.
+O resultado vai para a tabela seifim_relacionados (uma linha por seif, pelo
+id do seif) e para um arquivo compacto lido com mmap:
+
+    cabeçalho   MAGIC, versão, documentos, relações
+    seções      (offset, tamanho) de cada seção, na ordem de SECOES
+    documentos  id e siman_id (uuid, 16 bytes), em ordem de bytes do id
+    relações    offsets (u32) por documento, documento relacionado (u32) e
+                similaridade (f32)
+
+NumPy é necessário para calcular as assinaturas; a leitura do arquivo não
+depende dele.
+"""
+
+import mmap
+import struct
+import sys
+import uuid
+import zlib
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depende do ambiente
+    np = None
+
+from .ids import stable_id
+from .search_index import search_terms
+
+MAGIC = b'SAREL\x00\x00\x00'
+VERSAO = 1
+
+# Parâmetros do MinHash/LSH: 42 faixas de 3 linhas põem o limiar do LSH em ~0,29 de Jaccard
+# (um seif com ~10% das palavras trocadas fica em torno de 0,55)
+NUM_PERM = 128
+BANDAS = 42
+SHINGLE = 3
+LIMITE = 10
+SIMILARIDADE_MINIMA = 0.25
+# Baldes maiores que isso (texto repetido em muitos seifim) não geram pares
+MAX_BALDE = 200
+SEMENTE = 1
+
+# Assinatura dos seifim sem nenhum termo (ficam fora do LSH)
+VAZIO = (1 << 32) - 1
+# Shingles por bloco no cálculo das assinaturas (bloco de NUM_PERM x BLOCO uint64)
+BLOCO = 1 << 15
+
+# Seção do arquivo SQL (tabela, título), depois das seções dos processadores
+RELATED_SECTION = ('seifim_relacionados', "SEIFIM RELACIONADOS (MINHASH/LSH)")
+
+SECOES = ('docs_id', 'docs_siman', 'relacoes_offsets', 'relacoes_docs', 'relacoes_similaridade')
+
+_CABECALHO = struct.Struct('<8sIII')
+_SECAO = struct.Struct('<QQ')
+
+
+def shingles(texto: str, tamanho: int = SHINGLE) -> List[int]:
+    """Hashes (crc32) dos shingles de termos do texto, sem repetição"""
+
+    termos = search_terms(texto)
+    if not termos:
+        return []
+    if len(termos) <= tamanho:
+        partes = [' '.join(termos)]
+    else:
+        partes = [' '.join(termos[inicio:inicio + tamanho]) for inicio in range(len(termos) - tamanho + 1)]
+    return sorted({zlib.crc32(parte.encode('utf-8')) for parte in partes})
+
+
+class RelatedSeif(NamedTuple):
+    id: str
+    siman_id: str
+    similaridade: float
+
+
+class RelatedSeifimBuilder:
+    """Acumula os seifim, calcula os relacionados e grava a tabela e o arquivo"""
+
+    def __init__(self, num_perm: int = NUM_PERM, bandas: int = BANDAS, limite: int = LIMITE,
+                 similaridade_minima: float = SIMILARIDADE_MINIMA, mesmo_siman: bool = False,
+                 semente: int = SEMENTE):
+        if np is None:
+            raise RuntimeError("os seifim relacionados (MinHash/LSH) exigem o NumPy (pip install numpy)")
+        if not 0 < bandas <= num_perm:
+            raise ValueError("bandas precisa estar entre 1 e num_perm")
+        self.num_perm = num_perm
+        self.bandas = bandas
+        self.limite = limite
+        self.similaridade_minima = similaridade_minima
+        self.mesmo_siman = mesmo_siman
+        self.semente = semente
+        self._ids: List[str] = []
+        self._simanim: List[str] = []
+        self._shingles = array('I')
+        self._offsets = array('Q', [0])
+        self._relacoes: Optional[Tuple[Any, Any, Any]] = None
+        # Pares candidatos do LSH na última chamada de compute (os únicos comparados)
+        self.candidatos = 0
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add_document(self, doc_id: str, siman_id: str, texto: str) -> None:
+        self._ids.append(doc_id)
+        self._simanim.append(siman_id)
+        self._shingles.extend(shingles(texto))
+        self._offsets.append(len(self._shingles))
+        self._relacoes = None
+
+    def add_siman(self, siman: Any) -> None:
+        """Seifim de um ProcessedSiman, com os ids das linhas de seifim"""
+
+        for seif in siman.seifim:
+            self.add_document(stable_id('seifim', siman.original_id, seif['numero']), siman.original_id,
+                              seif['conteudo'])
+
+    def signatures(self) -> Any:
+        """Assinaturas MinHash (documentos x num_perm, uint32); VAZIO nas linhas de seifim sem termos
+
+        Cada permutação é um hash multiply-shift, (a * x + b) mod 2**64 >> 32 com a ímpar: sem divisão,
+        só a aritmética do uint64 (que dá a volta sozinha).
+        """
+
+        rng = np.random.default_rng(self.semente)
+        a = rng.integers(0, 1 << 63, size=self.num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        b = rng.integers(0, 1 << 63, size=self.num_perm, dtype=np.uint64)
+        deslocamento = np.uint64(32)
+        valores = np.frombuffer(self._shingles, dtype=np.uint32).astype(np.uint64)
+        offsets = np.frombuffer(self._offsets, dtype=np.uint64).astype(np.int64)
+        documentos = len(self)
+
+        assinaturas = np.full((documentos, self.num_perm), VAZIO, dtype=np.uint32)
+        inicio = 0
+        while inicio < documentos:
+            # Bloco de documentos com até BLOCO shingles (ou um só documento maior que isso)
+            fim = int(np.searchsorted(offsets, offsets[inicio] + BLOCO, side='right')) - 1
+            fim = min(max(fim, inicio + 1), documentos)
+            primeiro, ultimo = offsets[inicio], offsets[fim]
+            if ultimo > primeiro:
+                # Permutações nas linhas: o reduceat ao longo do eixo contíguo é bem mais rápido
+                hashes = a[:, None] * valores[None, primeiro:ultimo]
+                hashes += b[:, None]
+                hashes >>= deslocamento
+                inicios = offsets[inicio:fim] - primeiro
+                cheios = np.flatnonzero(offsets[inicio + 1:fim + 1] > offsets[inicio:fim])
+                assinaturas[inicio + cheios] = np.minimum.reduceat(hashes, inicios[cheios], axis=1).T
+            inicio = fim
+        return assinaturas
+
+    def _candidatos(self, assinaturas: Any, validos: Any) -> Any:
+        """Pares (i < j) que caem no mesmo balde em alguma faixa, codificados como i * documentos + j
+
+        Cada faixa usa num_perm // bandas colunas da assinatura; as que sobram só entram na similaridade.
+        """
+
+        documentos = np.uint64(len(self))
+        linhas = self.num_perm // self.bandas
+        pares = []
+        for banda in range(self.bandas):
+            faixa = assinaturas[validos, banda * linhas:(banda + 1) * linhas].astype(np.uint64)
+            chaves = np.zeros(len(validos), dtype=np.uint64)
+            for coluna in range(linhas):
+                chaves = chaves * np.uint64(1000003) ^ faixa[:, coluna]
+            ordem = np.argsort(chaves, kind='stable')
+            chaves = chaves[ordem]
+
+            # Baldes: trechos de chaves iguais na ordem
+            inicios = np.flatnonzero(np.r_[True, chaves[1:] != chaves[:-1]])
+            tamanhos = np.diff(np.r_[inicios, len(chaves)])
+            for tamanho in np.unique(tamanhos[(tamanhos > 1) & (tamanhos <= MAX_BALDE)]):
+                baldes = inicios[tamanhos == tamanho][:, None] + np.arange(tamanho)
+                membros = validos[ordem[baldes]]
+                i, j = np.triu_indices(int(tamanho), 1)
+                menor = np.minimum(membros[:, i], membros[:, j]).ravel().astype(np.uint64)
+                maior = np.maximum(membros[:, i], membros[:, j]).ravel().astype(np.uint64)
+                pares.append(menor * documentos + maior)
+        return np.unique(np.concatenate(pares)) if pares else np.zeros(0, dtype=np.uint64)
+
+    def compute(self) -> Tuple[Any, Any, Any]:
+        """Relacionados de cada documento: offsets, documentos e similaridades (em ordem decrescente)"""
+
+        if self._relacoes is not None:
+            return self._relacoes
+        documentos = len(self)
+        assinaturas = self.signatures()
+        validos = np.flatnonzero(np.diff(np.frombuffer(self._offsets, dtype=np.uint64)) > 0)
+        pares = self._candidatos(assinaturas, validos)
+        self.candidatos = len(pares)
+        i = (pares // np.uint64(documentos)).astype(np.int64)
+        j = (pares % np.uint64(documentos)).astype(np.int64)
+
+        # Jaccard estimado: fração das posições iguais nas assinaturas
+        similaridades = np.empty(len(pares), dtype=np.float32)
+        passo = max(1, (1 << 22) // self.num_perm)
+        for inicio in range(0, len(pares), passo):
+            fim = inicio + passo
+            iguais = assinaturas[i[inicio:fim]] == assinaturas[j[inicio:fim]]
+            similaridades[inicio:fim] = iguais.mean(axis=1)
+
+        manter = similaridades >= self.similaridade_minima
+        if not self.mesmo_siman:
+            _, simanim = np.unique(np.array(self._simanim), return_inverse=True)
+            manter &= simanim[i] != simanim[j]
+        i, j, similaridades = i[manter], j[manter], similaridades[manter]
+
+        # Os dois sentidos de cada par; em cada documento, do mais ao menos parecido (empate: ordem de entrada)
+        origem = np.concatenate([i, j])
+        destino = np.concatenate([j, i])
+        similaridade = np.concatenate([similaridades, similaridades])
+        ordem = np.lexsort((destino, -similaridade, origem))
+        origem, destino, similaridade = origem[ordem], destino[ordem], similaridade[ordem]
+        primeiros = np.searchsorted(origem, origem, side='left')
+        manter = np.arange(len(origem)) - primeiros < self.limite
+        origem, destino, similaridade = origem[manter], destino[manter], similaridade[manter]
+
+        offsets = np.zeros(documentos + 1, dtype=np.int64)
+        np.cumsum(np.bincount(origem, minlength=documentos), out=offsets[1:])
+        self._relacoes = (offsets, destino, similaridade)
+        return self._relacoes
+
+    def related(self, documento: int) -> List[RelatedSeif]:
+        """Relacionados do documento (na ordem de add_document)"""
+
+        offsets, destino, similaridade = self.compute()
+        inicio, fim = offsets[documento], offsets[documento + 1]
+        return [
+            RelatedSeif(self._ids[outro], self._simanim[outro], round(float(valor), 3))
+            for outro, valor in zip(destino[inicio:fim], similaridade[inicio:fim])
+        ]
+
+    def sql_rows(self) -> Iterator[Tuple[str, Tuple[Any, ...]]]:
+        """Linhas de seifim_relacionados: (id do seif, siman_id, relacionados, similaridades)"""
+
+        for documento, (doc_id, siman_id) in enumerate(zip(self._ids, self._simanim)):
+            relacionados = self.related(documento)
+            yield 'seifim_relacionados', (
+                doc_id, siman_id,
+                tuple(relacionado.id for relacionado in relacionados),
+                tuple(relacionado.similaridade for relacionado in relacionados),
+            )
+
+    def write(self, path: Union[str, Path]) -> None:
+        """Grava o arquivo compacto no formato descrito no módulo"""
+
+        offsets, destino, similaridade = self.compute()
+        chaves = [uuid.UUID(doc_id).bytes for doc_id in self._ids]
+        ordem = sorted(range(len(self)), key=chaves.__getitem__)
+        posicao = np.empty(len(self), dtype=np.uint32)
+        posicao[ordem] = np.arange(len(self), dtype=np.uint32)
+
+        ids = bytearray()
+        simanim = bytearray()
+        relacoes_offsets = array('I', [0])
+        relacoes_docs = array('I')
+        relacoes_similaridade = array('f')
+        for documento in ordem:
+            ids += chaves[documento]
+            simanim += uuid.UUID(self._simanim[documento]).bytes
+            inicio, fim = offsets[documento], offsets[documento + 1]
+            relacoes_docs.extend(posicao[destino[inicio:fim]].tolist())
+            relacoes_similaridade.extend(similaridade[inicio:fim].tolist())
+            relacoes_offsets.append(len(relacoes_docs))
+
+        dados = [_little_endian(secao) for secao in (ids, simanim, relacoes_offsets, relacoes_docs,
+                                                      relacoes_similaridade)]
+        inicio = _alinhado(_CABECALHO.size + _SECAO.size * len(SECOES))
+        posicoes = []
+        for bloco in dados:
+            posicoes.append((inicio, len(bloco)))
+            inicio = _alinhado(inicio + len(bloco))
+
+        with open(path, 'wb') as f:
+            f.write(_CABECALHO.pack(MAGIC, VERSAO, len(self), len(relacoes_docs)))
+            for posicao_secao in posicoes:
+                f.write(_SECAO.pack(*posicao_secao))
+            for (offset, _), bloco in zip(posicoes, dados):
+                f.write(b'\x00' * (offset - f.tell()))
+                f.write(bloco)
+
+
+def _alinhado(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def _little_endian(secao: Union[array, bytearray]) -> bytes:
+    if isinstance(secao, array) and sys.byteorder != 'little':
+        secao = array(secao.typecode, secao)
+        secao.byteswap()
+    return bytes(secao)
+
+
+class RelatedSeifim:
+    """Arquivo de seifim relacionados aberto com mmap; related(id) faz uma busca binária pelo id"""
+
+    def __init__(self, path: Union[str, Path]):
+        if sys.byteorder != 'little':
+            raise RuntimeError("RelatedSeifim lê o arquivo direto da memória e exige uma máquina little-endian")
+        self.path = str(path)
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, versao, self.documentos, self.relacoes = _CABECALHO.unpack_from(self._mm, 0)
+        if magic != MAGIC or versao != VERSAO:
+            raise ValueError(f"{path} não é um arquivo de seifim relacionados na versão {VERSAO}")
+        self._secoes: Dict[str, Tuple[int, int]] = {
+            nome: _SECAO.unpack_from(self._mm, _CABECALHO.size + _SECAO.size * indice)
+            for indice, nome in enumerate(SECOES)
+        }
+        view = memoryview(self._mm)
+        self._offsets = self._view(view, 'relacoes_offsets', 'I')
+        self._docs = self._view(view, 'relacoes_docs', 'I')
+        self._similaridades = self._view(view, 'relacoes_similaridade', 'f')
+
+    def _view(self, view: memoryview, secao: str, formato: str) -> memoryview:
+        offset, tamanho = self._secoes[secao]
+        return view[offset:offset + tamanho].cast(formato)
+
+    def __len__(self) -> int:
+        return self.documentos
+
+    def _uuid(self, secao: str, documento: int) -> str:
+        base = self._secoes[secao][0] + 16 * documento
+        return str(uuid.UUID(bytes=self._mm[base:base + 16]))
+
+    def _documento(self, seif_id: str) -> int:
+        """Posição do seif (busca binária nos ids ordenados) ou -1"""
+
+        chave = uuid.UUID(seif_id).bytes
+        base = self._secoes['docs_id'][0]
+        inicio, fim = 0, self.documentos
+        while inicio < fim:
+            meio = (inicio + fim) // 2
+            if self._mm[base + 16 * meio:base + 16 * meio + 16] < chave:
+                inicio = meio + 1
+            else:
+                fim = meio
+        if inicio < self.documentos and self._mm[base + 16 * inicio:base + 16 * inicio + 16] == chave:
+            return inicio
+        return -1
+
+    def __contains__(self, seif_id: str) -> bool:
+        return self._documento(seif_id) >= 0
+
+    def related(self, seif_id: str) -> List[RelatedSeif]:
+        """Seifim relacionados ao seif (id da linha em seifim), do mais ao menos parecido"""
+
+        documento = self._documento(seif_id)
+        if documento < 0:
+            return []
+        inicio, fim = self._offsets[documento], self._offsets[documento + 1]
+        return [
+            RelatedSeif(self._uuid('docs_id', outro), self._uuid('docs_siman', outro), round(valor, 3))
+            for outro, valor in zip(self._docs[inicio:fim], self._similaridades[inicio:fim])
+        ]
+
+    def close(self) -> None:
+        # As views apontam para o mmap; soltá-las antes de fechá-lo
+        self._offsets = self._docs = self._similaridades = None
+        self._mm.close()
+
+    def __enter__(self) -> 'RelatedSeifim':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
@@ -0,0 +1,350 @@
+"""
+Índice invertido BM25 dos seifim e assuntos, em um arquivo binário mapeável
+
+O processamento grava (--search-index) um arquivo com as listas de postings
+(documento e frequência do termo), o tamanho de cada documento e as
+estatísticas do BM25. SearchIndex abre o arquivo com mmap e responde buscas
+ranqueadas sem banco e sem carregar o índice na memória: os termos são
+achados por busca binária e só os postings dos termos da consulta são lidos.
+
+Formato (little-endian, seções alinhadas em 8 bytes):
+
+    cabeçalho   MAGIC, versão, documentos, termos, k1, b, tamanho médio por tipo
+    seções      (offset, tamanho) de cada seção, na ordem de SECOES
+    termos      offsets (u32) e textos UTF-8 em ordem de bytes
+    postings    offsets (u32) por termo, documentos (u32), frequências (u32) e
+                peso BM25 sem o idf (f32), calculado na gravação
+    documentos  tamanho (u32), tipo (u8), id e siman_id (uuid, 16 bytes),
+                número do seif (i32; -1 se não couber) e rótulo (offsets u32 + UTF-8)
+
+NumPy é opcional: com ele a pontuação dos postings é vetorizada; sem ele o
+mesmo cálculo é feito em Python.
+"""
+
+import heapq
+import math
+import mmap
+import re
+import struct
+import sys
+import uuid
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depende do ambiente
+    np = None
+
+from .ids import stable_id
+
+MAGIC = b'SABM25\x00\x00'
+VERSAO = 1
+
+# Parâmetros do BM25
+K1 = 1.2
+B = 0.75
+
+# Tipos de documento
+TIPOS = ('seif', 'assunto')
+
+SECOES = (
+    'termos_offsets', 'termos', 'postings_offsets', 'postings_docs', 'postings_tfs', 'postings_pesos',
+    'docs_tamanho', 'docs_tipo', 'docs_id', 'docs_siman', 'docs_numero', 'rotulos_offsets', 'rotulos',
+)
+
+_CABECALHO = struct.Struct('<8sIIIdd' + 'd' * len(TIPOS))
+_SECAO = struct.Struct('<QQ')
+
+# Termos: letras/dígitos com 2+ caracteres, em minúsculas e sem acentos
+TERMO_PATTERN = re.compile(r'\w{2,}')
+_SEM_ACENTOS = str.maketrans('áàâãäéèêëíìîïóòôõöúùûüç', 'aaaaaeeeeiiiiooooouuuuc')
+
+STOP_WORDS = frozenset((
+    'o', 'a', 'os', 'as', 'um', 'uma', 'de', 'da', 'do', 'das', 'dos', 'em', 'na', 'no', 'nas', 'nos',
+    'ao', 'aos', 'para', 'com', 'por', 'pelo', 'pela', 'que', 'se', 'nao', 'e', 'ou', 'mas', 'como',
+    'seu', 'sua', 'seus', 'suas', 'ele', 'ela', 'eles', 'elas', 'isso', 'este', 'esta', 'esse', 'essa',
+))
+
+
+def search_terms(texto: str) -> List[str]:
+    """Termos do texto, na forma em que são indexados e buscados"""
+
+    return [
+        termo for termo in TERMO_PATTERN.findall(texto.lower().translate(_SEM_ACENTOS))
+        if termo not in STOP_WORDS
+    ]
+
+
+class SearchHit(NamedTuple):
+    score: float
+    id: str
+    siman_id: str
+    seif_numero: int  # 0 nos assuntos
+    tipo: str
+    rotulo: str
+
+
+class SearchIndexBuilder:
+    """Acumula os documentos e grava o índice"""
+
+    def __init__(self, k1: float = K1, b: float = B):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        self._tamanhos = array('I')
+        self._tipos = array('B')
+        self._ids = bytearray()
+        self._simanim = bytearray()
+        self._numeros = array('i')
+        self._rotulos: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._tamanhos)
+
+    def add_document(self, doc_id: str, siman_id: str, seif_numero: int, tipo: str, texto: str,
+                     rotulo: str) -> None:
+        documento = len(self._tamanhos)
+        termos = search_terms(texto)
+        for termo, frequencia in Counter(termos).items():
+            postings = self._postings.get(termo)
+            if postings is None:
+                postings = self._postings[termo] = (array('I'), array('I'))
+            postings[0].append(documento)
+            postings[1].append(frequencia)
+
+        self._tamanhos.append(len(termos))
+        self._tipos.append(TIPOS.index(tipo))
+        self._ids += uuid.UUID(doc_id).bytes
+        self._simanim += uuid.UUID(siman_id).bytes
+        # Número fora dos 32 bits (texto malformado, ver records.py): -1, o documento continua no índice
+        self._numeros.append(seif_numero if -2 ** 31 <= seif_numero < 2 ** 31 else -1)
+        self._rotulos.append(rotulo)
+
+    def add_siman(self, siman: Any) -> None:
+        """Assunto e seifim de um ProcessedSiman, com os ids das linhas do banco"""
+
+        self.add_document(stable_id('assuntos', siman.original_id), siman.original_id, 0, 'assunto',
+                          siman.assunto, siman.assunto)
+        for seif in siman.seifim:
+            self.add_document(stable_id('seifim', siman.original_id, seif['numero']), siman.original_id,
+                              seif['numero'], 'seif', seif['conteudo'], seif['assunto'])
+
+    def _tamanho_medio(self, tipo: int) -> float:
+        tamanhos = [tamanho for tamanho, t in zip(self._tamanhos, self._tipos) if t == tipo]
+        return sum(tamanhos) / len(tamanhos) if tamanhos else 0.0
+
+    def write(self, path: Union[str, Path]) -> None:
+        """Grava o índice no formato descrito no módulo"""
+
+        termos = sorted(self._postings, key=lambda termo: termo.encode('utf-8'))
+        termos_offsets = array('I', [0])
+        termos_texto = bytearray()
+        postings_offsets = array('I', [0])
+        postings_docs = array('I')
+        postings_tfs = array('I')
+        postings_pesos = array('f')
+        # Parte do BM25 que não depende do termo: tf * (k1 + 1) / (tf + k1 * (1 - b + b * tamanho / média))
+        medias = [self._tamanho_medio(tipo) for tipo in range(len(TIPOS))]
+        normas = [
+            self.k1 * (1 - self.b + self.b * tamanho / (medias[tipo] or 1.0))
+            for tamanho, tipo in zip(self._tamanhos, self._tipos)
+        ]
+        for termo in termos:
+            termos_texto += termo.encode('utf-8')
+            termos_offsets.append(len(termos_texto))
+            docs, tfs = self._postings[termo]
+            postings_docs.extend(docs)
+            postings_tfs.extend(tfs)
+            postings_pesos.extend(tf * (self.k1 + 1) / (tf + normas[doc]) for doc, tf in zip(docs, tfs))
+            postings_offsets.append(len(postings_docs))
+
+        rotulos_offsets = array('I', [0])
+        rotulos = bytearray()
+        for rotulo in self._rotulos:
+            rotulos += rotulo.encode('utf-8')
+            rotulos_offsets.append(len(rotulos))
+
+        secoes = [
+            termos_offsets, termos_texto, postings_offsets, postings_docs, postings_tfs, postings_pesos,
+            self._tamanhos, self._tipos, self._ids, self._simanim, self._numeros, rotulos_offsets, rotulos,
+        ]
+        dados = [_little_endian(secao) for secao in secoes]
+
+        inicio = _alinhado(_CABECALHO.size + _SECAO.size * len(SECOES))
+        posicoes = []
+        for bloco in dados:
+            posicoes.append((inicio, len(bloco)))
+            inicio = _alinhado(inicio + len(bloco))
+
+        with open(path, 'wb') as f:
+            f.write(_CABECALHO.pack(MAGIC, VERSAO, len(self), len(termos), self.k1, self.b, *medias))
+            for posicao in posicoes:
+                f.write(_SECAO.pack(*posicao))
+            for (offset, _), bloco in zip(posicoes, dados):
+                f.write(b'\x00' * (offset - f.tell()))
+                f.write(bloco)
+
+
+def _alinhado(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def _little_endian(secao: Union[array, bytearray]) -> bytes:
+    if isinstance(secao, array) and sys.byteorder != 'little':
+        secao = array(secao.typecode, secao)
+        secao.byteswap()
+    return bytes(secao)
+
+
+class SearchIndex:
+    """Índice aberto com mmap; search() devolve os documentos mais relevantes"""
+
+    def __init__(self, path: Union[str, Path], use_numpy: Optional[bool] = None):
+        if sys.byteorder != 'little':
+            raise RuntimeError("SearchIndex lê o arquivo direto da memória e exige uma máquina little-endian")
+        self.path = str(path)
+        self.use_numpy = np is not None if use_numpy is None else use_numpy and np is not None
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, versao, self.documentos, self.termos, self.k1, self.b, *medias = \
+            _CABECALHO.unpack_from(self._mm, 0)
+        if magic != MAGIC or versao != VERSAO:
+            raise ValueError(f"{path} não é um índice de busca na versão {VERSAO}")
+        self.tamanho_medio = dict(zip(TIPOS, medias))
+        self._secoes = {
+            nome: _SECAO.unpack_from(self._mm, _CABECALHO.size + _SECAO.size * indice)
+            for indice, nome in enumerate(SECOES)
+        }
+
+        view = memoryview(self._mm)
+        self._termos_offsets = self._view(view, 'termos_offsets', 'I')
+        self._postings_offsets = self._view(view, 'postings_offsets', 'I')
+        self._rotulos_offsets = self._view(view, 'rotulos_offsets', 'I')
+        self._numeros = self._view(view, 'docs_numero', 'i')
+        self._tipos = self._view(view, 'docs_tipo', 'B')
+
+        if self.use_numpy:
+            self._docs = self._array('postings_docs', np.uint32)
+            self._pesos = self._array('postings_pesos', np.float32)
+            self._np_tipos = self._array('docs_tipo', np.uint8)
+        else:
+            self._docs = self._view(view, 'postings_docs', 'I')
+            self._pesos = self._view(view, 'postings_pesos', 'f')
+
+    def _view(self, view: memoryview, secao: str, formato: str) -> memoryview:
+        offset, tamanho = self._secoes[secao]
+        return view[offset:offset + tamanho].cast(formato)
+
+    def _array(self, secao: str, dtype: Any) -> Any:
+        offset, tamanho = self._secoes[secao]
+        dtype = np.dtype(dtype).newbyteorder('<')
+        return np.frombuffer(self._mm, dtype=dtype, count=tamanho // dtype.itemsize, offset=offset)
+
+    def __len__(self) -> int:
+        return self.documentos
+
+    def _termo(self, termo: str) -> int:
+        """Índice do termo (busca binária nos textos ordenados) ou -1"""
+
+        chave = termo.encode('utf-8')
+        base = self._secoes['termos'][0]
+        offsets = self._termos_offsets
+        inicio, fim = 0, self.termos
+        while inicio < fim:
+            meio = (inicio + fim) // 2
+            atual = self._mm[base + offsets[meio]:base + offsets[meio + 1]]
+            if atual < chave:
+                inicio = meio + 1
+            elif atual > chave:
+                fim = meio
+            else:
+                return meio
+        return -1
+
+    def _idf(self, df: int) -> float:
+        return math.log(1 + (self.documentos - df + 0.5) / (df + 0.5))
+
+    def _postings(self, consulta: str) -> List[Tuple[int, int, float]]:
+        """(início, fim, idf) dos postings de cada termo da consulta presente no índice"""
+
+        postings = []
+        for termo in set(search_terms(consulta)):
+            indice = self._termo(termo)
+            if indice >= 0:
+                inicio, fim = self._postings_offsets[indice], self._postings_offsets[indice + 1]
+                postings.append((inicio, fim, self._idf(fim - inicio)))
+        return postings
+
+    def _scores_numpy(self, postings: List[Tuple[int, int, float]]) -> Any:
+        scores = np.zeros(self.documentos)
+        for inicio, fim, idf in postings:
+            # Cada documento aparece uma vez nos postings de um termo
+            scores[self._docs[inicio:fim]] += np.multiply(self._pesos[inicio:fim], idf, dtype=np.float64)
+        return scores
+
+    def _scores_python(self, postings: List[Tuple[int, int, float]]) -> Dict[int, float]:
+        scores: Dict[int, float] = {}
+        for inicio, fim, idf in postings:
+            for doc, peso in zip(self._docs[inicio:fim], self._pesos[inicio:fim]):
+                scores[doc] = scores.get(doc, 0.0) + idf * peso
+        return scores
+
+    def search(self, consulta: str, limite: int = 10, tipo: Optional[str] = None) -> List[SearchHit]:
+        """Documentos mais relevantes para a consulta (BM25), do maior score ao menor"""
+
+        postings = self._postings(consulta)
+        if not postings:
+            return []
+        filtro = None if tipo is None else TIPOS.index(tipo)
+
+        if self.use_numpy:
+            scores = self._scores_numpy(postings)
+            if filtro is not None:
+                scores[self._np_tipos != filtro] = 0
+            if limite < self.documentos:
+                # Todos os empatados com o último dos melhores, para o desempate pela ordem dos documentos
+                limiar = max(scores[np.argpartition(-scores, limite - 1)[:limite]].min(), np.nextafter(0, 1))
+                candidatos = np.flatnonzero(scores >= limiar)
+            else:
+                candidatos = np.flatnonzero(scores > 0)
+            melhores = sorted(((float(scores[doc]), int(doc)) for doc in candidatos),
+                              key=lambda par: (-par[0], par[1]))[:limite]
+        else:
+            scores = self._scores_python(postings)
+            if filtro is not None:
+                scores = {doc: score for doc, score in scores.items() if self._tipos[doc] == filtro}
+            melhores = heapq.nsmallest(limite, ((score, doc) for doc, score in scores.items()),
+                                       key=lambda par: (-par[0], par[1]))
+        return [self.hit(doc, score) for score, doc in melhores]
+
+    def hit(self, doc: int, score: float = 0.0) -> SearchHit:
+        """Dados do documento"""
+
+        base_ids = self._secoes['docs_id'][0] + 16 * doc
+        base_simanim = self._secoes['docs_siman'][0] + 16 * doc
+        base_rotulos = self._secoes['rotulos'][0]
+        rotulo = self._mm[base_rotulos + self._rotulos_offsets[doc]:base_rotulos + self._rotulos_offsets[doc + 1]]
+        return SearchHit(
+            score,
+            str(uuid.UUID(bytes=self._mm[base_ids:base_ids + 16])),
+            str(uuid.UUID(bytes=self._mm[base_simanim:base_simanim + 16])),
+            self._numeros[doc],
+            TIPOS[self._tipos[doc]],
+            rotulo.decode('utf-8'),
+        )
+
+    def close(self) -> None:
+        # As views e arrays apontam para o mmap; soltá-los antes de fechá-lo
+        self._termos_offsets = self._postings_offsets = self._rotulos_offsets = None
+        self._numeros = self._tipos = self._np_tipos = self._docs = self._pesos = None
+        self._mm.close()
+
+    def __enter__(self) -> 'SearchIndex':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
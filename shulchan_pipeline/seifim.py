@@ -0,0 +1,127 @@
+"""
+Segmentação dos seifim em uma única passada, por offsets no conteúdo original
+
+Equivale a pular o cabeçalho com re.match(r'SIMAN\\s+\\d+.*?(?=\\d+\\.)', ...) e
+aplicar finditer(r'(\\d+)\\.\\s+([^0-9].*?)(?=\\d+\\.|$)', DOTALL) a partir dele,
+mas sem o lookahead testado a cada caractere (quadrático em sequências longas
+de dígitos): os números seguidos de ponto são localizados uma vez e cada seif
+termina no próximo deles.
+"""
+
+import re
+from typing import Iterator, List, NamedTuple, Tuple
+
+DIGITOS_PATTERN = re.compile(r'\d+')
+DIGITO_PONTO_PATTERN = re.compile(r'\d\.')
+ESPACOS_PATTERN = re.compile(r'\s*')
+CABECALHO_PATTERN = re.compile(r'SIMAN\s+')
+
+# Dígitos aceitos por [^0-9] (\d também inclui dígitos de outros alfabetos)
+DIGITOS_ASCII = frozenset('0123456789')
+
+# Seifim mais curtos que isso (sem espaços nas pontas) são descartados
+TAMANHO_MINIMO = 10
+
+
+class SeifSpan(NamedTuple):
+    """Seif encontrado: índice do match, número e intervalo do texto (já sem espaços nas pontas)"""
+    indice: int
+    numero: str
+    inicio: int
+    fim: int
+
+
+def _numeros_com_ponto(content: str) -> List[Tuple[int, int]]:
+    """Intervalos (início, fim) das sequências de dígitos seguidas de '.'"""
+
+    numeros = []
+    for match in DIGITO_PONTO_PATTERN.finditer(content):
+        # Volta até o início da sequência (\d é isdecimal())
+        fim = match.start() + 1
+        inicio = fim - 1
+        while inicio > 0 and content[inicio - 1].isdecimal():
+            inicio -= 1
+        numeros.append((inicio, fim))
+    return numeros
+
+
+def _header_end(content: str, numeros: List[Tuple[int, int]]) -> int:
+    """Fim do cabeçalho 'SIMAN <n> ...' (0 se o conteúdo não começa com ele)"""
+
+    cabecalho = CABECALHO_PATTERN.match(content)
+    if not cabecalho:
+        return 0
+    digitos = DIGITOS_PATTERN.match(content, cabecalho.end())
+    if not digitos:
+        return 0
+    inicio, fim = digitos.span()
+
+    # O cabeçalho vai até o próximo número seguido de ponto
+    for numero_inicio, _ in numeros:
+        if numero_inicio > fim:
+            return numero_inicio
+
+    # Sem outro número: "SIMAN 12." termina antes do último dígito
+    if content.startswith('.', fim) and fim - inicio >= 2:
+        return fim - 1
+    return 0
+
+
+def _strip_span(content: str, inicio: int, fim: int) -> Tuple[int, int]:
+    """Intervalo de content[inicio:fim].strip(), sem copiar o texto"""
+
+    inicio = ESPACOS_PATTERN.match(content, inicio, fim).end()
+    while fim > inicio and content[fim - 1].isspace():
+        fim -= 1
+    return inicio, fim
+
+
+def iter_seif_spans(content: str) -> Iterator[SeifSpan]:
+    """Percorre os seifim do conteúdo em ordem, em tempo linear"""
+
+    numeros = _numeros_com_ponto(content)
+    tamanho = len(content)
+    # O texto termina no fim do conteúdo ou antes de uma quebra de linha final ($)
+    final = tamanho - 1 if content.endswith('\n') else tamanho
+
+    posicao = _header_end(content, numeros)
+    proximo = 0  # índice do primeiro número em numeros que ainda pode iniciar ou encerrar um seif
+    indice = 0
+    while True:
+        # Próximo número com ponto que termina depois da posição atual
+        while proximo < len(numeros) and numeros[proximo][1] <= posicao:
+            proximo += 1
+        if proximo == len(numeros):
+            return
+        numero_inicio, numero_fim = numeros[proximo]
+        numero_inicio = max(numero_inicio, posicao)
+
+        # \.\s+ seguido de um caractere que não é dígito ASCII; se houver ao
+        # menos dois espaços, o último deles pode ser esse caractere
+        espacos_fim = ESPACOS_PATTERN.match(content, numero_fim + 1).end()
+        espacos = espacos_fim - (numero_fim + 1)
+        if espacos >= 1 and espacos_fim < tamanho and content[espacos_fim] not in DIGITOS_ASCII:
+            texto_inicio = espacos_fim
+        elif espacos >= 2:
+            texto_inicio = espacos_fim - 1
+        else:
+            posicao = numero_fim
+            continue
+
+        # O seif vai até o próximo número seguido de ponto (ou até o fim)
+        texto_fim = final if final > texto_inicio else tamanho
+        seguinte = proximo
+        while seguinte < len(numeros) and numeros[seguinte][1] <= texto_inicio + 1:
+            seguinte += 1
+        if seguinte < len(numeros):
+            texto_fim = min(texto_fim, max(numeros[seguinte][0], texto_inicio + 1))
+
+        yield SeifSpan(indice, content[numero_inicio:numero_fim], *_strip_span(content, texto_inicio, texto_fim))
+        indice += 1
+        posicao = texto_fim
+
+
+def significant_seif_spans(content: str) -> List[SeifSpan]:
+    """Seifim com conteúdo significativo (mais de TAMANHO_MINIMO caracteres)"""
+
+    return [span for span in iter_seif_spans(content) if span.fim - span.inicio > TAMANHO_MINIMO]
@@ -0,0 +1,400 @@
+"""
+SQL dividido em shards por tabela, comprimidos, com manifesto e carga paralela
+
+ShardedSqlWriter tem a mesma interface do SqlWriter (write, write_many,
+close), mas em vez de um arquivo único grava um diretório:
+
+    01_assuntos_0001.sql.gz     SQL completo de um pedaço da tabela (cabeçalho,
+    01_assuntos_0002.sql.gz     comandos no --format escolhido e fim do COPY)
+    02_seifim_0001.sql.gz
+    ...
+    manifest.json               shards na ordem de carga, com tabela, fase,
+                                linhas, bytes e sha256 de cada arquivo
+
+Cada shard tem no máximo max_bytes (do SQL sem compressão; só um lote do
+formato maior que isso fica sozinho em um shard maior) e max_rows linhas,
+então cada arquivo cabe, por exemplo, no SQL Editor do Supabase. Shards da mesma fase não dependem um do outro (as chaves
+estrangeiras entre as tabelas geradas, lidas de database_schema.sql, definem
+as fases) e são carregados em paralelo por load_shards, um por conexão e em
+uma transação cada.
+"""
+
+import gzip
+import hashlib
+import io
+import json
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import takewhile
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple, Union
+
+from .ids import SCHEMA_PATH
+from .sql_writer import FORMATS, SEPARADOR, TABLES, SqlFormat
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstandard é opcional (só para --compress zstd)
+    zstandard = None
+
+try:
+    import psycopg2
+except ImportError:  # pragma: no cover - psycopg2 é opcional (só para a carga)
+    psycopg2 = None
+
+# Nome do manifesto dentro do diretório dos shards
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_VERSION = 1
+
+# Tamanho máximo padrão de um shard (SQL sem compressão)
+MAX_BYTES = 4 * 1024 * 1024
+
+# Compressões aceitas (None: SQL puro) e a extensão de cada uma
+COMPRESSIONS = {None: '', 'gzip': '.gz', 'zstd': '.zst'}
+
+# CREATE TABLE ... ( ... ); de database_schema.sql e as tabelas referenciadas nele
+_CREATE_TABLE_PATTERN = re.compile(r"^CREATE TABLE IF NOT EXISTS (\w+) \((.*?)^\);", re.DOTALL | re.MULTILINE)
+_REFERENCES_PATTERN = re.compile(r"\bREFERENCES (\w+)")
+
+# Início de um bloco COPY ... FROM STDIN; no texto do shard
+_COPY_PATTERN = re.compile(r"COPY \w+ \([^)]*\) FROM STDIN;\n")
+
+
+class Shard(NamedTuple):
+    """Entrada do manifesto: um arquivo de SQL de uma tabela"""
+    arquivo: str
+    tabela: str
+    parte: int
+    fase: int
+    linhas: int
+    bytes: int  # SQL sem compressão
+    sha256: str  # do arquivo gravado (já comprimido)
+
+
+def table_phases(tables: Sequence[str], schema_path: Union[str, Path] = SCHEMA_PATH) -> Dict[str, int]:
+    """Fase de carga de cada tabela: 0 se não referencia outra das tabelas, senão 1 + a maior fase delas"""
+
+    texto = Path(schema_path).read_text(encoding='utf-8')
+    referencias: Dict[str, Set[str]] = {
+        match.group(1): set(_REFERENCES_PATTERN.findall(match.group(2)))
+        for match in _CREATE_TABLE_PATTERN.finditer(texto)
+    }
+    fases: Dict[str, int] = {}
+
+    def fase(tabela: str, caminho: Tuple[str, ...] = ()) -> int:
+        if tabela not in fases:
+            if tabela in caminho:
+                raise ValueError(f"referências circulares entre as tabelas: {' -> '.join(caminho + (tabela,))}")
+            dependencias = [dep for dep in referencias.get(tabela, ()) if dep in tables and dep != tabela]
+            fases[tabela] = 1 + max((fase(dep, caminho + (tabela,)) for dep in dependencias), default=-1)
+        return fases[tabela]
+
+    return {tabela: fase(tabela) for tabela in tables}
+
+
+class _HashingFile:
+    """Arquivo binário que calcula o sha256 do que é gravado"""
+
+    def __init__(self, path: Path):
+        self._file = open(path, 'wb')
+        self.sha256 = hashlib.sha256()
+
+    def write(self, data: bytes) -> int:
+        self.sha256.update(data)
+        return self._file.write(data)
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def _open_compressed(destino: _HashingFile, compressao: Optional[str]) -> Any:
+    if compressao is None:
+        return destino
+    if compressao == 'gzip':
+        # mtime fixo: o mesmo SQL gera o mesmo arquivo (e o mesmo sha256)
+        return gzip.GzipFile(fileobj=destino, mode='wb', mtime=0)
+    if compressao == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("--compress zstd exige o zstandard (pip install zstandard)")
+        return zstandard.ZstdCompressor().stream_writer(destino, closefd=False)
+    raise ValueError(f"compressão desconhecida: {compressao!r} (use {', '.join(c for c in COMPRESSIONS if c)})")
+
+
+def open_shard(path: Union[str, Path]) -> BinaryIO:
+    """Abre um shard para leitura, descomprimindo pela extensão"""
+
+    path = Path(path)
+    if path.suffix == '.gz':
+        return gzip.open(path, 'rb')
+    if path.suffix == '.zst':
+        if zstandard is None:
+            raise RuntimeError(f"'{path}' é zstd e a leitura exige o zstandard (pip install zstandard)")
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+    return open(path, 'rb')
+
+
+class _OpenShard:
+    """Shard em escrita de uma tabela"""
+
+    def __init__(self, path: Path, compressao: Optional[str]):
+        self.path = path
+        self.destino = _HashingFile(path)
+        self.saida = _open_compressed(self.destino, compressao)
+        self.linhas = 0
+        self.bytes = 0
+
+    def write(self, texto: str) -> None:
+        data = texto.encode('utf-8')
+        self.bytes += len(data)
+        self.saida.write(data)
+
+    def close(self) -> str:
+        if self.saida is not self.destino:
+            self.saida.close()
+        self.destino.close()
+        return self.destino.sha256.hexdigest()
+
+
+class ShardedSqlWriter:
+    """Escreve as linhas em shards por tabela à medida que os simanim são processados
+
+    Cada tabela tem no máximo um shard aberto; a memória usada é a dos lotes
+    do formato, não a do corpus. O manifesto é gravado no close().
+    """
+
+    def __init__(self, directory: Union[str, Path], sections: Sequence[Tuple[str, str]],
+                 formato: Union[str, SqlFormat] = 'insert', max_bytes: int = MAX_BYTES,
+                 max_rows: Optional[int] = None, compressao: Optional[str] = None,
+                 schema_path: Union[str, Path] = SCHEMA_PATH):
+        """sections: lista ordenada de (tabela, título da seção), como no SqlWriter"""
+
+        if compressao not in COMPRESSIONS:
+            raise ValueError(f"compressão desconhecida: {compressao!r}")
+        self.directory = Path(directory)
+        self.sections = list(sections)
+        self.formato = FORMATS[formato]() if isinstance(formato, str) else formato
+        if self.formato.upsert:
+            raise ValueError("os shards não aceitam upsert (use o SqlWriter para o delta incremental)")
+        self.max_bytes = max_bytes
+        self.max_rows = max_rows
+        self.compressao = compressao
+        self.fases = table_phases([table for table, _ in self.sections], schema_path)
+        self.rows: Dict[str, int] = {table: 0 for table, _ in self.sections}
+        self.shards: List[Shard] = []
+        self._pending: Dict[str, List[Tuple[Any, ...]]] = {table: [] for table, _ in self.sections}
+        self._abertos: Dict[str, _OpenShard] = {}
+        self._partes: Dict[str, int] = {table: 0 for table, _ in self.sections}
+        self._indices = {table: indice for indice, (table, _) in enumerate(self.sections, start=1)}
+        self._titulos = dict(self.sections)
+        self._closed = False
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Shards de uma execução anterior no mesmo diretório não podem sobrar
+        for antigo in self.directory.glob('[0-9][0-9]_*_[0-9][0-9][0-9][0-9].sql*'):
+            antigo.unlink()
+
+    def __enter__(self) -> 'ShardedSqlWriter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self._discard()
+
+    def _shard(self, table: str) -> _OpenShard:
+        shard = self._abertos.get(table)
+        if shard is None:
+            self._partes[table] += 1
+            parte = self._partes[table]
+            nome = f"{self._indices[table]:02d}_{table}_{parte:04d}.sql{COMPRESSIONS[self.compressao]}"
+            shard = self._abertos[table] = _OpenShard(self.directory / nome, self.compressao)
+            titulo = f"{self._titulos[table]} (parte {parte})"
+            shard.write("\n".join([SEPARADOR, f"-- {titulo}", SEPARADOR]))
+            shard.write(self.formato.section_start(TABLES[table]))
+        return shard
+
+    def _close_shard(self, table: str) -> None:
+        shard = self._abertos.pop(table)
+        shard.write(self.formato.section_end(TABLES[table]) + "\n")
+        sha256 = shard.close()
+        self.shards.append(Shard(
+            shard.path.name, table, self._partes[table], self.fases[table], shard.linhas, shard.bytes, sha256
+        ))
+
+    def _flush(self, table: str) -> None:
+        pending = self._pending[table]
+        if not pending:
+            return
+        spec = TABLES[table]
+        texto = self.formato.render(spec, pending)
+        self._pending[table] = []
+        # O lote que passaria de max_bytes vai para um shard novo (só um lote sozinho pode passar do limite)
+        aberto = self._abertos.get(table)
+        if aberto is not None and aberto.linhas and (
+                aberto.bytes + len(texto.encode('utf-8')) + len(self.formato.section_end(spec)) + 1 > self.max_bytes):
+            self._close_shard(table)
+        shard = self._shard(table)
+        shard.write(texto)
+        shard.linhas += len(pending)
+        if shard.bytes >= self.max_bytes or (self.max_rows and shard.linhas >= self.max_rows):
+            self._close_shard(table)
+
+    def write(self, table: str, row: Tuple[Any, ...]) -> None:
+        """Acrescenta uma linha ao shard aberto da tabela"""
+
+        pending = self._pending[table]
+        pending.append(row)
+        self.rows[table] += 1
+        # Lotes do formato, sem passar de max_rows no shard
+        limite = self.formato.batch_size
+        if self.max_rows:
+            aberto = self._abertos.get(table)
+            limite = min(limite, self.max_rows - (aberto.linhas if aberto is not None else 0))
+        if len(pending) >= limite:
+            self._flush(table)
+
+    def write_many(self, rows: Iterable[Tuple[str, Tuple[Any, ...]]]) -> None:
+        """Acrescenta vários pares (tabela, linha)"""
+
+        for table, row in rows:
+            self.write(table, row)
+
+    def close(self) -> None:
+        """Fecha os shards abertos e grava o manifesto"""
+
+        if self._closed:
+            return
+        for table, _ in self.sections:
+            self._flush(table)
+            if table in self._abertos:
+                self._close_shard(table)
+
+        # Ordem de carga: fase, ordem das seções e parte
+        self.shards.sort(key=lambda shard: (shard.fase, self._indices[shard.tabela], shard.parte))
+        manifesto = {
+            'versao': MANIFEST_VERSION,
+            'formato': next((nome for nome, classe in FORMATS.items() if type(self.formato) is classe), None),
+            'compressao': self.compressao,
+            'linhas': self.rows,
+            'shards': [shard._asdict() for shard in self.shards],
+        }
+        caminho = self.directory / MANIFEST_NAME
+        caminho.write_text(json.dumps(manifesto, ensure_ascii=False, indent=2) + "\n", encoding='utf-8')
+        self._closed = True
+
+    def _discard(self) -> None:
+        for shard in self._abertos.values():
+            shard.close()
+        self._abertos = {}
+        self._closed = True
+
+
+def read_manifest(directory: Union[str, Path]) -> List[Shard]:
+    """Shards do manifesto, na ordem de carga"""
+
+    manifesto = json.loads((Path(directory) / MANIFEST_NAME).read_text(encoding='utf-8'))
+    if manifesto.get('versao') != MANIFEST_VERSION:
+        raise ValueError(f"manifesto de shards de versão {manifesto.get('versao')} (esperada {MANIFEST_VERSION})")
+    return [Shard(**shard) for shard in manifesto['shards']]
+
+
+def verify_shards(directory: Union[str, Path], shards: Iterable[Shard]) -> List[str]:
+    """Arquivos ausentes ou com sha256 diferente do manifesto"""
+
+    problemas = []
+    for shard in shards:
+        caminho = Path(directory) / shard.arquivo
+        if not caminho.exists():
+            problemas.append(f"{shard.arquivo}: ausente")
+            continue
+        sha256 = hashlib.sha256()
+        with open(caminho, 'rb') as f:
+            for bloco in iter(lambda: f.read(1024 * 1024), b''):
+                sha256.update(bloco)
+        if sha256.hexdigest() != shard.sha256:
+            problemas.append(f"{shard.arquivo}: sha256 diferente do manifesto")
+    return problemas
+
+
+def _has_statement(comandos: List[str]) -> bool:
+    """Há algum comando (e não só comentários e linhas em branco)?"""
+
+    return any(linha.strip() and not linha.lstrip().startswith('--') for linha in comandos)
+
+
+def execute_sql(cursor: Any, linhas: Iterable[str]) -> None:
+    """Executa o texto de um shard: comandos SQL e blocos COPY ... FROM STDIN (pelo copy_expert)"""
+
+    linhas = iter(linhas)
+    comandos: List[str] = []
+    for linha in linhas:
+        if not _COPY_PATTERN.fullmatch(linha):
+            comandos.append(linha)
+            continue
+        if _has_statement(comandos):
+            cursor.execute("".join(comandos))
+        comandos = []
+        # Dados até a linha "\." (o shard tem no máximo max_bytes, então cabe em memória)
+        dados = io.StringIO("".join(takewhile(lambda dado: dado != "\\.\n", linhas)))
+        cursor.copy_expert(linha.rstrip(";\n"), dados)
+    if _has_statement(comandos):
+        cursor.execute("".join(comandos))
+
+
+class ShardLoadError(Exception):
+    """Falha na carga de um shard (a transação dele foi desfeita)"""
+
+
+class ShardLoad(NamedTuple):
+    """Resultado da carga de um shard"""
+    shard: Shard
+    segundos: float
+
+
+def load_shards(directory: Union[str, Path], dsn: str, jobs: int = 4,
+                progress: Optional[Callable[[ShardLoad], None]] = None) -> List[ShardLoad]:
+    """Carrega os shards no Postgres: fase por fase, até jobs shards da mesma fase em paralelo
+
+    Cada shard é carregado em uma transação, na sua própria conexão. Se um
+    shard falha, os que ainda não começaram são cancelados e o erro é
+    propagado (os já carregados ficam no banco).
+    """
+
+    if psycopg2 is None:
+        raise RuntimeError("a carga dos shards exige o psycopg2 (pip install psycopg2-binary)")
+    shards = read_manifest(directory)
+
+    def carregar(shard: Shard) -> ShardLoad:
+        inicio = time.perf_counter()
+        conn = psycopg2.connect(dsn)
+        try:
+            conn.set_client_encoding('UTF8')
+            with conn:  # commit no fim do bloco, rollback em erro
+                with conn.cursor() as cursor, open_shard(Path(directory) / shard.arquivo) as arquivo:
+                    execute_sql(cursor, io.TextIOWrapper(arquivo, encoding='utf-8', newline='\n'))
+        except psycopg2.Error as e:
+            raise ShardLoadError(f"{shard.arquivo}: {str(e).strip()}") from e
+        finally:
+            conn.close()
+        return ShardLoad(shard, time.perf_counter() - inicio)
+
+    carregados = []
+    with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix='shard-loader') as executor:
+        for fase in sorted({shard.fase for shard in shards}):
+            futures = [executor.submit(carregar, shard) for shard in shards if shard.fase == fase]
+            try:
+                for future in as_completed(futures):
+                    resultado = future.result()
+                    carregados.append(resultado)
+                    if progress is not None:
+                        progress(resultado)
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+    return carregados
@@ -0,0 +1,396 @@
+"""
+Carga direta no banco, sem passar pelo arquivo SQL
+
+Os sinks têm a mesma interface do SqlWriter (write_many, write_siman,
+delete_siman, close), então main pode escrever em um ou em outro:
+
+    PostgresSink  conexões em pool, COPY em lotes, uma transação por lote e
+                  nova tentativa em falhas de conexão
+    SqliteSink    mesmo schema (traduzido de database_schema.sql) em um arquivo
+                  local, sem servidor; para testes e desenvolvimento
+    PostgrestSink upserts em lote por HTTP em um endpoint PostgREST (a API REST
+                  do Supabase); em postgrest.py
+
+As linhas são sempre gravadas com upsert pelo id estável, então a carga pode
+ser repetida. write_siman também remove as linhas que o siman tinha antes e
+não vieram de novo, na mesma transação do lote.
+"""
+
+import io
+import json
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple, Union
+
+from .ids import SCHEMA_PATH
+from .sql_writer import TABLES, TableSpec, copy_value, upsert_clause
+
+try:
+    import psycopg2
+    import psycopg2.pool
+except ImportError:  # pragma: no cover - psycopg2 é opcional (só para o PostgresSink)
+    psycopg2 = None
+
+# Linhas acumuladas antes de gravar um lote
+BATCH_SIZE = 5000
+
+
+@dataclass
+class Batch:
+    """Linhas de um lote, gravadas em uma única transação"""
+    rows: Dict[str, List[Tuple[Any, ...]]]
+    alterados: List[str] = field(default_factory=list)  # simanim substituídos (write_siman)
+    removidos: List[str] = field(default_factory=list)  # simanim removidos (delete_siman)
+    total: int = 0
+
+    def __bool__(self) -> bool:
+        return bool(self.total or self.alterados or self.removidos)
+
+
+class DatabaseSink:
+    """Acumula as linhas em lotes e grava cada lote em uma transação
+
+    Um siman nunca é dividido entre lotes: o lote é gravado depois da chamada
+    que passa de batch_size linhas.
+    """
+
+    def __init__(self, sections: Sequence[Tuple[str, str]], batch_size: int = BATCH_SIZE):
+        """sections: lista ordenada de (tabela, título da seção), como no SqlWriter"""
+
+        self.tables = [table for table, _ in sections]
+        self.batch_size = batch_size
+        self.removidos: List[str] = []
+        self.rows: Dict[str, int] = {table: 0 for table in self.tables}
+        self.lotes = 0
+        self._batch = self._new_batch()
+        self._closed = False
+
+    def __enter__(self) -> 'DatabaseSink':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self._discard()
+
+    def _new_batch(self) -> Batch:
+        return Batch({table: [] for table in self.tables})
+
+    def _add(self, rows: Iterable[Tuple[str, Tuple[Any, ...]]]) -> None:
+        for table, row in rows:
+            self._batch.rows[table].append(row)
+            self.rows[table] += 1
+            self._batch.total += 1
+
+    def _maybe_flush(self) -> None:
+        if self._batch.total >= self.batch_size:
+            self.flush()
+
+    def write(self, table: str, row: Tuple[Any, ...]) -> None:
+        """Upsert de uma linha"""
+
+        self._add([(table, row)])
+        self._maybe_flush()
+
+    def write_many(self, rows: Iterable[Tuple[str, Tuple[Any, ...]]]) -> None:
+        """Upsert de vários pares (tabela, linha)"""
+
+        self._add(rows)
+        self._maybe_flush()
+
+    def write_siman(self, siman_id: str, rows: Iterable[Tuple[str, Tuple[Any, ...]]]) -> None:
+        """Substitui as linhas de um siman: upsert de rows e remoção das que ficaram de fora"""
+
+        self._add(rows)
+        self._batch.alterados.append(siman_id)
+        self._maybe_flush()
+
+    def delete_siman(self, siman_id: str) -> None:
+        """Remove todas as linhas de um siman"""
+
+        self.removidos.append(siman_id)
+        self._batch.removidos.append(siman_id)
+        self._maybe_flush()
+
+    def flush(self) -> None:
+        """Grava o lote acumulado"""
+
+        batch, self._batch = self._batch, self._new_batch()
+        if batch:
+            self.lotes += 1
+            self._load(batch)
+
+    def close(self) -> None:
+        """Grava o último lote e fecha as conexões"""
+
+        if self._closed:
+            return
+        try:
+            self.flush()
+            self._finish()
+        finally:
+            self._closed = True
+            self._close_connections()
+
+    def _discard(self) -> None:
+        self._closed = True
+        self._close_connections()
+
+    def _load(self, batch: Batch) -> None:
+        raise NotImplementedError
+
+    def _finish(self) -> None:
+        """Espera os lotes em andamento"""
+
+    def _close_connections(self) -> None:
+        raise NotImplementedError
+
+
+class PipelinedSink(DatabaseSink):
+    """Grava os lotes em segundo plano, com no máximo `pendentes` lotes em andamento
+
+    Quando todos estão ocupados, a próxima gravação espera um lote terminar, o
+    que segura o processamento (memória limitada). O erro de um lote aparece
+    na gravação seguinte ou no close.
+    """
+
+    def __init__(self, sections: Sequence[Tuple[str, str]], batch_size: int = BATCH_SIZE, pendentes: int = 4):
+        super().__init__(sections, batch_size)
+        self._slots = threading.BoundedSemaphore(pendentes)
+        self._futures: List[Future] = []
+
+    def _load(self, batch: Batch) -> None:
+        self._raise_failed()
+        self._slots.acquire()
+        try:
+            future = self._submit(batch)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        self._futures.append(future)
+
+    def _submit(self, batch: Batch) -> Future:
+        """Começa a gravar o lote em segundo plano"""
+
+        raise NotImplementedError
+
+    def _raise_failed(self) -> None:
+        """Propaga o erro de um lote que já terminou com falha"""
+
+        pendentes = []
+        for future in self._futures:
+            if future.done():
+                future.result()
+            else:
+                pendentes.append(future)
+        self._futures = pendentes
+
+    def _finish(self) -> None:
+        for future in self._futures:
+            future.result()
+        self._futures = []
+
+
+class PostgresSink(PipelinedSink):
+    """Carga no Postgres (ou Supabase) com COPY
+
+    Cada lote é gravado em uma transação: as linhas vão por COPY para tabelas
+    temporárias, as linhas antigas dos simanim substituídos são removidas e as
+    novas entram com INSERT ... ON CONFLICT (id) DO UPDATE. Os lotes são
+    gravados em paralelo, um por conexão do pool (os lotes têm simanim
+    distintos e as únicas chaves estrangeiras apontam para categorias e tags).
+    Se a conexão cair, o lote é refeito do início em outra conexão.
+    """
+
+    # Erros de conexão/servidor que justificam refazer o lote
+    RETRY_ERRORS: Tuple[type, ...] = (psycopg2.OperationalError, psycopg2.InterfaceError) if psycopg2 else ()
+
+    def __init__(self, dsn: str, sections: Sequence[Tuple[str, str]], batch_size: int = BATCH_SIZE,
+                 connections: int = 4, retries: int = 3, backoff: float = 1.0):
+        if psycopg2 is None:
+            raise RuntimeError("a carga no Postgres exige o psycopg2 (pip install psycopg2-binary)")
+        # No máximo um lote por conexão em andamento; o próximo espera (memória limitada)
+        super().__init__(sections, batch_size, connections)
+        self.retries = retries
+        self.backoff = backoff
+        self.tentativas_refeitas = 0
+        self._pool = psycopg2.pool.ThreadedConnectionPool(1, connections, dsn)
+        self._executor = ThreadPoolExecutor(max_workers=connections, thread_name_prefix='pg-sink')
+        self._lock = threading.Lock()
+
+    def _submit(self, batch: Batch) -> Future:
+        return self._executor.submit(self._load_with_retry, batch)
+
+    def _load_with_retry(self, batch: Batch) -> None:
+        for tentativa in range(self.retries + 1):
+            conn = self._pool.getconn()
+            try:
+                if conn.encoding != 'UTF8':
+                    conn.set_client_encoding('UTF8')  # o COPY envia o texto em UTF-8
+                with conn:  # commit no fim do bloco, rollback em erro
+                    with conn.cursor() as cursor:
+                        self._write_batch(cursor, batch)
+            except self.RETRY_ERRORS:
+                self._pool.putconn(conn, close=True)
+                if tentativa == self.retries:
+                    raise
+                with self._lock:
+                    self.tentativas_refeitas += 1
+                time.sleep(self.backoff * 2 ** tentativa)
+            except BaseException:
+                self._pool.putconn(conn)
+                raise
+            else:
+                self._pool.putconn(conn)
+                return
+
+    @staticmethod
+    def _staging(spec: TableSpec) -> str:
+        return f"{spec.name}_staging"
+
+    def _write_batch(self, cursor: Any, batch: Batch) -> None:
+        # Linhas novas nas tabelas temporárias (descartadas no commit)
+        for table in self.tables:
+            spec = TABLES[table]
+            colunas = ", ".join(spec.column_names)
+            cursor.execute(f"CREATE TEMP TABLE {self._staging(spec)} (LIKE {table}) ON COMMIT DROP")
+            dados = io.StringIO("".join(
+                "\t".join(copy_value(valor) for valor in row) + "\n" for row in batch.rows[table]
+            ))
+            cursor.copy_expert(f"COPY {self._staging(spec)} ({colunas}) FROM STDIN", dados)
+
+        # Remoções primeiro (tabelas filhas antes), para não violar as chaves únicas
+        for table in reversed(self.tables):
+            if batch.removidos:
+                cursor.execute(f"DELETE FROM {table} WHERE siman_id = ANY(%s::uuid[])", (batch.removidos,))
+            if batch.alterados:
+                cursor.execute(
+                    f"DELETE FROM {table} WHERE siman_id = ANY(%s::uuid[]) "
+                    f"AND id NOT IN (SELECT id FROM {self._staging(TABLES[table])})",
+                    (batch.alterados,),
+                )
+
+        for table in self.tables:
+            spec = TABLES[table]
+            if batch.rows[table]:
+                colunas = ", ".join(spec.column_names)
+                cursor.execute(
+                    f"INSERT INTO {table} ({colunas})\n"
+                    f"SELECT {colunas} FROM {self._staging(spec)}{upsert_clause(spec)}"
+                )
+
+    def _close_connections(self) -> None:
+        self._executor.shutdown(wait=True)
+        self._pool.closeall()
+
+
+# Tradução do DDL do Postgres para o SQLite (tipos sem equivalente e defaults com função)
+_SQLITE_DDL = [
+    (re.compile(r"\s+DEFAULT gen_random_uuid\(\)"), ""),
+    (re.compile(r"\bDEFAULT NOW\(\)"), "DEFAULT CURRENT_TIMESTAMP"),
+    (re.compile(r"\b(TEXT|UUID|REAL)\[\]"), "TEXT"),  # arrays ficam como JSON
+]
+_SCHEMA_STATEMENT_PATTERN = re.compile(
+    r"^(CREATE TABLE IF NOT EXISTS .*?^\);"
+    r"|CREATE INDEX IF NOT EXISTS \w+ ON \w+\(\w+\);"
+    r"|INSERT INTO .*?;)",
+    re.DOTALL | re.MULTILINE,
+)
+
+
+def sqlite_schema(schema_path: Union[str, Path] = SCHEMA_PATH) -> Iterator[str]:
+    """Tabelas, índices B-tree e semente de database_schema.sql, no dialeto do SQLite
+
+    Os índices GIN, triggers, views e funções do Postgres ficam de fora.
+    """
+
+    texto = Path(schema_path).read_text(encoding='utf-8')
+    for match in _SCHEMA_STATEMENT_PATTERN.finditer(texto):
+        comando = match.group(1)
+        for padrao, substituto in _SQLITE_DDL:
+            comando = padrao.sub(substituto, comando)
+        yield comando
+
+
+def sqlite_value(valor: Any) -> Any:
+    """Valor para o SQLite (listas viram arrays JSON)"""
+
+    if isinstance(valor, (list, tuple)):
+        return json.dumps(list(valor), ensure_ascii=False)
+    return valor
+
+
+class SqliteSink(DatabaseSink):
+    """Carga em um arquivo SQLite com o mesmo schema, sem servidor
+
+    As tabelas (e a semente de categorias e tags) são criadas se não existirem.
+    Os arrays de palavras-chave ficam como texto JSON (use json_each para consultá-los).
+    """
+
+    def __init__(self, path: Union[str, Path], sections: Sequence[Tuple[str, str]],
+                 batch_size: int = BATCH_SIZE, schema_path: Union[str, Path] = SCHEMA_PATH):
+        super().__init__(sections, batch_size)
+        self.path = str(path)
+        self._conn = sqlite3.connect(self.path)
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        with self._conn:
+            for comando in sqlite_schema(schema_path):
+                self._conn.execute(comando)
+
+    def _load(self, batch: Batch) -> None:
+        with self._conn:  # uma transação por lote
+            for table in reversed(self.tables):
+                if batch.removidos:
+                    self._conn.executemany(f"DELETE FROM {table} WHERE siman_id = ?",
+                                           [(siman_id,) for siman_id in batch.removidos])
+                if batch.alterados:
+                    ids = {siman_id: [] for siman_id in batch.alterados}
+                    for row in batch.rows[table]:
+                        if row[1] in ids:
+                            ids[row[1]].append(row[0])
+                    self._conn.executemany(
+                        f"DELETE FROM {table} WHERE siman_id = ? AND id NOT IN (SELECT value FROM json_each(?))",
+                        [(siman_id, json.dumps(manter)) for siman_id, manter in ids.items()],
+                    )
+
+            for table in self.tables:
+                spec = TABLES[table]
+                colunas = ", ".join(spec.column_names)
+                marcadores = ", ".join("?" for _ in spec.columns)
+                self._conn.executemany(
+                    f"INSERT INTO {table} ({colunas}) VALUES ({marcadores}){upsert_clause(spec)}",
+                    [tuple(map(sqlite_value, row)) for row in batch.rows[table]],
+                )
+
+    def _close_connections(self) -> None:
+        self._conn.close()
+
+
+def open_sink(url: str, sections: Sequence[Tuple[str, str]], batch_size: int = BATCH_SIZE,
+              connections: int = 4) -> DatabaseSink:
+    """Sink do banco indicado: postgresql://..., sqlite:///caminho (ou um arquivo .db/.sqlite) ou
+    http(s)://... (endpoint PostgREST, como https://<projeto>.supabase.co/rest/v1)"""
+
+    if url.startswith(('postgresql://', 'postgres://')):
+        return PostgresSink(url, sections, batch_size, connections)
+    if url.startswith(('http://', 'https://')):
+        from .postgrest import PostgrestSink  # postgrest.py importa este módulo
+        return PostgrestSink(url, sections, batch_size, connections)
+    if url.startswith('sqlite:///'):
+        return SqliteSink(url[len('sqlite:///'):], sections, batch_size)
+    if url.endswith(('.db', '.sqlite', '.sqlite3')):
+        return SqliteSink(url, sections, batch_size)
+    raise ValueError(f"banco não reconhecido: '{url}' (use postgresql://..., sqlite:///arquivo.db ou https://...)")
+
+
+def redact_url(url: str) -> str:
+    """URL do banco sem a senha (para mensagens e relatórios)"""
+
+    return re.sub(r"(://[^:/@]+):[^@]*@", r"\1:***@", url)
@@ -0,0 +1,377 @@
+"""
+Snapshot binário dos simanim processados, para recarregar sem reprocessar o CSV
+
+O snapshot é colunar: cada campo do ProcessedSiman vira uma ou mais seções
+de um único arquivo (textos como offsets + UTF-8, palavras como códigos de um
+vocabulário comum, números em arrays). load_snapshot abre o arquivo com mmap
+e só lê o cabeçalho e o vocabulário; cada siman é montado quando acessado,
+com os seifim no mesmo formato compacto de records.py.
+
+Formato (little-endian, seções alinhadas em 8 bytes):
+
+    cabeçalho   MAGIC, versão, simanim, seções, tamanho dos metadados
+    seções      (nome, offset, tamanho) de cada seção
+    metadados   JSON: campos do siman, versão do processador, origem etc. (e
+                os números de seif que não cabem nos 32 bits da coluna)
+    dados       as seções
+"""
+
+import json
+import mmap
+import struct
+import sys
+from array import array
+from collections.abc import Sequence
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from .records import SeifRecords, compact_seif_data, vocabulary_index, vocabulary_word
+
+MAGIC = b'SASNAP\x00\x00'
+VERSAO = 2
+
+_CABECALHO = struct.Struct('<8sIIII')
+_SECAO = struct.Struct('<32sQQ')
+
+# Posição do número do seif entre os 6 campos de cada seif (records.py)
+_NUMERO_SEIF = 2
+
+# Como cada campo do ProcessedSiman é guardado
+TEXTO, PALAVRA, PALAVRAS, REAL, BOOLEANO, SEIFIM = 'texto', 'palavra', 'palavras', 'real', 'booleano', 'seifim'
+PESOS = 'pesos'  # pares (palavra, peso)
+COLUNAS = {
+    'original_id': TEXTO,
+    'chapter_id': TEXTO,
+    'assunto': TEXTO,
+    'assunto_resumido': TEXTO,
+    'categoria': PALAVRA,
+    'categorias': PESOS,
+    'tags': PALAVRAS,
+    'seifim': SEIFIM,
+    'confianca': REAL,
+    'palavras_chave': PALAVRAS,
+    'tem_assunto_original': BOOLEANO,
+}
+
+
+class _Texto:
+    """Coluna de textos: offsets (u64) + UTF-8"""
+
+    def __init__(self):
+        self.offsets = array('Q', [0])
+        self.dados = bytearray()
+
+    def append(self, texto: str) -> None:
+        self.dados += texto.encode('utf-8')
+        self.offsets.append(len(self.dados))
+
+
+class SnapshotWriter:
+    """Acumula os simanim em colunas e grava o snapshot"""
+
+    def __init__(self, campos: Optional[Iterable[str]] = None):
+        """campos: campos do ProcessedSiman (padrão: os do primeiro siman acrescentado)"""
+
+        self.campos: Optional[List[str]] = list(campos) if campos is not None else None
+        self.simanim = 0
+        self._vocabulario: Dict[str, int] = {}
+        self._colunas: Dict[str, Any] = {}
+        self._assuntos: Dict[str, Dict[str, str]] = {}
+        self._numeros: Dict[str, Dict[str, int]] = {}
+
+    def _codigo(self, palavra: str) -> int:
+        codigo = self._vocabulario.get(palavra)
+        if codigo is None:
+            codigo = self._vocabulario[palavra] = len(self._vocabulario)
+        return codigo
+
+    def _iniciar(self, siman: Any) -> None:
+        if self.campos is None:
+            self.campos = list(getattr(type(siman), '__slots__', None) or vars(siman))
+        for campo in self.campos:
+            tipo = COLUNAS.get(campo)
+            if tipo is None:
+                raise ValueError(f"campo '{campo}' não tem formato definido em COLUNAS")
+            if tipo == TEXTO:
+                self._colunas[campo] = _Texto()
+            elif tipo == PALAVRA:
+                self._colunas[campo] = array('I')
+            elif tipo == PALAVRAS:
+                self._colunas[campo] = (array('I', [0]), array('I'))
+            elif tipo == PESOS:
+                self._colunas[campo] = (array('I', [0]), array('I'), array('d'))
+            elif tipo == REAL:
+                self._colunas[campo] = array('d')
+            elif tipo == BOOLEANO:
+                self._colunas[campo] = array('B')
+            else:
+                # conteúdo, seifim por siman, dados dos seifim, palavras por siman, palavras
+                self._colunas[campo] = (_Texto(), array('I', [0]), array('i'), array('I', [0]), array('I'))
+
+    def add(self, siman: Any) -> None:
+        """Acrescenta um siman processado"""
+
+        if not self._colunas:
+            self._iniciar(siman)
+        for campo in self.campos:
+            valor = getattr(siman, campo)
+            tipo = COLUNAS[campo]
+            coluna = self._colunas[campo]
+            if tipo == TEXTO:
+                coluna.append(valor)
+            elif tipo == PALAVRA:
+                coluna.append(self._codigo(valor))
+            elif tipo == PALAVRAS:
+                coluna[1].extend(map(self._codigo, valor))
+                coluna[0].append(len(coluna[1]))
+            elif tipo == PESOS:
+                for palavra, peso in valor:
+                    coluna[1].append(self._codigo(palavra))
+                    coluna[2].append(peso)
+                coluna[0].append(len(coluna[1]))
+            elif tipo in (REAL, BOOLEANO):
+                coluna.append(valor)
+            else:
+                self._add_seifim(coluna, valor)
+        self.simanim += 1
+
+    def _add_seifim(self, coluna: Tuple[Any, ...], seifim: SeifRecords) -> None:
+        content, por_siman, dados_seifim, palavras_por_siman, palavras = coluna
+        dados, palavras_chave, assuntos = seifim.arrays()
+        if getattr(dados, 'typecode', None) != 'i':
+            # Número de seif fora dos 32 bits (ver records.py): 0 na coluna e o número nos metadados
+            dados = list(dados)
+            numeros = {}
+            for posicao in range(_NUMERO_SEIF, len(dados), 6):
+                if not -2 ** 31 <= dados[posicao] < 2 ** 31:
+                    numeros[str(posicao // 6)] = dados[posicao]
+                    dados[posicao] = 0
+            self._numeros[str(self.simanim)] = numeros
+        content.append(seifim.content)
+        dados_seifim.extend(dados)
+        por_siman.append(len(dados_seifim) // 6)
+        palavras.extend(self._codigo(vocabulary_word(indice)) for indice in palavras_chave)
+        palavras_por_siman.append(len(palavras))
+        if assuntos:
+            self._assuntos[str(self.simanim)] = {str(indice): assunto for indice, assunto in assuntos.items()}
+
+    def _secoes(self) -> List[Tuple[str, Union[array, bytearray]]]:
+        vocabulario = _Texto()
+        for palavra in self._vocabulario:
+            vocabulario.append(palavra)
+        secoes = [('vocabulario.offsets', vocabulario.offsets), ('vocabulario.dados', vocabulario.dados)]
+
+        for campo in self.campos or []:
+            coluna = self._colunas.get(campo)
+            if coluna is None:
+                continue
+            tipo = COLUNAS[campo]
+            if tipo == TEXTO:
+                secoes += [(f'{campo}.offsets', coluna.offsets), (f'{campo}.dados', coluna.dados)]
+            elif tipo == PALAVRAS:
+                secoes += [(f'{campo}.offsets', coluna[0]), (f'{campo}.codigos', coluna[1])]
+            elif tipo == PESOS:
+                secoes += [(f'{campo}.offsets', coluna[0]), (f'{campo}.codigos', coluna[1]), (f'{campo}.pesos', coluna[2])]
+            elif tipo == SEIFIM:
+                content, por_siman, dados, palavras_por_siman, palavras = coluna
+                secoes += [
+                    (f'{campo}.content.offsets', content.offsets), (f'{campo}.content.dados', content.dados),
+                    (f'{campo}.offsets', por_siman), (f'{campo}.dados', dados),
+                    (f'{campo}.palavras.offsets', palavras_por_siman), (f'{campo}.palavras', palavras),
+                ]
+            else:
+                secoes.append((campo, coluna))
+        return secoes
+
+    def write(self, path: Union[str, Path], **metadados: Any) -> None:
+        """Grava o snapshot; metadados (ex.: processor_version) vão para o cabeçalho JSON"""
+
+        secoes = self._secoes()
+        meta = json.dumps({
+            'campos': self.campos or [],
+            'criado_em': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'assuntos_seifim': self._assuntos,
+            'numeros_seifim': self._numeros,
+            **metadados,
+        }, ensure_ascii=False).encode('utf-8')
+
+        inicio = _alinhado(_CABECALHO.size + _SECAO.size * len(secoes) + len(meta))
+        posicoes = []
+        dados = []
+        for nome, secao in secoes:
+            bloco = _little_endian(secao)
+            dados.append(bloco)
+            posicoes.append((nome, inicio, len(bloco)))
+            inicio = _alinhado(inicio + len(bloco))
+
+        # Grava em um arquivo temporário e troca no fim, como o manifesto
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(_CABECALHO.pack(MAGIC, VERSAO, self.simanim, len(secoes), len(meta)))
+            for nome, offset, tamanho in posicoes:
+                f.write(_SECAO.pack(nome.encode('ascii'), offset, tamanho))
+            f.write(meta)
+            for (_, offset, _), bloco in zip(posicoes, dados):
+                f.write(b'\x00' * (offset - f.tell()))
+                f.write(bloco)
+        Path(temp_path).replace(path)
+
+
+def save_snapshot(simanim: Iterable[Any], path: Union[str, Path], **metadados: Any) -> int:
+    """Grava os simanim processados em um snapshot; devolve quantos foram gravados"""
+
+    writer = SnapshotWriter()
+    for siman in simanim:
+        writer.add(siman)
+    writer.write(path, **metadados)
+    return writer.simanim
+
+
+def _alinhado(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def _little_endian(secao: Union[array, bytearray]) -> bytes:
+    if isinstance(secao, array) and sys.byteorder != 'little':
+        secao = array(secao.typecode, secao)
+        secao.byteswap()
+    return bytes(secao)
+
+
+class Snapshot(Sequence):
+    """Snapshot aberto com mmap; cada item é um siman montado sob demanda"""
+
+    def __init__(self, path: Union[str, Path], siman_type: Callable[..., Any] = SimpleNamespace):
+        if sys.byteorder != 'little':
+            raise RuntimeError("o snapshot é lido direto da memória e exige uma máquina little-endian")
+        self.path = str(path)
+        self.siman_type = siman_type
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, versao, self.simanim, secoes, tamanho_meta = _CABECALHO.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} não é um snapshot do processamento")
+        if versao != VERSAO:
+            raise ValueError(f"{path} é um snapshot na versão {versao}; esta versão lê a {VERSAO}")
+
+        self._secoes: Dict[str, Tuple[int, int]] = {}
+        for indice in range(secoes):
+            nome, offset, tamanho = _SECAO.unpack_from(self._mm, _CABECALHO.size + _SECAO.size * indice)
+            self._secoes[nome.rstrip(b'\x00').decode('ascii')] = (offset, tamanho)
+        inicio_meta = _CABECALHO.size + _SECAO.size * secoes
+        self.metadata: Dict[str, Any] = json.loads(self._mm[inicio_meta:inicio_meta + tamanho_meta])
+        self.campos: List[str] = self.metadata['campos']
+        self._assuntos = self.metadata.get('assuntos_seifim', {})
+        self._numeros = self.metadata.get('numeros_seifim', {})
+
+        self._view = memoryview(self._mm)
+        self._arrays: Dict[str, memoryview] = {}
+        self._vocabulario: Optional[List[str]] = None
+        self._indices: Optional[array] = None
+
+    def _array(self, secao: str, formato: str) -> memoryview:
+        valores = self._arrays.get(secao)
+        if valores is None:
+            offset, tamanho = self._secoes[secao]
+            valores = self._arrays[secao] = self._view[offset:offset + tamanho].cast(formato)
+        return valores
+
+    def _texto(self, secao: str, indice: int) -> str:
+        offsets = self._array(f'{secao}.offsets', 'Q')
+        base = self._secoes[f'{secao}.dados'][0]
+        return self._mm[base + offsets[indice]:base + offsets[indice + 1]].decode('utf-8')
+
+    @property
+    def vocabulario(self) -> List[str]:
+        """Palavras (categorias, tags e palavras-chave) do snapshot, internadas"""
+
+        if self._vocabulario is None:
+            offsets = self._array('vocabulario.offsets', 'Q')
+            base = self._secoes['vocabulario.dados'][0]
+            self._vocabulario = [
+                sys.intern(self._mm[base + inicio:base + fim].decode('utf-8'))
+                for inicio, fim in zip(offsets, offsets[1:])
+            ]
+        return self._vocabulario
+
+    def _palavras(self, campo: str, indice: int) -> Tuple[str, ...]:
+        offsets = self._array(f'{campo}.offsets', 'I')
+        codigos = self._array(f'{campo}.codigos', 'I')
+        return tuple(map(self.vocabulario.__getitem__, codigos[offsets[indice]:offsets[indice + 1]]))
+
+    def _seifim(self, campo: str, indice: int) -> SeifRecords:
+        if self._indices is None:
+            # Códigos do snapshot -> índices do vocabulário deste processo
+            self._indices = array('I', map(vocabulary_index, self.vocabulario))
+        por_siman = self._array(f'{campo}.offsets', 'I')
+        palavras_por_siman = self._array(f'{campo}.palavras.offsets', 'I')
+        dados = array('i', self._array(f'{campo}.dados', 'i')[6 * por_siman[indice]:6 * por_siman[indice + 1]])
+        numeros = self._numeros.get(str(indice))
+        if numeros:
+            dados = list(dados)
+            for seif, numero in numeros.items():
+                dados[6 * int(seif) + _NUMERO_SEIF] = numero
+            dados = compact_seif_data(dados)
+        codigos = self._array(f'{campo}.palavras', 'I')[palavras_por_siman[indice]:palavras_por_siman[indice + 1]]
+        assuntos = self._assuntos.get(str(indice))
+        return SeifRecords.from_arrays(
+            self._texto(f'{campo}.content', indice), dados,
+            array('I', map(self._indices.__getitem__, codigos)),
+            {int(seif): assunto for seif, assunto in assuntos.items()} if assuntos else None,
+        )
+
+    def _campo(self, campo: str, indice: int) -> Any:
+        tipo = COLUNAS[campo]
+        if tipo == TEXTO:
+            return self._texto(campo, indice)
+        if tipo == PALAVRA:
+            return self.vocabulario[self._array(campo, 'I')[indice]]
+        if tipo == PALAVRAS:
+            return self._palavras(campo, indice)
+        if tipo == PESOS:
+            offsets = self._array(f'{campo}.offsets', 'I')
+            pesos = self._array(f'{campo}.pesos', 'd')[offsets[indice]:offsets[indice + 1]]
+            return tuple(zip(self._palavras(campo, indice), pesos))
+        if tipo == REAL:
+            return self._array(campo, 'd')[indice]
+        if tipo == BOOLEANO:
+            return bool(self._array(campo, 'B')[indice])
+        return self._seifim(campo, indice)
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            return [self[i] for i in range(*indice.indices(len(self)))]
+        if indice < 0:
+            indice += len(self)
+        if not 0 <= indice < len(self):
+            raise IndexError('siman fora do intervalo')
+        return self.siman_type(**{campo: self._campo(campo, indice) for campo in self.campos})
+
+    def __len__(self) -> int:
+        return self.simanim
+
+    def close(self) -> None:
+        # As views apontam para o mmap; soltá-las antes de fechá-lo
+        for valores in self._arrays.values():
+            valores.release()
+        self._arrays = {}
+        self._view.release()
+        self._mm.close()
+
+    def __enter__(self) -> 'Snapshot':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def load_snapshot(path: Union[str, Path], siman_type: Callable[..., Any] = SimpleNamespace) -> Snapshot:
+    """Abre um snapshot gravado com save_snapshot/SnapshotWriter
+
+    siman_type recebe os campos como argumentos nomeados (ex.: o ProcessedSiman do script).
+    """
+
+    return Snapshot(path, siman_type)
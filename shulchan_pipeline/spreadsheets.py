@@ -0,0 +1,186 @@
+"""
+Leitura em streaming das planilhas exportadas do Supabase (tabelas/*.xlsx)
+
+As planilhas são lidas com openpyxl em modo read-only, uma linha por vez:
+Books e Chapters (pequenas) ficam em dicionários e cada linha de Content é
+devolvida já com os dados do capítulo e do livro, no mesmo formato das
+linhas de csv/content_rows.csv (id, chapter_id, content, created_at,
+updated_at) mais divisao_id e os campos book_* e chapter_*.
+
+A exportação de Content quebra o conteúdo com várias linhas em várias linhas
+da planilha (e cada linha em células nas vírgulas), e grava o UTF-8 lido como
+cp1252 ("Ã©" em vez de "é"). content_rows remonta cada registro a partir da
+linha que começa com os ids do conteúdo e do capítulo e corrige a codificação.
+
+    with open_rows('tabelas') as rows:          # ou 'csv/content_rows.csv'
+        for row in rows:
+            ...
+"""
+
+import contextlib
+import csv
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Sequence, Tuple, Union
+
+try:
+    import openpyxl
+except ImportError:  # opcional: só para ler as planilhas
+    openpyxl = None
+
+CONTENT_XLSX = 'Supabase Snippet Content Table.xlsx'
+CHAPTERS_XLSX = 'Supabase Snippet Chapters Table.xlsx'
+BOOKS_XLSX = 'Supabase Snippet Books Table.xlsx'
+
+_UUID = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', re.IGNORECASE)
+_DATA_HORA = re.compile(r'^(\d{4}-\d{2}-\d{2}[ T][0-9:.+\-]*|None|null)$')
+# Sequências típicas de UTF-8 lido como cp1252/latin-1
+_MOJIBAKE = re.compile('[ÃÂ][\x80-\xbf\u0152\u0153\u0160\u0161\u0178\u017d\u017e\u0192\u02c6\u02dc\u2013-\u2122]|â€')
+
+
+def fix_text(valor: Any) -> str:
+    """Texto da célula: vazio para None/'null' e UTF-8 lido como cp1252 corrigido"""
+
+    if valor is None:
+        return ''
+    texto = str(valor)
+    if texto in ('None', 'null'):
+        return ''
+    if _MOJIBAKE.search(texto):
+        for codificacao in ('cp1252', 'latin-1'):
+            try:
+                return texto.encode(codificacao).decode('utf-8')
+            except UnicodeError:
+                continue
+    return texto
+
+
+def iter_sheet(path: Union[str, Path]) -> Iterator[Tuple[Any, ...]]:
+    """Linhas da primeira aba da planilha, lidas em modo read-only (sem as células vazias do fim)"""
+
+    if openpyxl is None:
+        raise RuntimeError("ler as planilhas .xlsx exige o openpyxl (pip install openpyxl)")
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        for linha in workbook.worksheets[0].iter_rows(values_only=True):
+            fim = len(linha)
+            while fim and linha[fim - 1] is None:
+                fim -= 1
+            yield linha[:fim]
+    finally:
+        workbook.close()
+
+
+def sheet_records(path: Union[str, Path]) -> Iterator[Dict[str, str]]:
+    """Linhas da planilha como dicionários pelo cabeçalho (para tabelas sem quebras, como Books e Chapters)"""
+
+    linhas = iter_sheet(path)
+    cabecalho = [str(coluna) for coluna in next(linhas, ())]
+    for linha in linhas:
+        if linha:
+            yield {coluna: fix_text(valor) for coluna, valor in zip(cabecalho, linha)}
+
+
+class SupabaseExport:
+    """Planilhas de conteúdo, capítulos e livros de um diretório exportado do Supabase"""
+
+    def __init__(self, directory: Union[str, Path] = 'tabelas'):
+        self.directory = Path(directory)
+        self.books = {book['id']: book for book in sheet_records(self.directory / BOOKS_XLSX)}
+        self.chapters = {chapter['id']: chapter for chapter in sheet_records(self.directory / CHAPTERS_XLSX)}
+        # Conteúdos cujo chapter_id não está em Chapters (devolvidos sem os dados do capítulo)
+        self.sem_capitulo: List[str] = []
+
+    def _inicio(self, linha: Sequence[Any]) -> bool:
+        """A linha começa um registro de Content (id e chapter_id nas duas primeiras células)?"""
+
+        return (len(linha) >= 2 and isinstance(linha[0], str) and isinstance(linha[1], str)
+                and bool(_UUID.match(linha[0])) and bool(_UUID.match(linha[1])))
+
+    def _registro(self, linhas: List[Sequence[Any]]) -> Dict[str, str]:
+        """Remonta um registro de Content a partir das linhas da planilha que ele ocupa"""
+
+        celulas = [['' if valor is None else str(valor) for valor in linha] for linha in linhas]
+        content_id, chapter_id = celulas[0][:2]
+        celulas[0] = celulas[0][2:]
+
+        # created_at e updated_at são as duas últimas células da última linha
+        ultima = celulas[-1]
+        carimbos = ['', '']
+        if len(ultima) >= 2 and all(_DATA_HORA.match(valor) for valor in ultima[-2:]):
+            carimbos = ultima[-2:]
+            celulas[-1] = ultima[:-2]
+
+        content = '\n'.join(','.join(linha) for linha in celulas)
+        if len(linhas) > 1 and content.endswith('"'):
+            # Campo entre aspas que a exportação partiu: sem a aspa final e com "" -> "
+            content = content[:-1].replace('""', '"')
+        if content.startswith('"') and content.endswith('"') and len(content) > 1:
+            content = content[1:-1].replace('""', '"')
+
+        return {
+            'id': content_id,
+            'chapter_id': chapter_id,
+            'content': fix_text(content),
+            'created_at': fix_text(carimbos[0]),
+            'updated_at': fix_text(carimbos[1]),
+        }
+
+    def _com_capitulo(self, row: Dict[str, str]) -> Dict[str, str]:
+        """Acrescenta ao conteúdo os dados do capítulo e do livro"""
+
+        chapter = self.chapters.get(row['chapter_id'])
+        if chapter is None:
+            print(f"Aviso: conteúdo {row['id']} com chapter_id {row['chapter_id']} que não está em Chapters")
+            self.sem_capitulo.append(row['id'])
+            chapter = {}
+        book = self.books.get(chapter.get('book_id', ''), {})
+        row['divisao_id'] = row['chapter_id']
+        row['chapter_title'] = chapter.get('title', '')
+        row['chapter_slug'] = chapter.get('slug', '')
+        row['chapter_position'] = chapter.get('position', '')
+        row['book_id'] = chapter.get('book_id', '')
+        row['book_title'] = book.get('title', '')
+        row['book_slug'] = book.get('slug', '')
+        row['book_author'] = book.get('author', '')
+        return row
+
+    def content_rows(self) -> Iterator[Dict[str, str]]:
+        """Linhas de Content, uma por registro e já com capítulo e livro, lidas em streaming"""
+
+        self.sem_capitulo = []
+        linhas = iter_sheet(self.directory / CONTENT_XLSX)
+        next(linhas, None)  # cabeçalho
+
+        # Só as linhas do registro atual ficam em memória
+        registro: List[Sequence[Any]] = []
+        for linha in linhas:
+            if self._inicio(linha):
+                if registro:
+                    yield self._com_capitulo(self._registro(registro))
+                registro = [linha]
+            elif registro:
+                registro.append(linha)
+        if registro:
+            yield self._com_capitulo(self._registro(registro))
+
+
+def is_spreadsheet_source(path: Union[str, Path]) -> bool:
+    """O caminho é um diretório com as planilhas exportadas (em vez de um CSV)?"""
+
+    return Path(path).is_dir()
+
+
+@contextlib.contextmanager
+def open_rows(path: Union[str, Path]) -> Iterator[Iterator[Dict[str, str]]]:
+    """Linhas de conteúdo de um CSV (csv/content_rows.csv) ou do diretório das planilhas (tabelas/)"""
+
+    if is_spreadsheet_source(path):
+        rows = SupabaseExport(path).content_rows()
+        try:
+            yield rows
+        finally:
+            rows.close()
+    else:
+        with open(path, 'r', encoding='utf-8') as file:
+            yield csv.DictReader(file)
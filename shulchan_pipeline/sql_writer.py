@@ -0,0 +1,344 @@
+"""
+Escrita incremental do SQL gerado, uma seção por tabela
+"""
+
+import shutil
+import tempfile
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, TextIO, Tuple, Union
+
+# Cabeçalho padrão das seções do arquivo SQL
+SEPARADOR = "-- ====================================================="
+
+
+@dataclass(frozen=True)
+class TableSpec:
+    """Colunas (nome, tipo) de uma tabela gerada, na ordem das linhas"""
+    name: str
+    columns: Tuple[Tuple[str, str], ...]
+
+    @property
+    def column_names(self) -> List[str]:
+        return [nome for nome, _ in self.columns]
+
+
+# Tabelas geradas pelo processamento (ver database_schema.sql)
+TABLES: Dict[str, TableSpec] = {
+    spec.name: spec for spec in (
+        TableSpec('assuntos', (
+            ('id', 'UUID'), ('siman_id', 'UUID'), ('divisao_id', 'UUID'), ('assunto', 'TEXT'),
+            ('assunto_resumido', 'VARCHAR(200)'), ('tipo', 'VARCHAR(20)'), ('confianca', 'DECIMAL(3,2)'),
+            ('palavras_chave', 'TEXT[]'),
+        )),
+        TableSpec('seifim', (
+            ('id', 'UUID'), ('siman_id', 'UUID'), ('divisao_id', 'UUID'), ('seif_numero', 'INTEGER'),
+            ('conteudo', 'TEXT'), ('assunto', 'TEXT'), ('palavras_chave', 'TEXT[]'), ('tamanho', 'INTEGER'),
+            ('ordem', 'INTEGER'),
+        )),
+        TableSpec('siman_categorias', (
+            ('id', 'UUID'), ('siman_id', 'UUID'), ('categoria_id', 'UUID'), ('confianca', 'DECIMAL(3,2)'),
+        )),
+        TableSpec('siman_tags', (
+            ('id', 'UUID'), ('siman_id', 'UUID'), ('tag_id', 'UUID'), ('relevancia', 'DECIMAL(3,2)'),
+        )),
+        TableSpec('seifim_relacionados', (
+            ('id', 'UUID'), ('siman_id', 'UUID'), ('relacionados', 'UUID[]'), ('similaridades', 'REAL[]'),
+        )),
+    )
+}
+
+
+def array_literal(valores: Iterable[Any]) -> str:
+    """Texto de um array do Postgres: {"a","b"} (números sem aspas: {0.5,1})"""
+
+    itens = (
+        str(valor) if isinstance(valor, (int, float))
+        else '"' + valor.replace('\\', '\\\\').replace('"', '\\"') + '"'
+        for valor in valores
+    )
+    return "{" + ",".join(itens) + "}"
+
+
+def sql_literal(valor: Any) -> str:
+    """Literal SQL de um valor Python"""
+
+    if valor is None:
+        return "NULL"
+    if isinstance(valor, (int, float)):
+        return str(valor)
+    if isinstance(valor, (list, tuple)):
+        valor = array_literal(valor)
+    return "'" + str(valor).replace("'", "''") + "'"
+
+
+def copy_value(valor: Any) -> str:
+    """Valor no formato texto do COPY (tabulações, quebras e barras escapadas)"""
+
+    if valor is None:
+        return "\\N"
+    if isinstance(valor, (list, tuple)):
+        valor = array_literal(valor)
+    texto = str(valor)
+    if '\\' in texto or '\t' in texto or '\n' in texto or '\r' in texto:
+        texto = texto.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+    return texto
+
+
+def upsert_clause(spec: TableSpec) -> str:
+    """ON CONFLICT que atualiza a linha existente com o mesmo id"""
+
+    atualizacoes = ", ".join(f"{coluna} = EXCLUDED.{coluna}" for coluna in spec.column_names if coluna != 'id')
+    return f"\nON CONFLICT (id) DO UPDATE SET {atualizacoes}"
+
+
+def uuid_list(ids: Iterable[str]) -> str:
+    """Lista de uuids para IN (...)"""
+
+    return ", ".join(sql_literal(valor) for valor in ids)
+
+
+class SqlFormat:
+    """Como as linhas de uma tabela são escritas no arquivo SQL
+
+    Com upsert=True as linhas já existentes (mesmo id) são atualizadas em vez de gerar conflito.
+    """
+
+    # Linhas acumuladas antes de gerar um comando
+    batch_size = 1
+
+    def __init__(self, upsert: bool = False):
+        self.upsert = upsert
+
+    def _conflict(self, spec: TableSpec) -> str:
+        return upsert_clause(spec) if self.upsert else ""
+
+    def section_start(self, spec: TableSpec) -> str:
+        return ""
+
+    def render(self, spec: TableSpec, rows: List[Tuple[Any, ...]]) -> str:
+        raise NotImplementedError
+
+    def section_end(self, spec: TableSpec) -> str:
+        return ""
+
+
+class InsertFormat(SqlFormat):
+    """Um INSERT por linha (formato original)"""
+
+    def render(self, spec: TableSpec, rows: List[Tuple[Any, ...]]) -> str:
+        colunas = ", ".join(spec.column_names)
+        conflito = self._conflict(spec)
+        return "".join(
+            f"\n\nINSERT INTO {spec.name} ({colunas}) VALUES\n({', '.join(sql_literal(valor) for valor in row)}){conflito};"
+            for row in rows
+        )
+
+
+class ValuesFormat(SqlFormat):
+    """INSERTs com várias linhas em VALUES
+
+    Funciona em qualquer cliente SQL, inclusive no SQL Editor do Supabase.
+    """
+
+    def __init__(self, batch_size: int = 500, upsert: bool = False):
+        super().__init__(upsert)
+        self.batch_size = batch_size
+
+    def render(self, spec: TableSpec, rows: List[Tuple[Any, ...]]) -> str:
+        colunas = ", ".join(spec.column_names)
+        valores = ",\n".join("(" + ", ".join(sql_literal(valor) for valor in row) + ")" for row in rows)
+        return f"\n\nINSERT INTO {spec.name} ({colunas}) VALUES\n{valores}{self._conflict(spec)};"
+
+
+class CopyFormat(SqlFormat):
+    """Blocos COPY ... FROM STDIN (para psql)
+
+    É o formato de carga mais rápido, mas o SQL Editor do Supabase não aceita COPY FROM STDIN.
+    No upsert as linhas passam por uma tabela temporária, já que COPY não tem ON CONFLICT.
+    """
+
+    batch_size = 1000
+
+    @staticmethod
+    def _staging(spec: TableSpec) -> str:
+        return f"{spec.name}_staging"
+
+    def section_start(self, spec: TableSpec) -> str:
+        colunas = ", ".join(spec.column_names)
+        if not self.upsert:
+            return f"\nCOPY {spec.name} ({colunas}) FROM STDIN;\n"
+
+        staging = self._staging(spec)
+        return (
+            f"\nCREATE TEMP TABLE {staging} (LIKE {spec.name});\n"
+            f"COPY {staging} ({colunas}) FROM STDIN;\n"
+        )
+
+    def render(self, spec: TableSpec, rows: List[Tuple[Any, ...]]) -> str:
+        return "".join("\t".join(copy_value(valor) for valor in row) + "\n" for row in rows)
+
+    def section_end(self, spec: TableSpec) -> str:
+        if not self.upsert:
+            return "\\.\n"
+
+        colunas = ", ".join(spec.column_names)
+        staging = self._staging(spec)
+        return (
+            "\\.\n"
+            f"INSERT INTO {spec.name} ({colunas})\n"
+            f"SELECT {colunas} FROM {staging}{upsert_clause(spec)};\n"
+            f"DROP TABLE {staging};\n"
+        )
+
+
+# Formatos disponíveis em --format
+FORMATS = {
+    'insert': InsertFormat,
+    'values': ValuesFormat,
+    'copy': CopyFormat,
+}
+
+
+class SqlWriter:
+    """Escreve as linhas no arquivo de saída à medida que os simanim são processados
+
+    O arquivo mantém uma seção por tabela (todos os assuntos, depois todos os
+    seifim etc.). A primeira seção vai direto para a saída; as demais são
+    acumuladas em arquivos temporários com buffer e copiadas ao final, então a
+    memória usada não depende do tamanho do corpus.
+
+    Com upsert=True o arquivo é um delta: write_siman() atualiza as linhas de um
+    siman e delete_siman() o remove; as remoções (incluindo seifim, categorias e
+    tags que deixaram de existir em um siman alterado) vão para uma seção final.
+    """
+
+    BUFFER_SIZE = 1024 * 1024
+
+    # Simanim por comando DELETE
+    DELETE_BATCH = 500
+
+    def __init__(self, output: TextIO, sections: Sequence[Tuple[str, str]],
+                 formato: Union[str, SqlFormat] = 'insert', upsert: bool = False):
+        """sections: lista ordenada de (tabela, título da seção)"""
+
+        self.output = output
+        self.sections = list(sections)
+        self.formato = FORMATS[formato](upsert=upsert) if isinstance(formato, str) else formato
+        self.upsert = self.formato.upsert
+        self.removidos: List[str] = []
+        self._alterados: List[Tuple[str, Dict[str, List[str]]]] = []
+        self.first_table = self.sections[0][0]
+        self.rows: Dict[str, int] = {table: 0 for table, _ in self.sections}
+        self._pending: Dict[str, List[Tuple[Any, ...]]] = {table: [] for table, _ in self.sections}
+        self._temp_files: Dict[str, TextIO] = {
+            table: tempfile.TemporaryFile(mode='w+', encoding='utf-8', buffering=self.BUFFER_SIZE)
+            for table, _ in self.sections[1:]
+        }
+        self._closed = False
+        self.output.write(self._section_header(0))
+        for table, _ in self.sections:
+            self._target(table).write(self.formato.section_start(TABLES[table]))
+
+    def __enter__(self) -> 'SqlWriter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self._discard()
+
+    def _section_header(self, index: int) -> str:
+        titulo = self.sections[index][1]
+        header = "\n".join([SEPARADOR, f"-- {titulo}", SEPARADOR])
+        return header if index == 0 else "\n" + header
+
+    def _target(self, table: str) -> TextIO:
+        return self.output if table == self.first_table else self._temp_files[table]
+
+    def _flush(self, table: str) -> None:
+        pending = self._pending[table]
+        if pending:
+            self._target(table).write(self.formato.render(TABLES[table], pending))
+            self._pending[table] = []
+
+    def write(self, table: str, row: Tuple[Any, ...]) -> None:
+        """Acrescenta uma linha à seção da tabela"""
+
+        pending = self._pending[table]
+        pending.append(row)
+        self.rows[table] += 1
+        if len(pending) >= self.formato.batch_size:
+            self._flush(table)
+
+    def write_many(self, rows: Iterable[Tuple[str, Tuple[Any, ...]]]) -> None:
+        """Acrescenta vários pares (tabela, linha)"""
+
+        for table, row in rows:
+            self.write(table, row)
+
+    def write_siman(self, siman_id: str, rows: Iterable[Tuple[str, Tuple[Any, ...]]]) -> None:
+        """Upsert de todas as linhas de um siman (o id é a primeira coluna de cada linha)
+
+        As linhas que o siman tinha antes e não estão em rows são removidas no fim do arquivo.
+        """
+
+        if not self.upsert:
+            raise ValueError("write_siman exige SqlWriter(upsert=True)")
+        ids: Dict[str, List[str]] = {table: [] for table, _ in self.sections}
+        for table, row in rows:
+            self.write(table, row)
+            ids[table].append(row[0])
+        self._alterados.append((siman_id, ids))
+
+    def delete_siman(self, siman_id: str) -> None:
+        """Remove todas as linhas de um siman"""
+
+        if not self.upsert:
+            raise ValueError("delete_siman exige SqlWriter(upsert=True)")
+        self.removidos.append(siman_id)
+
+    def _deletes(self) -> Iterator[str]:
+        tabelas = [table for table, _ in reversed(self.sections)]
+        lote = self.DELETE_BATCH
+
+        for inicio in range(0, len(self.removidos), lote):
+            simanim = uuid_list(self.removidos[inicio:inicio + lote])
+            for table in tabelas:
+                yield f"DELETE FROM {table} WHERE siman_id IN ({simanim});"
+
+        for inicio in range(0, len(self._alterados), lote):
+            alterados = self._alterados[inicio:inicio + lote]
+            simanim = uuid_list(siman_id for siman_id, _ in alterados)
+            for table in tabelas:
+                manter = [id_ for _, ids in alterados for id_ in ids[table]]
+                condicao = f" AND id NOT IN ({uuid_list(manter)})" if manter else ""
+                yield f"DELETE FROM {table} WHERE siman_id IN ({simanim}){condicao};"
+
+    def close(self) -> None:
+        """Fecha as seções e as copia para a saída, na ordem das tabelas"""
+
+        if self._closed:
+            return
+        for table, _ in self.sections:
+            self._flush(table)
+            self._target(table).write(self.formato.section_end(TABLES[table]))
+
+        for index, (table, _) in enumerate(self.sections[1:], start=1):
+            temp_file = self._temp_files[table]
+            self.output.write("\n")
+            self.output.write(self._section_header(index))
+            temp_file.seek(0)
+            shutil.copyfileobj(temp_file, self.output, self.BUFFER_SIZE)
+            temp_file.close()
+
+        if self.removidos or self._alterados:
+            self.output.write("\n\n" + "\n".join([SEPARADOR, "-- REMOÇÕES DE LINHAS ANTIGAS", SEPARADOR]))
+            for comando in self._deletes():
+                self.output.write("\n\n" + comando)
+        self._closed = True
+
+    def _discard(self) -> None:
+        for temp_file in self._temp_files.values():
+            temp_file.close()
+        self._closed = True
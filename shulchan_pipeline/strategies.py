@@ -0,0 +1,126 @@
+"""
+Motor de estratégias: o siman é analisado uma única vez e título, categoria,
+tags e palavras-chave são estratégias plugáveis aplicadas sobre essa análise
+
+Cada estratégia é um callable com a assinatura do método equivalente dos
+processadores, então os próprios métodos servem de estratégia:
+
+    title(content, encontradas)           -> (assunto, resumido, confianca[, tem_assunto_original[, padrao]])
+    category(assunto, content, encontradas) -> categoria
+    tags(assunto, content, encontradas)     -> [tags]
+    keywords(documentos)                    -> [palavras_chave de cada documento]
+
+Várias combinações (StrategySet) podem ser aplicadas ao mesmo ParsedSiman;
+etapas repetidas entre elas (ex.: o mesmo ranking dos seifim) são calculadas
+uma só vez por siman. Com category e tags None a variante deixa categoria e
+tags de fora (o process_batch dos processadores pontua o bloco inteiro de uma
+vez, com CategoryScorer).
+"""
+
+from typing import Any, Callable, Dict, List, Mapping, NamedTuple, Optional, Sequence, Set, Tuple
+
+from .analysis import SimanAnalysis
+from .keywords import KeywordMatcher
+from .records import SeifRecords
+from .seifim import SeifSpan, significant_seif_spans
+
+
+class StrategySet(NamedTuple):
+    """Estratégias de uma variante do processamento"""
+    title: Callable[[str, Set[str]], Tuple[Any, ...]]
+    category: Optional[Callable[[str, str, Set[str]], str]]
+    tags: Optional[Callable[[str, str, Set[str]], List[str]]]
+    keywords: Callable[[List[List[str]]], List[List[str]]]
+
+
+class TitleResult(NamedTuple):
+    assunto: str
+    assunto_resumido: str
+    confianca: float
+    tem_assunto_original: Optional[bool] = None  # None: a estratégia não informa
+    padrao: Optional[str] = None  # padrão do cabeçalho que deu o título ('padrao_1'... ou 'fallback'); None: não informa
+
+
+class StrategyResult(NamedTuple):
+    """Resultado de uma variante para um siman"""
+    titulo: TitleResult
+    categoria: Optional[str]  # None: a variante não define categoria nem tags
+    tags: List[str]
+    palavras_chave: List[str]
+    palavras_chave_seifim: List[List[str]]
+
+
+class ParsedSiman:
+    """Siman analisado uma única vez: texto normalizado, seifim (por offsets) e tokens"""
+
+    def __init__(self, row: Mapping[str, Any], keyword_matcher: KeywordMatcher,
+                 analise: Optional[SimanAnalysis] = None):
+        self.row = row
+        self.content: str = row['content']
+        self.analise = analise if analise is not None else SimanAnalysis(self.content, keyword_matcher)
+
+        # Seifim numerados depois do cabeçalho (só os com conteúdo significativo)
+        self.spans: List[SeifSpan] = significant_seif_spans(self.content)
+
+        # Tokeniza o siman uma única vez, segmentado nos offsets dos seifim
+        self.analise.tokenize([(span.inicio, span.fim) for span in self.spans])
+        self.palavras_seifim = [self.analise.palavras_seif(indice) for indice in range(len(self.spans))]
+
+    def seif_records(self, palavras_chave: Sequence[List[str]], seif_assunto: Callable[[str], str]) -> SeifRecords:
+        """Seifim compactos (offsets no conteúdo), com as palavras-chave já ranqueadas de cada um"""
+
+        return SeifRecords(self.content, (
+            (span.inicio, span.fim, int(span.numero), span.indice + 1,
+             seif_assunto(self.content[span.inicio:span.fim]), palavras_chave[indice])
+            for indice, span in enumerate(self.spans)
+        ))
+
+
+def _cached(cache: Dict[Any, Any], chave: Tuple[Any, ...], calcular: Callable[[], Any]) -> Any:
+    if chave not in cache:
+        cache[chave] = calcular()
+    return cache[chave]
+
+
+def run_strategies(parsed: ParsedSiman, estrategias: StrategySet,
+                   cache: Optional[Dict[Any, Any]] = None) -> StrategyResult:
+    """Aplica uma variante ao siman analisado
+
+    cache, compartilhado entre as variantes de um mesmo siman, evita repetir
+    uma estratégia já aplicada com os mesmos argumentos.
+    """
+
+    if cache is None:
+        cache = {}
+    analise = parsed.analise
+    content = parsed.content
+
+    titulo = _cached(cache, ('title', estrategias.title),
+                     lambda: TitleResult(*estrategias.title(content, analise.encontradas_conteudo)))
+    assunto = titulo.assunto
+
+    # Palavras-chave de (assunto + conteúdo), usadas por categorias e tags
+    categoria, tags = None, []
+    if estrategias.category is not None or estrategias.tags is not None:
+        encontradas = _cached(cache, ('encontradas', assunto), lambda: analise.encontradas(assunto))
+    if estrategias.category is not None:
+        categoria = _cached(cache, ('category', estrategias.category, assunto),
+                            lambda: estrategias.category(assunto, content, encontradas))
+    if estrategias.tags is not None:
+        tags = _cached(cache, ('tags', estrategias.tags, assunto),
+                       lambda: estrategias.tags(assunto, content, encontradas))
+
+    # O ranking dos seifim não depende do assunto; o do siman, sim
+    palavras_chave_seifim = _cached(cache, ('keywords_seifim', estrategias.keywords),
+                                    lambda: estrategias.keywords(parsed.palavras_seifim))
+    palavras_chave = _cached(cache, ('keywords', estrategias.keywords, assunto),
+                             lambda: estrategias.keywords([analise.palavras_siman(assunto)])[0])
+
+    return StrategyResult(titulo, categoria, list(tags), palavras_chave, palavras_chave_seifim)
+
+
+def run_variants(parsed: ParsedSiman, variantes: Mapping[str, StrategySet]) -> Dict[str, StrategyResult]:
+    """Aplica várias variantes ao mesmo siman analisado, em uma única passada"""
+
+    cache: Dict[Any, Any] = {}
+    return {nome: run_strategies(parsed, estrategias, cache) for nome, estrategias in variantes.items()}
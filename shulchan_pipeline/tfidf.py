@@ -0,0 +1,149 @@
+"""
+Palavras-chave por TF-IDF sobre o corpus inteiro
+
+A frequência de documentos (DF) de cada palavra é contada em uma primeira
+passada pelo CSV, em que cada siman e cada seif é um documento. Depois as
+palavras de cada documento são pontuadas por contagem * IDF e as 10 melhores
+viram as palavras_chave, então palavras comuns a todo o corpus deixam de
+aparecer em milhares de seifim.
+
+NumPy é opcional: com ele a pontuação e a escolha das melhores palavras de um
+lote de documentos são feitas por operações vetorizadas; sem ele o mesmo
+cálculo é feito em Python, com o mesmo resultado.
+"""
+
+import hashlib
+import math
+from collections import Counter
+from itertools import chain
+from operator import mul
+from typing import Dict, Iterable, List, Optional, Set
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depende do ambiente
+    np = None
+
+from .analysis import SimanAnalysis
+from .seifim import significant_seif_spans
+
+
+class _Idf(dict):
+    """IDF por palavra; palavras fora do corpus (df = 0) recebem o IDF máximo"""
+
+    def __init__(self, valores: Dict[str, float], desconhecida: float):
+        super().__init__(valores)
+        self.desconhecida = desconhecida
+
+    def __missing__(self, palavra: str) -> float:
+        return self.desconhecida
+
+
+class TfidfKeywords:
+    """Ranking de palavras-chave por TF-IDF, com o IDF do corpus
+
+    A pontuação de uma palavra em um documento é contagem * idf, com
+    idf = ln((1 + N) / (1 + df)) + 1 (N documentos). Empates são decididos pela
+    ordem da primeira ocorrência, como no ranking por frequência.
+
+    Lotes com poucas palavras são mais rápidos em Python puro (o custo fixo das
+    chamadas NumPy domina), então a versão vetorizada só é usada a partir de
+    VECTORIZE_THRESHOLD palavras distintas no lote.
+    """
+
+    # Ponto de equilíbrio medido no CPython 3.11 com NumPy 2
+    VECTORIZE_THRESHOLD = 256
+
+    def __init__(self, stop_words: Iterable[str], top_k: int = 10, use_numpy: Optional[bool] = None):
+        self.stop_words: Set[str] = set(stop_words)
+        self.top_k = top_k
+        self.document_frequency: Counter = Counter()
+        self.documentos = 0
+        self.use_numpy = np is not None if use_numpy is None else use_numpy and np is not None
+        self._idf: Optional[_Idf] = None
+
+    def add_document(self, palavras: Iterable[str]) -> None:
+        """Conta um documento na frequência de documentos"""
+
+        self.document_frequency.update(set(palavras))
+        self.documentos += 1
+        self._idf = None
+
+    def add_siman(self, content: str) -> None:
+        """Conta o siman e cada um dos seus seifim, tokenizados como em extract_seifim"""
+
+        analise = SimanAnalysis(content, None)
+        spans = significant_seif_spans(content)
+        analise.tokenize([(span.inicio, span.fim) for span in spans])
+        self.add_document(analise.palavras_siman(''))
+        for indice in range(len(spans)):
+            self.add_document(analise.palavras_seif(indice))
+
+    @property
+    def idf(self) -> Dict[str, float]:
+        """IDF de cada palavra do corpus (calculado uma vez após a contagem)"""
+
+        if self._idf is None:
+            total = 1 + self.documentos
+            # Palavras fora do corpus (ex.: só no assunto gerado) têm df = 0
+            self._idf = _Idf({
+                palavra: math.log(total / (1 + df)) + 1
+                for palavra, df in self.document_frequency.items()
+            }, math.log(total) + 1)
+        return self._idf
+
+    def digest(self) -> str:
+        """Hash da frequência de documentos: muda com qualquer mudança do IDF (e das palavras-chave)"""
+
+        hash_df = hashlib.sha256(f"{self.documentos}\0".encode('utf-8'))
+        for palavra, df in sorted(self.document_frequency.items()):
+            hash_df.update(f"{palavra}\0{df}\0".encode('utf-8'))
+        return hash_df.hexdigest()
+
+    def _frequencias(self, palavras: List[str]) -> Counter:
+        freq = Counter(palavras)
+        for stop_word in self.stop_words.intersection(freq):
+            del freq[stop_word]
+        return freq
+
+    def rank(self, documentos: List[List[str]]) -> List[List[str]]:
+        """As top_k palavras de cada documento, em ordem de pontuação"""
+
+        frequencias = [self._frequencias(palavras) for palavras in documentos]
+        if self.use_numpy and sum(map(len, frequencias)) >= self.VECTORIZE_THRESHOLD:
+            return self._rank_numpy(frequencias)
+        return [self._rank_python(freq) for freq in frequencias]
+
+    def _rank_python(self, freq: Counter) -> List[str]:
+        pontuacao = dict(zip(freq, map(mul, freq.values(), map(self.idf.__getitem__, freq))))
+        # Com ~30 palavras por seif a ordenação (em C) é mais rápida que um heap;
+        # ela é estável, então empates ficam na ordem da primeira ocorrência
+        return sorted(pontuacao, key=pontuacao.__getitem__, reverse=True)[:self.top_k]
+
+    def _rank_numpy(self, frequencias: List[Counter]) -> List[List[str]]:
+        """Pontua o lote como uma matriz esparsa documento x palavra (formato COO)"""
+
+        tamanhos = np.fromiter(map(len, frequencias), dtype=np.int64, count=len(frequencias))
+        total = int(tamanhos.sum())
+
+        palavras = list(chain.from_iterable(frequencias))
+        contagens = np.fromiter(chain.from_iterable(freq.values() for freq in frequencias),
+                                dtype=np.float64, count=total)
+        pesos = np.fromiter(map(self.idf.__getitem__, palavras), dtype=np.float64, count=total)
+        linhas = np.repeat(np.arange(len(frequencias)), tamanhos)
+        pontuacao = contagens * pesos
+
+        # Ordena por (documento, -pontuação); lexsort é estável, então empates
+        # mantêm a ordem da primeira ocorrência dentro do documento
+        ordem = np.lexsort((-pontuacao, linhas))
+        inicios = np.concatenate(([0], np.cumsum(tamanhos)[:-1]))
+        posicao_no_documento = np.arange(total) - inicios[linhas[ordem]]
+        selecionados = ordem[posicao_no_documento < self.top_k].tolist()
+
+        # Cada documento tem min(top_k, tamanho) palavras selecionadas, em sequência
+        resultado = []
+        inicio = 0
+        for tamanho in np.minimum(tamanhos, self.top_k).tolist():
+            resultado.append([palavras[i] for i in selecionados[inicio:inicio + tamanho]])
+            inicio += tamanho
+        return resultado